@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures how long ZeepServiceProxy takes to pack the arguments of a call.
+
+A runReportJob call whose statement binds many polymorphic PQL values is
+packed against the ReportService WSDL used by the tests. Packing with memoized
+packing plans is compared with rebuilding each type's element map and
+constructing every object through zeep, as was done before packing plans.
+
+Usage: packing_benchmark.py [value_count] [iterations]
+"""
+
+import os
+import sys
+import time
+
+from unittest import mock
+
+import googleads.common
+
+WSDL_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'tests',
+                         'test_data', 'ad_manager_report_service.xml')
+
+
+class UnplannedServiceProxy(googleads.common.ZeepServiceProxy):
+  """Packs arguments without memoized plans or direct construction."""
+
+  def _GetPackingPlan(self, elem_type):
+    plan = googleads.common._PackingPlan(elem_type)
+    plan._value_class = None
+    return plan
+
+
+def CreateReportJob(value_count):
+  values = []
+  for i in range(value_count):
+    value = ({'xsi_type': 'NumberValue', 'value': i} if i % 2 else
+             {'xsi_type': 'TextValue', 'value': 'value %d' % i})
+    values.append({'key': 'key%d' % i, 'value': value})
+  return {'reportQuery': {
+      'dimensions': ['DATE', 'AD_UNIT_NAME'],
+      'columns': ['AD_SERVER_IMPRESSIONS', 'AD_SERVER_CLICKS'],
+      'dateRangeType': 'CUSTOM_DATE',
+      'startDate': {'year': 2026, 'month': 1, 'day': 1},
+      'endDate': {'year': 2026, 'month': 1, 'day': 31},
+      'statement': {'query': 'WHERE AD_UNIT_ID IN (...)', 'values': values}}}
+
+
+def Time(service_proxy_class, report_job, iterations):
+  service_proxy = service_proxy_class(
+      WSDL_PATH, mock.Mock(), None, googleads.common.ProxyConfig(), 100,
+      'benchmark')
+  service_proxy._PackArguments('runReportJob', [report_job])
+  start_time = time.time()
+  for _ in range(iterations):
+    service_proxy._PackArguments('runReportJob', [report_job])
+  return (time.time() - start_time) / iterations
+
+
+if __name__ == '__main__':
+  value_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+  iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+  report_job = CreateReportJob(value_count)
+
+  unplanned_seconds = Time(UnplannedServiceProxy, report_job, iterations)
+  planned_seconds = Time(googleads.common.ZeepServiceProxy, report_job,
+                         iterations)
+
+  print('Packing runReportJob with %d bound values' % value_count)
+  print('Without packing plans: %.2fms' % (unplanned_seconds * 1000))
+  print('With packing plans: %.2fms (%.1fx)' % (
+      planned_seconds * 1000, unplanned_seconds / planned_seconds))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares per-cell and per-column conversion of a synthetic PQL result set.
+
+The synthetic result set has a TextValue, NumberValue, DateValue and
+DateTimeValue column. Pages are served by a fake PublisherQueryLanguageService,
+which returns the same page of rows for every offset to keep memory use low.
+
+Usage: pql_conversion_benchmark.py [row_count]
+"""
+
+import sys
+import time
+
+from unittest import mock
+
+import googleads.ad_manager
+
+
+class Value(object):
+  """A PQL Value, named after its xsi type by the subclasses below."""
+
+  def __init__(self, value):
+    self._values = {'value': value}
+
+  def __getitem__(self, key):
+    return self._values[key]
+
+  def __contains__(self, key):
+    return key in self._values
+
+
+class TextValue(Value):
+  pass
+
+
+class NumberValue(Value):
+  pass
+
+
+class DateValue(Value):
+  pass
+
+
+class DateTimeValue(Value):
+  pass
+
+
+def CreatePage():
+  rows = []
+  for i in range(googleads.ad_manager.SUGGESTED_PAGE_LIMIT):
+    rows.append({'values': [
+        NumberValue(str(1000000 + i)),
+        TextValue('Line item "%d"' % i),
+        NumberValue('%d.%02d' % (i, i % 100)),
+        DateValue({'year': '2024', 'month': '03', 'day': str(1 + i % 28)}),
+        DateTimeValue({'date': {'year': '2024', 'month': '03',
+                                'day': str(1 + i % 28)},
+                       'hour': str(i % 24), 'minute': '30', 'second': '00',
+                       'timeZoneId': 'America/New_York'})]})
+  return {'columnTypes': [{'labelName': label} for label in (
+      'Id', 'Name', 'Budget', 'StartDate', 'StartDateTime')], 'rows': rows}
+
+
+def CreateDataDownloader(row_count):
+  page = CreatePage()
+  last_page = dict(page, rows=page['rows'][:row_count % len(page['rows'])])
+
+  def Select(statement):
+    offset = int(statement['query'].split('OFFSET ')[1])
+    return page if offset + len(page['rows']) <= row_count else last_page
+
+  data_downloader = googleads.ad_manager.DataDownloader(
+      mock.Mock(custom_http_headers=None))
+  data_downloader._pql_service = mock.Mock()
+  data_downloader._pql_service.select.side_effect = Select
+  return data_downloader
+
+
+def ConvertPerCell(data_downloader, output_function):
+  """Converts rows the way DataDownloader did before conversion plans."""
+  for page in data_downloader._IteratePqlPages('SELECT * FROM Line_Item', None):
+    for entity in page['rows']:
+      output_function([data_downloader._ConvertValueForCsv(value)
+                       for value in entity['values']])
+
+
+def ConvertPerColumn(data_downloader, output_function):
+  data_downloader._PageThroughPqlSet('SELECT * FROM Line_Item',
+                                     output_function, None)
+
+
+def Time(convert, row_count):
+  rows = []
+  start_time = time.time()
+  convert(CreateDataDownloader(row_count), rows.append)
+  return time.time() - start_time, rows
+
+
+if __name__ == '__main__':
+  row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+  per_cell_seconds, per_cell_rows = Time(ConvertPerCell, row_count)
+  per_column_seconds, per_column_rows = Time(ConvertPerColumn, row_count)
+  assert per_column_rows[1:] == per_cell_rows
+
+  print('Converting %d rows' % row_count)
+  print('Per cell: %.2fs' % per_cell_seconds)
+  print('Per column: %.2fs (%.1fx)' % (per_column_seconds,
+                                       per_cell_seconds / per_column_seconds))
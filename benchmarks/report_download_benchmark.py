@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares report download throughput against a local HTTP stand-in.
+
+The stand-in serves a report with HTTP Range support and limits the bandwidth
+of each connection, as report storage servers do. The download loop used
+before range requests (a single connection read in 16 KB chunks) is compared
+with adaptive chunk sizes and with parallel range requests.
+
+Usage: report_download_benchmark.py [report_megabytes] [connection_mbps]
+"""
+
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from unittest import mock
+
+import requests
+
+import googleads.ad_manager
+
+# The number of bytes each write of the stand-in server sends.
+SERVER_CHUNK_SIZE = 64 * 1024
+
+
+def CreateHandler(report_data, bytes_per_second):
+  """Creates a request handler serving report_data at a limited rate."""
+
+  class ReportHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+      start, end = 0, len(report_data)
+      byte_range = self.headers.get('Range')
+      if byte_range:
+        first, last = byte_range[len('bytes='):].split('-')
+        start, end = int(first), int(last) + 1 if last else len(report_data)
+        self.send_response(206)
+        self.send_header('Content-Range', 'bytes %d-%d/%d' % (
+            start, end - 1, len(report_data)))
+      else:
+        self.send_response(200)
+      self.send_header('Content-Length', str(end - start))
+      self.end_headers()
+
+      for position in range(start, end, SERVER_CHUNK_SIZE):
+        chunk = report_data[position:min(position + SERVER_CHUNK_SIZE, end)]
+        self.wfile.write(chunk)
+        time.sleep(len(chunk) / bytes_per_second)
+
+    def log_message(self, *args):
+      pass
+
+  return ReportHandler
+
+
+def CreateDataDownloader():
+  client = mock.Mock(http_session=requests.Session(), custom_http_headers=None,
+                     timeout=3600)
+  report_service = client.GetService.return_value
+  report_service.getReportDownloadUrlWithOptions.return_value = (
+      'http://127.0.0.1:%d/report' % SERVER.server_address[1])
+  return googleads.ad_manager.DataDownloader(client)
+
+
+def Download(**kwargs):
+  with tempfile.TemporaryFile() as outfile:
+    start_time = time.time()
+    CreateDataDownloader().DownloadReportToFile('1', 'CSV_DUMP', outfile,
+                                                **kwargs)
+    elapsed_seconds = time.time() - start_time
+    outfile.seek(0, os.SEEK_END)
+    assert outfile.tell() == len(REPORT_DATA)
+  return elapsed_seconds
+
+
+if __name__ == '__main__':
+  report_megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+  connection_mbps = float(sys.argv[2]) if len(sys.argv) > 2 else 80
+  REPORT_DATA = os.urandom(report_megabytes * 1024 * 1024)
+  SERVER = http.server.ThreadingHTTPServer(
+      ('127.0.0.1', 0),
+      CreateHandler(REPORT_DATA, connection_mbps * 1024 * 1024 / 8))
+  threading.Thread(target=SERVER.serve_forever, daemon=True).start()
+
+  print('Downloading a %d MB report at %.0f Mbps per connection.' % (
+      report_megabytes, connection_mbps))
+  baseline = Download()
+  print('Single connection, 16 KB chunks: %.2fs' % baseline)
+  for label, kwargs in (
+      ('Single connection, adaptive chunks', {'chunk_size': None}),
+      ('4 range connections, adaptive chunks',
+       {'max_connections': 4, 'chunk_size': None}),
+      ('8 range connections, adaptive chunks',
+       {'max_connections': 8, 'chunk_size': None})):
+    elapsed_seconds = Download(**kwargs)
+    print('%s: %.2fs (%.1fx)' % (label, elapsed_seconds,
+                                 baseline / elapsed_seconds))
+  SERVER.shutdown()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measures the client-side cost of a small SOAP call.
+
+getReportJobStatus is called against the ReportService WSDL used by the tests,
+with every request answered in memory by a requests adapter. Calls that splice
+a cached, rendered SOAP header into the envelope are compared with calls that
+create and render a SoapRequestHeader each time, as was done before.
+
+Usage: request_envelope_benchmark.py [iterations]
+"""
+
+import os
+import sys
+import time
+
+from unittest import mock
+
+import requests
+import requests.adapters
+
+import googleads.ad_manager
+import googleads.common
+
+WSDL_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'tests',
+                         'test_data', 'ad_manager_report_service.xml')
+
+RESPONSE = (
+    b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+    b'<soap:Body><getReportJobStatusResponse '
+    b'xmlns="https://www.google.com/apis/ads/publisher/v201802">'
+    b'<rval>COMPLETED</rval></getReportJobStatusResponse></soap:Body>'
+    b'</soap:Envelope>')
+
+
+class InMemoryAdapter(requests.adapters.BaseAdapter):
+  """Answers every request with a getReportJobStatus response."""
+
+  def send(self, request, **kwargs):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = RESPONSE
+    response.headers['Content-Type'] = 'text/xml'
+    response.request = request
+    return response
+
+  def close(self):
+    pass
+
+
+class UncachedServiceProxy(googleads.common.ZeepServiceProxy):
+  """Creates and renders the SOAP header of every request with zeep."""
+
+  def _GetRenderedSOAPHeader(self, method_name):
+    return None
+
+
+def Time(service_proxy_class, iterations):
+  client = mock.Mock(network_code='12345', application_name='benchmark')
+  client.oauth2_client.CreateHttpHeader.return_value = {
+      'authorization': 'Bearer token'}
+  session = requests.Session()
+  session.mount('https://', InMemoryAdapter())
+  service = service_proxy_class(
+      WSDL_PATH, googleads.ad_manager._AdManagerHeaderHandler(client, False),
+      None, googleads.common.ProxyConfig(), 100, 'v201802',
+      cache=googleads.common.ZeepServiceProxy.NO_CACHE, http_session=session)
+  service.getReportJobStatus(1)
+  start_time = time.time()
+  for i in range(iterations):
+    service.getReportJobStatus(i)
+  return (time.time() - start_time) / iterations
+
+
+if __name__ == '__main__':
+  iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+  uncached_seconds = Time(UncachedServiceProxy, iterations)
+  cached_seconds = Time(googleads.common.ZeepServiceProxy, iterations)
+
+  print('Calling getReportJobStatus %d times' % iterations)
+  print('Rendering SOAP headers: %.3fms per call' % (uncached_seconds * 1000))
+  print('Splicing cached SOAP headers: %.3fms per call (%.2fx)' % (
+      cached_seconds * 1000, uncached_seconds / cached_seconds))
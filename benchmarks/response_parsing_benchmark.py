@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares zeep deserialization of SOAP responses with the dict response modes.
+
+A synthetic getSavedQueriesByStatement response is parsed against the
+ReportService WSDL used by the tests: into zeep objects as the default response
+mode does, into dicts and lists, and as a StreamedPage whose results are
+discarded as they're iterated over. The time taken, the number of objects held
+afterwards, and the memory held by and peak memory of parsing are reported.
+Memory allocated by lxml isn't traced.
+
+Usage: response_parsing_benchmark.py [result_count] [iterations]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+from unittest import mock
+
+import requests
+import zeep.xsd
+
+import googleads.common
+
+WSDL_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'tests',
+                         'test_data', 'ad_manager_report_service.xml')
+
+RESULT_TEMPLATE = (
+    '<results><id>%(id)d</id><name>Saved query %(id)d</name>'
+    '<reportQuery>'
+    '<dimensions>DATE</dimensions><dimensions>AD_UNIT_NAME</dimensions>'
+    '<dimensions>ORDER_NAME</dimensions>'
+    '<columns>AD_SERVER_IMPRESSIONS</columns>'
+    '<columns>AD_SERVER_CLICKS</columns>'
+    '<columns>AD_SERVER_CPM_AND_CPC_REVENUE</columns>'
+    '<dimensionAttributes>ORDER_START_DATE_TIME</dimensionAttributes>'
+    '<customFieldIds>%(id)d</customFieldIds>'
+    '<startDate><year>2026</year><month>1</month><day>1</day></startDate>'
+    '<endDate><year>2026</year><month>1</month><day>31</day></endDate>'
+    '<dateRangeType>CUSTOM_DATE</dateRangeType>'
+    '<statement><query>WHERE ORDER_ID = :orderId</query>'
+    '<values><key>orderId</key><value xsi:type="NumberValue">'
+    '<value>%(id)d</value></value></values>'
+    '<values><key>name</key><value xsi:type="TextValue">'
+    '<value>Order %(id)d</value></value></values></statement>'
+    '<timeZoneType>PUBLISHER</timeZoneType>'
+    '</reportQuery>'
+    '<isCompatibleWithApiVersion>true</isCompatibleWithApiVersion>'
+    '</results>')
+
+
+def CreateResponse(result_count):
+  content = (
+      '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" '
+      'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"><soap:Body>'
+      '<getSavedQueriesByStatementResponse '
+      'xmlns="https://www.google.com/apis/ads/publisher/v201802"><rval>'
+      '<totalResultSetSize>%d</totalResultSetSize><startIndex>0</startIndex>'
+      '%s</rval></getSavedQueriesByStatementResponse></soap:Body>'
+      '</soap:Envelope>' % (result_count, ''.join(
+          RESULT_TEMPLATE % {'id': i} for i in range(result_count))))
+  response = requests.Response()
+  response.status_code = 200
+  response._content = content.encode('utf-8')
+  response.headers['Content-Type'] = 'text/xml'
+  return response
+
+
+def ParseWithZeep(service, response):
+  return service._method_bindings.process_reply(
+      service.zeep_client,
+      service._method_bindings.get('getSavedQueriesByStatement'),
+      response)['body']['rval']
+
+
+def ParseToDicts(service, response):
+  service._response_mode = googleads.common.RESPONSE_MODE_DICT
+  return service._ParseResponse('getSavedQueriesByStatement', response)
+
+
+def ParseStreamed(service, response):
+  """Iterates over the results of a StreamedPage, keeping only the last."""
+  service._response_mode = googleads.common.RESPONSE_MODE_STREAM
+  result = None
+  for result in service._ParseResponse('getSavedQueriesByStatement',
+                                       response):
+    pass
+  return result
+
+
+def CountObjects(value):
+  """Counts the containers and values making up a parsed response."""
+  if isinstance(value, zeep.xsd.CompoundValue):
+    # The object and the OrderedDict holding its values.
+    return 1 + CountObjects(value.__values__)
+  if isinstance(value, dict):
+    return 1 + sum(CountObjects(item) for item in value.values())
+  if isinstance(value, list):
+    return 1 + sum(CountObjects(item) for item in value)
+  return 1
+
+
+def Measure(parse, service, response, iterations):
+  parse(service, response)
+  start_time = time.time()
+  for _ in range(iterations):
+    parse(service, response)
+  seconds = (time.time() - start_time) / iterations
+
+  tracemalloc.start()
+  result = parse(service, response)
+  held_bytes, peak_bytes = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return seconds, CountObjects(result), held_bytes, peak_bytes
+
+
+if __name__ == '__main__':
+  result_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+  iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+  response = CreateResponse(result_count)
+  service = googleads.common.ZeepServiceProxy(
+      WSDL_PATH, mock.Mock(), None, googleads.common.ProxyConfig(), 100,
+      'benchmark', cache=googleads.common.ZeepServiceProxy.NO_CACHE)
+
+  print('Parsing %d saved queries (%d KB of XML)' % (
+      result_count, len(response.content) // 1024))
+  zeep_seconds = None
+  for label, parse in (('zeep objects', ParseWithZeep),
+                       ('dicts', ParseToDicts),
+                       ('streamed results', ParseStreamed)):
+    seconds, object_count, held_bytes, peak_bytes = Measure(
+        parse, service, response, iterations)
+    zeep_seconds = zeep_seconds or seconds
+    print('%s: %.1fms (%.1fx), %d objects, %d KB held, %d KB peak' % (
+        label, seconds * 1000, zeep_seconds / seconds, object_count,
+        held_bytes // 1024, peak_bytes // 1024))
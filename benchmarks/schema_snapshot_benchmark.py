@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#
+# Copyright 2026 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares cold service creation with and without a WSDL schema snapshot.
+
+Each iteration clears the in-memory WSDL document cache to simulate a new
+process, then either creates the service from the WSDL or from a snapshot. The
+zeep byte cache is disabled so that only parsing and loading are measured.
+
+Usage: schema_snapshot_benchmark.py [path_to_wsdl] [iterations]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+from unittest import mock
+
+import googleads.common
+
+DEFAULT_WSDL = os.path.join(
+    os.path.dirname(__file__), os.pardir, 'tests', 'test_data',
+    'ad_manager_report_service.xml')
+VERSION = 'benchmark'
+# Clients create their ProxyConfig once, so it is shared across iterations.
+PROXY_CONFIG = googleads.common.ProxyConfig()
+
+
+def CreateService(wsdl_path):
+  return googleads.common.ZeepServiceProxy(
+      wsdl_path, mock.Mock(), None, PROXY_CONFIG, 3600,
+      VERSION, cache=googleads.common.ZeepServiceProxy.NO_CACHE)
+
+
+def ColdCreate(wsdl_path):
+  googleads.common.InvalidateWsdlDocumentCache()
+  CreateService(wsdl_path)
+
+
+def ColdCreateFromSnapshot(wsdl_path, snapshot_path):
+  googleads.common.InvalidateWsdlDocumentCache()
+  googleads.common.LoadWsdlDocumentSnapshot(wsdl_path, VERSION, snapshot_path)
+  CreateService(wsdl_path)
+
+
+def main(wsdl_path, iterations):
+  snapshot_dir = tempfile.mkdtemp()
+  try:
+    snapshot_path = os.path.join(snapshot_dir, 'service.pickle')
+    googleads.common.SaveWsdlDocumentSnapshot(
+        CreateService(wsdl_path).zeep_client.wsdl, snapshot_path)
+
+    without_snapshot = timeit.timeit(
+        lambda: ColdCreate(wsdl_path), number=iterations) / iterations
+    with_snapshot = timeit.timeit(
+        lambda: ColdCreateFromSnapshot(wsdl_path, snapshot_path),
+        number=iterations) / iterations
+
+    print('WSDL: %s (%d bytes), snapshot: %d bytes' % (
+        wsdl_path, os.path.getsize(wsdl_path), os.path.getsize(snapshot_path)))
+    print('Cold service creation without snapshot: %.2f ms'
+          % (without_snapshot * 1000))
+    print('Cold service creation with snapshot:    %.2f ms'
+          % (with_snapshot * 1000))
+    print('Speedup: %.1fx' % (without_snapshot / with_snapshot))
+  finally:
+    shutil.rmtree(snapshot_dir)
+
+
+if __name__ == '__main__':
+  main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_WSDL,
+       int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -15,3 +15,4 @@
 """A client library for Google's SOAP Ads APIs."""
 
 from .ad_manager import AdManagerClient
+from .ad_manager import AsyncAdManagerClient
@@ -15,18 +15,47 @@
 """Client library for the Ad Manager API."""
 
 
+import codecs
+import collections
+import concurrent.futures
+import copy
 import csv
 import datetime
+import hashlib
+import io
+import itertools
+import json
 import logging
 import numbers
 import os
+import queue
+import random
+import re
+import shutil
 import sys
+import tempfile
+import threading
 import time
-from urllib.request import build_opener
+import warnings
+import weakref
+import zlib
 
 import pytz
+import requests.exceptions
+import urllib3.exceptions
+import zeep.helpers
 import googleads.common
 import googleads.errors
+import googleads.oauth2
+import googleads.util
+
+try:
+  import pyarrow
+  import pyarrow.compute
+  import pyarrow.csv
+  import pyarrow.parquet
+except ImportError:
+  pyarrow = None
 
 # The default application name.
 DEFAULT_APPLICATION_NAME = 'INSERT_APPLICATION_NAME_HERE'
@@ -34,12 +63,52 @@ DEFAULT_APPLICATION_NAME = 'INSERT_APPLICATION_NAME_HERE'
 DEFAULT_ENDPOINT = 'https://ads.google.com'
 # The suggested page limit per page fetched from the API.
 SUGGESTED_PAGE_LIMIT = 500
+# The warning of the deprecated DataDownloader.url_opener attribute.
+_URL_OPENER_DEPRECATION_MESSAGE = (
+    'DataDownloader.url_opener is deprecated and unused, since reports are '
+    'downloaded with http_session. It will be removed in the next major '
+    'release.')
 # The chunk size used for report downloads.
 _CHUNK_SIZE = 16 * 1024
+# The largest chunk size adaptive report downloads grow to.
+_MAX_CHUNK_SIZE = 1024 * 1024
+# The smallest byte range fetched by each connection of a report download.
+_MIN_RANGE_PART_SIZE = 1024 * 1024
+# The number of downloaded chunks StreamReportRows buffers ahead of parsing.
+_STREAM_PREFETCH_CHUNKS = 16
+# The errors after which a report download is resumed.
+_RESUMABLE_DOWNLOAD_ERRORS = (requests.exceptions.ConnectionError,
+                              requests.exceptions.ChunkedEncodingError,
+                              requests.exceptions.Timeout,
+                              urllib3.exceptions.HTTPError)
+# The default number of service clients memoized by each AdManagerClient.
+DEFAULT_SERVICE_CACHE_SIZE = 50
+# The default number of pages a StatementPager requests or buffers at a time.
+DEFAULT_PAGES_IN_FLIGHT = 4
+# The default number of entities BatchMutator sends per request.
+DEFAULT_MUTATE_BATCH_SIZE = 100
+# The default number of batches a BatchMutator has in flight at a time.
+DEFAULT_BATCHES_IN_FLIGHT = 4
+# The default number of completed reports RunReports downloads at a time.
+DEFAULT_REPORT_DOWNLOADS_IN_FLIGHT = 4
+# The default number of seconds a ReportCache keeps a report for.
+DEFAULT_REPORT_CACHE_TTL_SECONDS = 24 * 60 * 60
+# The earliest time zone on Earth, used to tell which report days may change.
+_EARLIEST_TIME_ZONE = pytz.FixedOffset(-12 * 60)
+# The bind variable holding the last key seen when paging by keyset.
+_KEYSET_BIND_VARIABLE = '__last_id'
+# The number of (time zone, date) UTC offsets memoized for date time values.
+_UTC_OFFSET_CACHE_SIZE = 4096
+# The proleptic Gregorian ordinal of the Unix epoch.
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
 
 
 _data_downloader_logger = logging.getLogger(
     '%s.%s' % (__name__, 'data_downloader'))
+_page_sizer_logger = logging.getLogger(
+    '%s.%s' % (__name__, 'page_sizer'))
+_batch_mutator_logger = logging.getLogger(
+    '%s.%s' % (__name__, 'batch_mutator'))
 
 
 # A giant dictionary of Ad Manager versions and the services they support.
@@ -227,6 +296,97 @@ _SERVICE_MAP = {
 }
 
 
+# The pytz time zones of PQL date times, by time zone ID.
+_time_zones = {}
+# The UTC offsets of whole days, by (time zone ID, year, month, day).
+_utc_offsets = googleads.util.LruCache(_UTC_OFFSET_CACHE_SIZE)
+
+
+def _GetTimeZone(time_zone_id):
+  """Returns the memoized pytz time zone for a time zone ID."""
+  time_zone = _time_zones.get(time_zone_id)
+  if time_zone is None:
+    time_zone = _time_zones[time_zone_id] = pytz.timezone(time_zone_id)
+  return time_zone
+
+
+def _GetTimeZoneId(value):
+  """Returns the time zone ID of a timezone aware datetime.
+
+  Args:
+    value: A datetime.datetime object.
+
+  Returns:
+    The ID of value's time zone, e.g. 'America/New_York'.
+
+  Raises:
+    GoogleAdsValueError: If value isn't timezone aware, or its time zone has no
+      ID.
+  """
+  if value.tzinfo is None:
+    raise googleads.errors.GoogleAdsValueError(
+        'Datetime %s is not timezone aware.' % value
+    )
+  # pytz time zones name their ID zone, zoneinfo time zones name it key.
+  time_zone_id = getattr(value.tzinfo, 'zone', None) or getattr(
+      value.tzinfo, 'key', None)
+  if time_zone_id is None:
+    raise googleads.errors.GoogleAdsValueError(
+        'Datetime %s does not have a time zone ID.' % value
+    )
+  return time_zone_id
+
+
+def _GetUtcOffset(time_zone_id, year, month, day):
+  """Returns the UTC offset a time zone keeps for a whole day.
+
+  Offsets are memoized per (time zone, date), so converting a date time costs a
+  lookup and some arithmetic rather than a pytz localization.
+
+  Args:
+    time_zone_id: The ID of the time zone, e.g. 'America/New_York'.
+    year: The year of the day.
+    month: The month of the day.
+    day: The day of the month.
+
+  Returns:
+    A tuple of the offset in seconds and its ISO 8601 suffix, e.g.
+    (-18000, '-05:00') or (0, 'Z'). Both are None if the offset changes during
+    the day, e.g. for daylight saving time transitions.
+  """
+  key = (time_zone_id, year, month, day)
+  utc_offset = _utc_offsets.Get(key)
+  if utc_offset is None:
+    time_zone = _GetTimeZone(time_zone_id)
+    start = time_zone.localize(datetime.datetime(year, month, day))
+    end = time_zone.localize(datetime.datetime(year, month, day, 23, 59, 59))
+    if start.utcoffset() != end.utcoffset():
+      utc_offset = (None, None)
+    else:
+      suffix = start.isoformat()[19:]
+      if suffix[-5:] == '00:00':
+        suffix = suffix[:-6] + 'Z'
+      utc_offset = (int(start.utcoffset().total_seconds()), suffix)
+    _utc_offsets.Set(key, utc_offset)
+  return utc_offset
+
+
+def _PackDate(value):
+  """Packs a date into an Ad Manager Date dict."""
+  return {'year': value.year, 'month': value.month, 'day': value.day}
+
+
+def _PackDateTime(value):
+  """Packs a timezone aware datetime into an Ad Manager DateTime dict."""
+  return {
+      'date': _PackDate(value),
+      'hour': value.hour,
+      'minute': value.minute,
+      'second': value.second,
+      'timeZoneId': _GetTimeZoneId(value),
+  }
+
+
 class AdManagerClient(googleads.common.CommonClient):
   """A central location to set headers and create web service clients.
 
@@ -296,7 +456,11 @@ class AdManagerClient(googleads.common.CommonClient):
   def __init__(self, oauth2_client, application_name, network_code=None,
                cache=None, proxy_config=None, timeout=3600,
                custom_http_headers=None,
-               enable_compression=False):
+               enable_compression=False,
+               service_cache_size=DEFAULT_SERVICE_CACHE_SIZE,
+               schema_snapshot_dir=None,
+               http_pool_size=googleads.common.DEFAULT_HTTP_POOL_SIZE,
+               http_keep_alive=True):
     """Initializes a AdManagerClient.
 
     For more information on these arguments, see our SOAP headers guide:
@@ -322,6 +486,17 @@ class AdManagerClient(googleads.common.CommonClient):
       enable_compression: A boolean indicating if you want to enable compression
         of the SOAP response. If True, the SOAP response will use gzip
         compression, and will be decompressed for you automatically.
+      service_cache_size: An integer specifying how many service clients
+        GetService keeps for reuse. Pass 0 to create a new service client on
+        every call.
+      schema_snapshot_dir: A string path to a directory written by
+        BuildSchemaSnapshot. Service clients load their parsed WSDL from it
+        when available instead of downloading and parsing the WSDL.
+      http_pool_size: An integer specifying the maximum number of connections
+        kept open per host by the connection pool shared by SOAP requests,
+        report downloads and OAuth2 refreshes.
+      http_keep_alive: A boolean indicating whether connections of the shared
+        connection pool are kept open and reused between requests.
     """
     super(AdManagerClient, self).__init__()
 
@@ -339,16 +514,36 @@ class AdManagerClient(googleads.common.CommonClient):
         self, enable_compression, custom_http_headers)
     self.proxy_config = (proxy_config if proxy_config
                          else googleads.common.ProxyConfig())
+    # A single connection pool lets all services, report downloads and token
+    # refreshes share TCP/TLS connections. SOAP requests get a session of their
+    # own, since zeep changes the headers and adapters of the session it uses.
+    self._http_pool_size = http_pool_size
+    self._http_keep_alive = http_keep_alive
+    self.http_session = self.proxy_config.BuildSession(
+        http_pool_size, http_keep_alive)
+    self._soap_http_session = self.proxy_config.BuildSession(
+        http_pool_size, http_keep_alive,
+        adapter=self.http_session.get_adapter('https://'))
 
     if enable_compression:
       self.application_name = '%s (gzip)' % self.application_name
 
     self.timeout = timeout
+    self._service_cache = googleads.util.LruCache(service_cache_size)
+    self.schema_snapshot_dir = schema_snapshot_dir
 
   def GetService(self, service_name, version=sorted(_SERVICE_MAP.keys())[-1],
-                 server=None):
+                 server=None,
+                 response_mode=googleads.common.RESPONSE_MODE_ZEEP):
     """Creates a service client for the given service.
 
+    Service clients are memoized per service name, version, server, and
+    response mode. They read the network code, application name, and OAuth2
+    client from this AdManagerClient on every request, so changes to those
+    attributes apply to service clients that were already returned. Call
+    ClearServiceCache after changing the cache, proxy_config or timeout
+    attributes.
+
     Args:
       service_name: A string identifying which Ad Manager service to create a
           service client for.
@@ -358,29 +553,41 @@ class AdManagerClient(googleads.common.CommonClient):
           updated in future releases to point to what is then the
           latest version.
       server: A string identifying the webserver hosting the Ad Manager API.
+      response_mode: How the service client deserializes responses. Use
+          googleads.common.RESPONSE_MODE_DICT to receive dicts and lists
+          instead of zeep objects, which is faster for large responses, or
+          googleads.common.RESPONSE_MODE_STREAM to also receive pages as a
+          googleads.common.StreamedPage whose results are parsed as they're
+          iterated over.
 
     Returns:
       A googleads.common.GoogleSoapService instance which has the headers
       and proxy configured for use.
 
     Raises:
-      A GoogleAdsValueError if the service or version provided do not exist.
+      A GoogleAdsValueError if the service, version, or response mode provided
+      do not exist.
     """
     if not server:
       server = DEFAULT_ENDPOINT
 
     server = server[:-1] if server[-1] == '/' else server
 
+    cache_key = (service_name, version, server, response_mode)
+    service = self._service_cache.Get(cache_key)
+    if service is not None:
+      return service
+
+    endpoint = self._SOAP_SERVICE_FORMAT % (server, version, service_name)
+    if self.schema_snapshot_dir:
+      googleads.common.LoadWsdlDocumentSnapshot(
+          endpoint, version, self._GetSchemaSnapshotPath(
+              self.schema_snapshot_dir, service_name, version))
+
     try:
-      service = googleads.common.GetServiceClassForLibrary()(
-          self._SOAP_SERVICE_FORMAT % (server, version, service_name),
-          self._header_handler,
-          _AdManagerPacker,
-          self.proxy_config,
-          self.timeout,
-          version,
-          cache=self.cache)
+      service = self._CreateService(endpoint, version, response_mode)
 
+      self._service_cache.Set(cache_key, service)
       return service
     except googleads.errors.GoogleAdsSoapTransportError:
       if version in _SERVICE_MAP:
@@ -396,12 +603,81 @@ class AdManagerClient(googleads.common.CommonClient):
             'Unrecognized version of the Ad Manager API. Version given: %s '
             'Supported versions: %s' % (version, _SERVICE_MAP.keys()))
 
+  def _CreateService(self, endpoint, version, response_mode):
+    """Creates a new service client for a WSDL endpoint.
+
+    Args:
+      endpoint: A string URL of the service's WSDL.
+      version: A string identifying the Ad Manager version of the service.
+      response_mode: A string identifying how responses are deserialized.
+
+    Returns:
+      A googleads.common.GoogleSoapService instance.
+    """
+    return googleads.common.GetServiceClassForLibrary()(
+        endpoint,
+        self._header_handler,
+        _AdManagerPacker,
+        self.proxy_config,
+        self.timeout,
+        version,
+        cache=self.cache,
+        http_session=self._soap_http_session,
+        response_mode=response_mode)
+
+  def BuildSchemaSnapshot(self, snapshot_dir,
+                          version=sorted(_SERVICE_MAP.keys())[-1],
+                          server=None, service_names=None):
+    """Writes the parsed WSDL of each service to a snapshot directory.
+
+    Short-lived processes can pass the directory as schema_snapshot_dir to skip
+    downloading and parsing WSDLs on their first GetService calls. Snapshots
+    are only compatible with the library and zeep versions that created them,
+    so rebuild them after upgrading.
+
+    Args:
+      snapshot_dir: A string path to the directory to write snapshots to.
+      [optional]
+      version: A string identifying the Ad Manager version to snapshot. This
+          defaults to what is currently the latest version.
+      server: A string identifying the webserver hosting the Ad Manager API.
+      service_names: A list of service names to snapshot. This defaults to all
+          services supported by the version.
+
+    Returns:
+      A list of the snapshot file paths that were written.
+
+    Raises:
+      A GoogleAdsValueError if the version provided does not exist.
+    """
+    if version not in _SERVICE_MAP:
+      raise googleads.errors.GoogleAdsValueError(
+          'Unrecognized version of the Ad Manager API. Version given: %s '
+          'Supported versions: %s' % (version, _SERVICE_MAP.keys()))
+
+    paths = []
+    for service_name in service_names or _SERVICE_MAP[version]:
+      service = self.GetService(service_name, version, server)
+      path = self._GetSchemaSnapshotPath(snapshot_dir, service_name, version)
+      googleads.common.SaveWsdlDocumentSnapshot(service.zeep_client.wsdl, path)
+      paths.append(path)
+    return paths
+
+  @classmethod
+  def _GetSchemaSnapshotPath(cls, snapshot_dir, service_name, version):
+    """Returns the path of the schema snapshot file for a service."""
+    return os.path.join(snapshot_dir, version, '%s.pickle' % service_name)
+
+  def ClearServiceCache(self):
+    """Discards all service clients memoized by GetService."""
+    self._service_cache.Invalidate()
+
   def GetDataDownloader(self, version=sorted(_SERVICE_MAP.keys())[-1],
-                        server=None):
+                        server=None, report_cache=None):
     """Creates a downloader for Ad Manager reports and PQL result sets.
 
     This is a convenience method. It is functionally identical to calling
-    DataDownloader(ad_manager_client, version, server)
+    DataDownloader(ad_manager_client, version, server, report_cache)
 
     Args:
       [optional]
@@ -410,6 +686,7 @@ class AdManagerClient(googleads.common.CommonClient):
           updated in future releases to point to what is then the
           latest version.
       server: A string identifying the webserver hosting the Ad Manager API.
+      report_cache: A ReportCache used by RunReportToFile.
 
     Returns:
       A DataDownloader tied to this AdManagerClient, ready to download reports.
@@ -417,7 +694,93 @@ class AdManagerClient(googleads.common.CommonClient):
     if not server:
       server = DEFAULT_ENDPOINT
 
-    return DataDownloader(self, version, server)
+    return DataDownloader(self, version, server, report_cache)
+
+
+class AsyncAdManagerClient(AdManagerClient):
+  """An AdManagerClient whose service clients have awaitable methods.
+
+  Services returned by GetService send requests with httpx through a connection
+  pool shared by this client, so many requests can be in flight from a single
+  thread:
+
+    async with AsyncAdManagerClient.LoadFromStorage() as client:
+      service = client.GetService('LineItemService')
+      pages = await asyncio.gather(*[
+          service.getLineItemsByStatement(statement)
+          for statement in statements])
+
+  Creating a service still loads its WSDL synchronously. This requires the
+  httpx package and zeep 4.0.0 or later, available through
+  "pip install googleads[async]".
+  """
+
+  def __init__(self, *args, **kwargs):
+    """Initializes an AsyncAdManagerClient.
+
+    Takes the same arguments as AdManagerClient.
+
+    Raises:
+      GoogleAdsError: If httpx or zeep 4.0.0 or later is not installed.
+    """
+    super(AsyncAdManagerClient, self).__init__(*args, **kwargs)
+    self.async_http_client = self.proxy_config.BuildAsyncClient(
+        self._http_pool_size, self._http_keep_alive, timeout=self.timeout)
+    # The services created by this client, which are closed with it.
+    self._services = weakref.WeakSet()
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, exc_type, exc_value, traceback):
+    await self.Close()
+
+  async def Close(self):
+    """Closes the connections used by this client's services."""
+    for service in list(self._services):
+      await service.Close()
+    await self.async_http_client.aclose()
+
+  def _CreateService(self, endpoint, version, response_mode):
+    """Creates a new asynchronous service client for a WSDL endpoint.
+
+    Args:
+      endpoint: A string URL of the service's WSDL.
+      version: A string identifying the Ad Manager version of the service.
+      response_mode: A string identifying how responses are deserialized.
+
+    Returns:
+      A googleads.common.ZeepAsyncServiceProxy instance.
+
+    Raises:
+      GoogleAdsValueError: If responses aren't deserialized into zeep objects.
+    """
+    if response_mode != googleads.common.RESPONSE_MODE_ZEEP:
+      raise googleads.errors.GoogleAdsValueError(
+          'Asynchronous service clients only support the %s response mode.'
+          % googleads.common.RESPONSE_MODE_ZEEP)
+    service = googleads.common.GetAsyncServiceClassForLibrary()(
+        endpoint,
+        self._header_handler,
+        _AdManagerPacker,
+        self.proxy_config,
+        self.timeout,
+        version,
+        cache=self.cache,
+        http_client=self.async_http_client)
+    self._services.add(service)
+    return service
+
+  def GetDataDownloader(self, version=sorted(_SERVICE_MAP.keys())[-1],
+                        server=None, report_cache=None):
+    """Not supported, since DataDownloader requires blocking service calls.
+
+    Raises:
+      GoogleAdsError: Always. Use an AdManagerClient to download data.
+    """
+    raise googleads.errors.GoogleAdsError(
+        'DataDownloader is not supported by AsyncAdManagerClient. Use an '
+        'AdManagerClient instead.')
 
 
 class _AdManagerHeaderHandler(googleads.common.HeaderHandler):
@@ -457,20 +820,38 @@ class _AdManagerHeaderHandler(googleads.common.HeaderHandler):
     Returns:
       A SOAP object containing the headers.
     """
-    header = create_method(self._SOAP_HEADER_CLASS)
-    header.networkCode = self._ad_manager_client.network_code
-    header.applicationName = ''.join([
-        self._ad_manager_client.application_name,
-        googleads.common.GenerateLibSig(self._PRODUCT_SIG)])
+    type_name, element_values = self.GetSOAPHeaderValues()
+    header = create_method(type_name)
+    for name, value in element_values:
+      setattr(header, name, value)
     return header
 
+  def GetSOAPHeaderValues(self):
+    """Returns the values of the SOAP headers required for authorization.
+
+    Returns:
+      A tuple of the SOAP header type name and a tuple of (element name, value)
+      pairs.
+    """
+    return (self._SOAP_HEADER_CLASS, (
+        ('networkCode', self._ad_manager_client.network_code),
+        ('applicationName', ''.join([
+            self._ad_manager_client.application_name,
+            googleads.common.GenerateLibSig(self._PRODUCT_SIG)]))))
+
   def GetHTTPHeaders(self):
     """Returns the HTTP headers required for request authorization.
 
     Returns:
       A dictionary containing the required headers.
     """
-    http_headers = self._ad_manager_client.oauth2_client.CreateHttpHeader()
+    oauth2_client = self._ad_manager_client.oauth2_client
+    if isinstance(oauth2_client,
+                  googleads.oauth2.GoogleRefreshableOAuth2Client):
+      http_headers = oauth2_client.CreateHttpHeader(
+          http_session=self._ad_manager_client.http_session)
+    else:
+      http_headers = oauth2_client.CreateHttpHeader()
     if self.enable_compression:
       http_headers['accept-encoding'] = 'gzip'
 
@@ -512,19 +893,9 @@ class _AdManagerPacker(googleads.common.SoapPacker):
     """
 
     if isinstance(value, datetime.datetime):
-      if value.tzinfo is None:
-        raise googleads.errors.GoogleAdsValueError(
-            'Datetime %s is not timezone aware.' % value
-        )
-      return {
-          'date': cls.AdManagerDateTimePacker(value.date(), version),
-          'hour': value.hour,
-          'minute': value.minute,
-          'second': value.second,
-          'timeZoneId': value.tzinfo.zone,
-      }
+      return _PackDateTime(value)
     elif isinstance(value, datetime.date):
-      return {'year': value.year, 'month': value.month, 'day': value.day}
+      return _PackDate(value)
 
 
 @googleads.common.RegisterUtility('StatementBuilder')
@@ -553,6 +924,7 @@ class StatementBuilder(object):
   _ORDER_BY_PART = 'ORDER BY %s'
   _LIMIT_PART = 'LIMIT %s'
   _OFFSET_PART = 'OFFSET %s'
+  _KEYSET_PART = '%s > :' + _KEYSET_BIND_VARIABLE
 
   def __init__(self, select_columns=None, from_table=None, where=None,
                order_by=None, order_ascending=True,
@@ -585,6 +957,8 @@ class StatementBuilder(object):
     else:
       self._order_by = None
     self._values = {}  # Use a dict to prevent duplicates
+    self.keyset_column = None
+    self.last_key = None
 
   def ToStatement(self):
     """Builds a PQL string from the current state.
@@ -604,21 +978,40 @@ class StatementBuilder(object):
     if self._select:
       query.append(self._SELECT_PART % (self._select, self._from_))
 
-    if self._where:
-      query.append(self._WHERE_PART % self._where)
+    where = self._where
+    order_by = self._order_by
+    values = self._values
 
-    if self._order_by:
-      query.append(self._ORDER_BY_PART % self._order_by)
+    if self.keyset_column:
+      if order_by and (order_by.column != self.keyset_column
+                       or not order_by.ascending):
+        raise googleads.errors.GoogleAdsError(
+            'ORDER BY must be the ascending keyset column when paging by '
+            'keyset.')
+
+      order_by = self._OrderByPair(column=self.keyset_column, ascending=True)
+      if self.last_key is not None:
+        keyset_clause = self._KEYSET_PART % self.keyset_column
+        where = '(%s) AND %s' % (where, keyset_clause) if where else (
+            keyset_clause)
+        values = dict(values)
+        values[_KEYSET_BIND_VARIABLE] = self.last_key
+
+    if where:
+      query.append(self._WHERE_PART % where)
+
+    if order_by:
+      query.append(self._ORDER_BY_PART % order_by)
 
     if self.limit:
       query.append(self._LIMIT_PART % self.limit)
 
-    if self.offset is not None:
+    if self.offset is not None and not self.keyset_column:
       query.append(self._OFFSET_PART % self.offset)
 
     return {'query': ' '.join(query),
             'values': (PQLHelper.GetQueryValuesFromDict(
-                self._values, self._version) if self._values else None)}
+                values, self._version) if values else None)}
 
   def Select(self, columns):
     """Adds a SELECT clause.
@@ -694,6 +1087,24 @@ class StatementBuilder(object):
                                        ascending=ascending)
     return self
 
+  def KeysetPaginate(self, column='id'):
+    """Pages by keyset rather than by offset.
+
+    The statement is ordered by the given column, and once last_key is set only
+    rows with a greater value in that column are selected. This keeps the cost
+    of each page constant and prevents rows from being skipped or repeated if
+    the data changes between pages. The OFFSET clause is omitted.
+
+    Args:
+      column: A string specifying a unique, ordered column to page by.
+
+    Returns:
+      A reference to the StatementBuilder.
+    """
+    self.keyset_column = column
+    self.last_key = None
+    return self
+
   def WithBindVariable(self, key, value):
     """Binds a value to a variable in the statement.
 
@@ -760,34 +1171,9 @@ class PQLHelper(object):
     # It's important that datetime is checked for before date
     # because isinstance(datetime.datetime.now(), datetime.date) is True
     elif isinstance(value, datetime.datetime):
-      if value.tzinfo is None:
-        raise googleads.errors.GoogleAdsValueError(
-            'Datetime %s is not timezone aware.' % value
-        )
-
-      return {
-          'xsi_type': 'DateTimeValue',
-          'value': {
-              'date': {
-                  'year': value.year,
-                  'month': value.month,
-                  'day': value.day,
-              },
-              'hour': value.hour,
-              'minute': value.minute,
-              'second': value.second,
-              'timeZoneId': value.tzinfo.zone,
-          }
-      }
+      return {'xsi_type': 'DateTimeValue', 'value': _PackDateTime(value)}
     elif isinstance(value, datetime.date):
-      return {
-          'xsi_type': 'DateValue',
-          'value': {
-              'year': value.year,
-              'month': value.month,
-              'day': value.day,
-          }
-      }
+      return {'xsi_type': 'DateValue', 'value': _PackDate(value)}
     elif isinstance(value, list):
       if value and not all(isinstance(x, type(value[0])) for x in value):
         raise googleads.errors.GoogleAdsValueError('Cannot pass more than one '
@@ -825,168 +1211,2168 @@ class FilterStatement(object):
             'values': self.values}
 
 
-class DataDownloader(object):
-  """A utility that can be used to download reports and PQL result sets."""
+class AdaptivePageSizer(object):
+  """Adapts the page size of a paged query to the observed responses.
 
-  def __init__(self, ad_manager_client, version=sorted(_SERVICE_MAP.keys())[-1],
-               server=None):
-    """Initializes a DataDownloader.
+  The page size grows while full pages are returned well within the target
+  latency, and shrinks when a page is slower than the target, has more values
+  than allowed, or times out. It is kept within [min_page_size, max_page_size],
+  and after a timeout it no longer grows beyond the reduced page size.
+  """
+
+  def __init__(self, initial_page_size=SUGGESTED_PAGE_LIMIT, min_page_size=100,
+               max_page_size=5000, target_latency_seconds=10.0,
+               max_page_values=None, growth_factor=2.0, shrink_factor=0.5):
+    """Initializes an AdaptivePageSizer.
 
     Args:
-      ad_manager_client: The AdManagerClient whose attributes will be used to
-          authorize your report download and PQL query requests.
       [optional]
-      version: A string identifying the Ad Manager version to connect to.
-          This defaults to what is currently the latest version. This will be
-          updated in future releases to point to what is then the
-          latest version.
-      server: A string identifying the webserver hosting the Ad Manager API.
+      initial_page_size: An integer specifying the first page size.
+      min_page_size: An integer specifying the smallest page size.
+      max_page_size: An integer specifying the largest page size.
+      target_latency_seconds: A float specifying the response time pages
+          should stay under. Pages are only grown when they take less than
+          half of it.
+      max_page_values: An integer specifying the maximum number of values,
+          e.g. rows times columns of a PQL result set, a page should hold. If
+          None, the payload size is not taken into account.
+      growth_factor: A float greater than 1 by which the page size grows.
+      shrink_factor: A float between 0 and 1 by which the page size shrinks.
+
+    Raises:
+      GoogleAdsValueError: If the arguments are inconsistent.
     """
-    if not server:
-      server = DEFAULT_ENDPOINT
+    if not 0 < min_page_size <= initial_page_size <= max_page_size:
+      raise googleads.errors.GoogleAdsValueError(
+          'Page sizes must satisfy 0 < min_page_size <= initial_page_size <= '
+          'max_page_size.')
+    if growth_factor <= 1 or not 0 < shrink_factor < 1:
+      raise googleads.errors.GoogleAdsValueError(
+          'growth_factor must be greater than 1 and shrink_factor must be '
+          'between 0 and 1.')
+
+    self.min_page_size = min_page_size
+    self.max_page_size = max_page_size
+    self.target_latency_seconds = target_latency_seconds
+    self.max_page_values = max_page_values
+    self._growth_factor = growth_factor
+    self._shrink_factor = shrink_factor
+    self._page_size = initial_page_size
+    self._page_size_ceiling = max_page_size
+    self._lock = threading.Lock()
+    self._metrics = collections.Counter()
+    self._latency_seconds = 0.0
+
+  @property
+  def page_size(self):
+    """The page size to use for the next request."""
+    return self._page_size
+
+  def RecordPage(self, page_size, row_count, latency_seconds,
+                 value_count=None):
+    """Records a fetched page and adjusts the page size.
 
-    if server[-1] == '/':
-      server = server[:-1]
+    Args:
+      page_size: An integer specifying the page size the page was requested
+          with.
+      row_count: An integer specifying the number of rows in the page.
+      latency_seconds: A float specifying how long the request took.
+      [optional]
+      value_count: An integer specifying the number of values in the page.
 
-    self._ad_manager_client = ad_manager_client
-    self._version = version
-    self._server = server
-    self._report_service = None
-    self._pql_service = None
-    self.proxy_config = self._ad_manager_client.proxy_config
-    handlers = self.proxy_config.GetHandlers()
-    self.url_opener = build_opener(*handlers)
+    Returns:
+      The page size to use for the next request.
+    """
+    with self._lock:
+      self._metrics['pages'] += 1
+      self._metrics['rows'] += row_count
+      self._latency_seconds += latency_seconds
+
+      if latency_seconds > self.target_latency_seconds:
+        return self._Resize(self._shrink_factor, 'slow page')
+      elif (self.max_page_values is not None and value_count is not None
+            and value_count > self.max_page_values):
+        return self._Resize(self._shrink_factor, 'large page')
+      elif (row_count >= page_size
+            and latency_seconds < self.target_latency_seconds / 2):
+        return self._Resize(self._growth_factor, 'fast page')
+      return self._page_size
+
+  def RecordTimeout(self):
+    """Records a timed out request and shrinks the page size.
 
-    if self._ad_manager_client.custom_http_headers:
-      self.url_opener.addheaders.extend(
-          self._ad_manager_client.custom_http_headers.items())
+    Returns:
+      True if the page size was reduced and the request should be retried,
+      False if it is already the minimum page size.
+    """
+    with self._lock:
+      self._metrics['timeouts'] += 1
+      previous_page_size = self._page_size
+      self._page_size_ceiling = self._Resize(self._shrink_factor, 'timeout')
+      return self._page_size_ceiling < previous_page_size
+
+  def GetMetrics(self):
+    """Returns a dict of metrics describing the decisions made so far.
+
+    The dict contains the current page_size, the number of pages, rows and
+    timeouts recorded, the number of times the page size was increased or
+    decreased, and the average_latency_seconds of the recorded pages.
+    """
+    with self._lock:
+      metrics = {key: self._metrics[key] for key in (
+          'pages', 'rows', 'timeouts', 'increases', 'decreases')}
+      metrics['page_size'] = self._page_size
+      metrics['average_latency_seconds'] = (
+          self._latency_seconds / metrics['pages'] if metrics['pages'] else
+          0.0)
+      return metrics
+
+  def _Resize(self, factor, reason):
+    """Scales the page size by a factor within the configured bounds."""
+    page_size = max(self.min_page_size, min(
+        self._page_size_ceiling, int(self._page_size * factor)))
+    if page_size != self._page_size:
+      self._metrics['increases' if page_size > self._page_size else
+                    'decreases'] += 1
+      _page_sizer_logger.debug('Changing page size from %d to %d after %s.',
+                               self._page_size, page_size, reason)
+      self._page_size = page_size
+    return page_size
+
+
+@googleads.common.RegisterUtility('StatementPager')
+class StatementPager(object):
+  """Fetches the pages of a get*ByStatement query concurrently.
+
+  The first page is fetched to learn the total result set size, then the
+  remaining pages are fetched on a bounded thread pool. At most
+  max_pages_in_flight pages are being requested or waiting to be consumed at a
+  time, so memory use stays bounded even if pages are consumed slowly.
+
+  If the StatementBuilder pages by keyset, or a page sizer is used, each page
+  depends on the one before it, so pages are fetched one at a time with the
+  next page prefetched while the current one is consumed.
+  """
 
-  def _GetReportService(self):
-    """Lazily initializes a report service client."""
-    if not self._report_service:
-      self._report_service = self._ad_manager_client.GetService(
-          'ReportService', self._version, self._server)
-    return self._report_service
+  def __init__(self, method, statement_builder,
+               max_pages_in_flight=DEFAULT_PAGES_IN_FLIGHT, page_sizer=None):
+    """Initializes a StatementPager.
 
-  def _GetPqlService(self):
-    """Lazily initializes a PQL service client."""
-    if not self._pql_service:
-      self._pql_service = self._ad_manager_client.GetService(
-          'PublisherQueryLanguageService', self._version, self._server)
-    return self._pql_service
+    Args:
+      method: A get*ByStatement method of a service, e.g.
+          line_item_service.getLineItemsByStatement.
+      statement_builder: A StatementBuilder or FilterStatement for the query.
+          Its limit is used as the page size and its offset as the start of the
+          result set. It is not modified.
+      [optional]
+      max_pages_in_flight: An integer specifying the maximum number of pages
+          requested or buffered at a time.
+      page_sizer: An AdaptivePageSizer used to choose the limit of each page
+          instead of the limit of the statement_builder. Timed out requests
+          are retried with a smaller page until its minimum page size.
 
-  def WaitForReport(self, report_job, poll_time_seconds=30):
-    """Runs a report, then waits (blocks) for the report to finish generating.
+    Raises:
+      GoogleAdsValueError: If max_pages_in_flight is less than 1.
+    """
+    if max_pages_in_flight < 1:
+      raise googleads.errors.GoogleAdsValueError(
+          'max_pages_in_flight must be at least 1.')
+
+    self._method = method
+    self._statement_builder = statement_builder
+    self._max_pages_in_flight = max_pages_in_flight
+    self._page_sizer = page_sizer
+
+  def GetPages(self, ordered=True):
+    """Yields the pages of the result set.
 
     Args:
-      report_job: The report job to wait for. This may be a dictionary or an
-          instance of the SOAP ReportJob class.
-      poll_time_seconds: The number of seconds to wait between calls to
-          getReportJobStatus. Defaults to 30 seconds.
+      [optional]
+      ordered: A boolean indicating whether pages are yielded in offset order.
+          If False, pages are yielded as soon as they are fetched; use their
+          startIndex to place them.
 
-    Returns:
-      The completed report job's ID as a string.
+    Yields:
+      The page objects returned by the method, each with totalResultSetSize,
+      startIndex and results.
+    """
+    if self._page_sizer or getattr(self._statement_builder, 'keyset_column',
+                                   None):
+      for page in self._GetSequentialPages():
+        yield page
+      return
+
+    page_size = self._statement_builder.limit
+    start_offset = self._statement_builder.offset or 0
+
+    first_page = self._FetchPage(self._GetStatement(start_offset))
+    total_result_set_size = first_page['totalResultSetSize'] or 0
+    if not page_size or start_offset + page_size >= total_result_set_size:
+      yield first_page
+      return
+
+    statements = (self._GetStatement(offset) for offset in range(
+        start_offset + page_size, total_result_set_size, page_size))
+
+    with concurrent.futures.ThreadPoolExecutor(
+        self._max_pages_in_flight) as executor:
+      # The following pages are requested before the first page is yielded,
+      # so that they are fetched while the caller processes it.
+      pending = collections.deque(
+          executor.submit(self._FetchPage, statement) for statement
+          in itertools.islice(statements, self._max_pages_in_flight))
+      try:
+        yield first_page
+        while pending:
+          if ordered:
+            future = pending.popleft()
+          else:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            future = done.pop()
+            pending.remove(future)
+
+          page = future.result()
+          statement = next(statements, None)
+          if statement is not None:
+            pending.append(executor.submit(self._FetchPage, statement))
+          yield page
+      finally:
+        for future in pending:
+          future.cancel()
+
+  def _GetSequentialPages(self):
+    """Yields the pages of a result set whose requests depend on each other."""
+    keyset_column = getattr(self._statement_builder, 'keyset_column', None)
+    offset = self._statement_builder.offset or 0
+    last_key = getattr(self._statement_builder, 'last_key', None)
+
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+      future = executor.submit(self._FetchSizedPage, offset, last_key)
+      try:
+        while future:
+          page, page_size, seconds = future.result()
+          future = None
+          streamed = isinstance(page, googleads.common.StreamedPage)
+          if streamed:
+            # The results of a streamed page are only known once they have been
+            # parsed, so the next page is requested after the page has been
+            # consumed. Results the caller skipped are parsed and dropped.
+            yield page
+            for _ in page:
+              pass
+            result_count, last_result = page.result_count, page.last_result
+          else:
+            results = page['results'] if 'results' in page else None
+            result_count = len(results or [])
+            last_result = results[-1] if results else None
+
+          if self._page_sizer:
+            self._page_sizer.RecordPage(page_size, result_count, seconds)
+          if result_count and page_size and result_count == page_size:
+            if keyset_column:
+              last_key = last_result[keyset_column]
+            else:
+              offset += page_size
+            future = executor.submit(self._FetchSizedPage, offset, last_key)
+          if not streamed:
+            yield page
+      finally:
+        if future:
+          future.cancel()
+
+  def _FetchSizedPage(self, offset, last_key):
+    """Fetches the page at an offset or after a key.
 
-    Raises:
-      An AdManagerReportError if the report job fails to complete.
+    Returns:
+      A tuple of the page, its page size, and the seconds taken to fetch it.
     """
-    service = self._GetReportService()
-    report_job_id = service.runReportJob(report_job)['id']
+    while True:
+      statement_builder = copy.copy(self._statement_builder)
+      statement_builder.offset = offset
+      if getattr(statement_builder, 'keyset_column', None):
+        statement_builder.last_key = last_key
+      if self._page_sizer:
+        statement_builder.limit = self._page_sizer.page_size
+
+      start_time = time.time()
+      try:
+        page = self._FetchPage(statement_builder.ToStatement())
+      except requests.exceptions.Timeout:
+        if self._page_sizer and self._page_sizer.RecordTimeout():
+          continue
+        raise
+      return page, statement_builder.limit, time.time() - start_time
+
+  def GetEntities(self):
+    """Yields the entities of the result set, page by page in offset order.
+
+    Yields:
+      The entities in the results of each page.
+    """
+    for page in self.GetPages():
+      if 'results' in page and page['results']:
+        for entity in page['results']:
+          yield entity
 
-    status = service.getReportJobStatus(report_job_id)
+  def _GetStatement(self, offset):
+    """Returns the statement for the page starting at the given offset."""
+    statement_builder = copy.copy(self._statement_builder)
+    statement_builder.offset = offset
+    return statement_builder.ToStatement()
 
-    while status != 'COMPLETED' and status != 'FAILED':
-      _data_downloader_logger.debug('Report job status: %s', status)
-      time.sleep(poll_time_seconds)
-      status = service.getReportJobStatus(report_job_id)
+  def _FetchPage(self, statement):
+    """Fetches the page of results for a statement."""
+    return self._method(statement)
 
-    if status == 'FAILED':
-      raise googleads.errors.AdManagerReportError(report_job_id)
-    else:
-      _data_downloader_logger.debug('Report has completed successfully')
-      return report_job_id
 
-  def DownloadReportToFile(self, report_job_id, export_format, outfile,
-                           include_report_properties=False,
-                           include_totals_row=None, use_gzip_compression=True):
-    """Downloads report data and writes it to a file.
+def IterateByStatement(method, statement_builder, max_pages_in_flight=1,
+                       page_sizer=None):
+  """Lazily yields the entities matching a get*ByStatement query.
 
-    The report job must be completed before calling this function.
+  The next pages are fetched in the background while the current page is being
+  processed, so only the current page and at most max_pages_in_flight further
+  pages are held in memory.
 
-    Args:
-      report_job_id: The ID of the report job to wait for, as a string.
-      export_format: The export format for the report file, as a string.
-      outfile: A writeable, file-like object to write to.
-      include_report_properties: Whether or not to include the report
-        properties (e.g. network, user, date generated...)
-        in the generated report.
-      include_totals_row: Whether or not to include the totals row.
-      use_gzip_compression: Whether or not to use gzip compression.
-    """
-    service = self._GetReportService()
+  Args:
+    method: A get*ByStatement method of a service, e.g.
+        line_item_service.getLineItemsByStatement.
+    statement_builder: A StatementBuilder or FilterStatement for the query. Its
+        limit is used as the page size. It is not modified.
+    [optional]
+    max_pages_in_flight: An integer specifying the maximum number of pages
+        fetched ahead of the current one.
+    page_sizer: An AdaptivePageSizer used to choose the limit of each page.
 
-    if include_totals_row is None:  # True unless CSV export if not specified
-      include_totals_row = True if export_format != 'CSV_DUMP' else False
-    opts = {
-        'exportFormat': export_format,
-        'includeReportProperties': include_report_properties,
-        'includeTotalsRow': include_totals_row,
-        'useGzipCompression': use_gzip_compression
-    }
-    report_url = service.getReportDownloadUrlWithOptions(report_job_id, opts)
-    _data_downloader_logger.info('Request Summary: Report job ID: %s, %s',
-                                 report_job_id, opts)
-    _data_downloader_logger.info('Report URL: %s', report_url)
-    response = self.url_opener.open(report_url)
+  Returns:
+    A generator yielding the entities of the result set in order.
+  """
+  return StatementPager(method, statement_builder, max_pages_in_flight,
+                        page_sizer).GetEntities()
 
-    _data_downloader_logger.debug(
-        'Incoming response: %s %s REDACTED REPORT DATA', response.code,
-        response.msg)
 
-    while True:
-      chunk = response.read(_CHUNK_SIZE)
-      if not chunk: break
-      outfile.write(chunk)
+class MutateResult(object):
+  """The outcome of mutating one of the entities passed to a BatchMutator.
 
-  def DownloadPqlResultToList(self, pql_query, values=None):
-    """Downloads the results of a PQL query to a list.
+  Attributes:
+    entity: The entity that was sent, as passed to BatchMutator.Mutate.
+    result: The entity returned by the service, or None if it failed.
+    error: The exception the entity failed with, or None if it succeeded.
+  """
+
+  def __init__(self, entity, result=None, error=None):
+    self.entity = entity
+    self.result = result
+    self.error = error
+
+  @property
+  def succeeded(self):
+    """Whether the entity was mutated."""
+    return self.error is None
+
+  def __repr__(self):
+    return 'MutateResult(result=%r, error=%r)' % (self.result, self.error)
+
+
+@googleads.common.RegisterUtility('BatchMutator')
+class BatchMutator(object):
+  """Sends the entities of a create* or update* call in concurrent batches.
+
+  Entities are split into batches of batch_size, which are sent on a bounded
+  thread pool. If a batch fails with an API error, it is split in half and each
+  half is retried, until the entities causing the failure are isolated. The
+  other entities of the batch are still mutated. Ad Manager API errors reject
+  the whole request, so no entity of a failed batch was mutated.
+
+  A batch that times out may still have been mutated by the server, so by
+  default every entity of the batch fails with the timeout. Splitting timed out
+  batches resends their entities, which would duplicate created entities, so
+  it should only be enabled for idempotent methods, e.g. update* methods.
+  """
+
+  def __init__(self, service, method_name, batch_size=DEFAULT_MUTATE_BATCH_SIZE,
+               max_batches_in_flight=DEFAULT_BATCHES_IN_FLIGHT,
+               bisect_failures=True, bisect_timeouts=False):
+    """Initializes a BatchMutator.
 
     Args:
-      pql_query: str a statement filter to apply (the query should not include
-                 the limit or the offset)
+      service: The service whose method is called, e.g. a LineItemService.
+      method_name: The name of a method of service that takes a list of
+          entities and returns them in the same order, e.g. 'updateLineItems'.
       [optional]
-      values: A dict of python objects or a list of raw SOAP values to bind
-              to the pql_query.
+      batch_size: The maximum number of entities sent per request.
+      max_batches_in_flight: The maximum number of batches sent or waiting to
+          be consumed at a time.
+      bisect_failures: Whether to split failed batches to isolate the entities
+          that caused the failure. Otherwise every entity of a failed batch
+          fails with its error.
+      bisect_timeouts: Whether to also split and resend batches that time out.
+          Only safe for idempotent methods, e.g. update* methods.
 
-    Returns:
-      a list of lists with the first being the header row and each subsequent
-      list being a row of results.
+    Raises:
+      GoogleAdsValueError: If batch_size or max_batches_in_flight is less than
+        1.
     """
-    results = []
-    self._PageThroughPqlSet(pql_query, results.append, values)
-    return results
+    if batch_size < 1:
+      raise googleads.errors.GoogleAdsValueError(
+          'batch_size must be at least 1.')
+    if max_batches_in_flight < 1:
+      raise googleads.errors.GoogleAdsValueError(
+          'max_batches_in_flight must be at least 1.')
 
-  def DownloadPqlResultToCsv(self, pql_query, file_handle, values=None):
-    """Downloads the results of a PQL query to CSV.
+    self._method = getattr(service, method_name)
+    self._method_name = method_name
+    self._batch_size = batch_size
+    self._max_batches_in_flight = max_batches_in_flight
+    self._bisect_failures = bisect_failures
+    # The errors after which a failed batch is split to isolate the failure.
+    self._bisected_errors = (googleads.errors.GoogleAdsServerFault,)
+    if bisect_timeouts:
+      self._bisected_errors += (requests.exceptions.Timeout,)
+
+  def Mutate(self, entities):
+    """Yields the result of mutating each entity, in the order of entities.
+
+    Entities are read lazily, so at most max_batches_in_flight batches are
+    held in memory at a time.
 
     Args:
-      pql_query: str a statement filter to apply (the query should not include
-                 the limit or the offset)
-      file_handle: file the file object to write to.
-      [optional]
-      values: A dict of python objects or a list of raw SOAP values to bind
-              to the pql_query.
-    """
-    pql_writer = csv.writer(file_handle, delimiter=',',
-                            quotechar='"', quoting=csv.QUOTE_ALL)
-    self._PageThroughPqlSet(pql_query, pql_writer.writerow, values)
+      entities: An iterable of entities, e.g. LineItem dictionaries.
 
-  def _ConvertValueForCsv(self, pql_value):
-    """Sanitizes a field value from a Value object to a CSV suitable format.
+    Yields:
+      A MutateResult for each entity.
+    """
+    entities = iter(entities)
+    batches = iter(lambda: list(itertools.islice(entities, self._batch_size)),
+                   [])
+
+    with concurrent.futures.ThreadPoolExecutor(
+        self._max_batches_in_flight) as executor:
+      pending = collections.deque(
+          executor.submit(self._MutateBatch, batch) for batch
+          in itertools.islice(batches, self._max_batches_in_flight))
+      try:
+        while pending:
+          results = pending.popleft().result()
+          batch = next(batches, None)
+          if batch is not None:
+            pending.append(executor.submit(self._MutateBatch, batch))
+          for result in results:
+            yield result
+      finally:
+        for future in pending:
+          future.cancel()
+
+  def _MutateBatch(self, batch):
+    """Mutates a batch, bisecting it on failure.
 
     Args:
-      pql_value: dict a dictionary containing the data for a single field of an
-                 entity.
+      batch: A list of entities.
+
+    Returns:
+      A list of MutateResults, in the order of batch.
+    """
+    try:
+      mutated = self._method(batch)
+    except self._bisected_errors as e:
+      if not self._bisect_failures or len(batch) == 1:
+        return [MutateResult(entity, error=e) for entity in batch]
+      _batch_mutator_logger.debug(
+          'Splitting a batch of %d entities that failed in %s: %s',
+          len(batch), self._method_name, e)
+      middle = len(batch) // 2
+      return self._MutateBatch(batch[:middle]) + self._MutateBatch(
+          batch[middle:])
+    except Exception as e:
+      return [MutateResult(entity, error=e) for entity in batch]
+
+    mutated = list(mutated or [])
+    if len(mutated) != len(batch):
+      error = googleads.errors.GoogleAdsError(
+          '%s returned %d entities for a batch of %d.'
+          % (self._method_name, len(mutated), len(batch)))
+      return [MutateResult(entity, error=error) for entity in batch]
+    return [MutateResult(entity, result)
+            for entity, result in zip(batch, mutated)]
+
+
+class _StreamClosedError(Exception):
+  """Raised to stop a report download whose stream was closed."""
+
+
+class _IterableStream(io.RawIOBase):
+  """A readable binary stream over an iterable of bytes."""
+
+  def __init__(self, chunks):
+    self._chunks = iter(chunks)
+    self._buffer = b''
+
+  def readable(self):
+    return True
+
+  def readinto(self, buffer):
+    while not self._buffer:
+      self._buffer = next(self._chunks, b'')
+      if not self._buffer:
+        return 0
+
+    size = min(len(buffer), len(self._buffer))
+    buffer[:size] = self._buffer[:size]
+    self._buffer = self._buffer[size:]
+    return size
+
+
+def _CheckArrowAvailable():
+  """Raises a GoogleAdsError if pyarrow is not installed."""
+  if pyarrow is None:
+    raise googleads.errors.GoogleAdsError(
+        'pyarrow is required for Arrow and Parquet output. Install it with '
+        '"pip install googleads[arrow]".')
+
+
+class ReportPollingStrategy(object):
+  """Decides how long to wait between polls of a report job's status.
+
+  Subclasses implement GetPollSeconds. They may use the report job, e.g. its
+  date range or number of dimensions, as a hint of how long it will take.
+
+  Attributes:
+    deadline_seconds: The number of seconds after which a report job that
+      hasn't finished is given up on, or None to wait indefinitely.
+  """
+
+  def __init__(self, deadline_seconds=None):
+    """Initializes a ReportPollingStrategy.
+
+    Args:
+      [optional]
+      deadline_seconds: The number of seconds after which a report job that
+          hasn't finished is given up on. Defaults to waiting indefinitely.
+    """
+    self.deadline_seconds = deadline_seconds
+
+  def GetPollSeconds(self, report_job, poll_count):
+    """Returns the number of seconds to wait before polling a report job again.
+
+    Args:
+      report_job: The report job being polled, as passed to WaitForReport.
+      poll_count: The number of times the report job's status has been polled.
+
+    Returns:
+      The number of seconds to wait, as a number.
+    """
+    raise NotImplementedError()
+
+
+class FixedReportPollingStrategy(ReportPollingStrategy):
+  """Polls a report job's status at a fixed interval."""
+
+  def __init__(self, poll_seconds=30, deadline_seconds=None):
+    """Initializes a FixedReportPollingStrategy.
+
+    Args:
+      [optional]
+      poll_seconds: The number of seconds to wait between polls.
+      deadline_seconds: The number of seconds after which a report job that
+          hasn't finished is given up on. Defaults to waiting indefinitely.
+    """
+    super(FixedReportPollingStrategy, self).__init__(deadline_seconds)
+    self.poll_seconds = poll_seconds
+
+  def GetPollSeconds(self, report_job, poll_count):
+    return self.poll_seconds
+
+
+class BackoffReportPollingStrategy(ReportPollingStrategy):
+  """Polls a report job's status quickly at first, then exponentially less.
+
+  Small reports are noticed soon after they complete, while long-running ones
+  are polled no more often than with a fixed interval. Jitter spreads out the
+  polls of report jobs that were started together.
+  """
+
+  def __init__(self, initial_poll_seconds=5, max_poll_seconds=60,
+               backoff_factor=2.0, jitter_fraction=0.1, deadline_seconds=None):
+    """Initializes a BackoffReportPollingStrategy.
+
+    Args:
+      [optional]
+      initial_poll_seconds: The number of seconds to wait before the second
+          poll.
+      max_poll_seconds: The largest number of seconds to wait between polls.
+      backoff_factor: The factor the wait grows by after each poll.
+      jitter_fraction: The fraction of each wait that is randomly added or
+          removed.
+      deadline_seconds: The number of seconds after which a report job that
+          hasn't finished is given up on. Defaults to waiting indefinitely.
+
+    Raises:
+      GoogleAdsValueError: If the poll times or factors are out of range.
+    """
+    if not 0 < initial_poll_seconds <= max_poll_seconds:
+      raise googleads.errors.GoogleAdsValueError(
+          'initial_poll_seconds must be positive and no greater than '
+          'max_poll_seconds.')
+    if backoff_factor < 1:
+      raise googleads.errors.GoogleAdsValueError(
+          'backoff_factor must be at least 1.')
+    if not 0 <= jitter_fraction < 1:
+      raise googleads.errors.GoogleAdsValueError(
+          'jitter_fraction must be at least 0 and less than 1.')
+
+    super(BackoffReportPollingStrategy, self).__init__(deadline_seconds)
+    self.initial_poll_seconds = initial_poll_seconds
+    self.max_poll_seconds = max_poll_seconds
+    self.backoff_factor = backoff_factor
+    self.jitter_fraction = jitter_fraction
+
+  def GetPollSeconds(self, report_job, poll_count):
+    # The exponent is capped so that long waits can't overflow.
+    poll_seconds = min(
+        self.max_poll_seconds,
+        self.initial_poll_seconds
+        * self.backoff_factor ** min(poll_count - 1, 64))
+    return poll_seconds * random.uniform(1 - self.jitter_fraction,
+                                         1 + self.jitter_fraction)
+
+
+class ReportJobResult(object):
+  """The outcome of one of the report jobs run by DataDownloader.RunReports.
+
+  Attributes:
+    report_job: The report job that was run, as passed to RunReports.
+    report_job_id: The ID of the report job as a string, or None if it could
+      not be started.
+    result: The value returned by the download function for the completed
+      report, or the report job ID if there is no download function. None if
+      the report job failed.
+    error: The exception the report job failed with, or None if it succeeded.
+  """
+
+  def __init__(self, report_job, report_job_id=None, result=None, error=None):
+    self.report_job = report_job
+    self.report_job_id = report_job_id
+    self.result = result
+    self.error = error
+
+  @property
+  def succeeded(self):
+    """Whether the report job completed and was downloaded."""
+    return self.error is None
+
+  def __repr__(self):
+    return 'ReportJobResult(report_job_id=%r, result=%r, error=%r)' % (
+        self.report_job_id, self.result, self.error)
+
+
+def _GetReportDate(value):
+  """Returns a report query date, given as a date or Date dict, as a date."""
+  if isinstance(value, datetime.date):
+    return value
+  return datetime.date(int(value['year']), int(value['month']),
+                       int(value['day']))
+
+
+def _PruneUnsetValues(value):
+  """Returns a serialized SOAP value without None values or empty lists.
+
+  SOAP objects hold every field of their type, with unset fields as None or an
+  empty list, while dictionaries usually only hold the fields that are set.
+  """
+  if isinstance(value, dict):
+    pruned = {}
+    for key, item in value.items():
+      item = _PruneUnsetValues(item)
+      if item is not None and item != []:
+        pruned[key] = item
+    return pruned
+  if isinstance(value, list):
+    return [_PruneUnsetValues(item) for item in value]
+  return value
+
+
+class ReportCache(object):
+  """Stores downloaded reports on local disk, keyed by their report job.
+
+  Reports are keyed by a canonical hash of the report job, the network code,
+  the API version and the download options. An entry expires after a TTL,
+  except for CUSTOM_DATE report jobs ending before yesterday in every time
+  zone, whose data no longer changes and which are kept until evicted for
+  space. When the cache grows beyond its maximum size, the least recently used
+  reports are evicted.
+  """
+
+  _REPORT_SUFFIX = '.report'
+  _METADATA_SUFFIX = '.json'
+
+  def __init__(self, directory, ttl_seconds=DEFAULT_REPORT_CACHE_TTL_SECONDS,
+               max_size_bytes=None, cache_past_date_ranges=True,
+               mutable_days=1):
+    """Initializes a ReportCache.
+
+    Args:
+      directory: The path of the directory to store reports in. It is created
+          if it doesn't exist.
+      [optional]
+      ttl_seconds: The number of seconds a report is kept for.
+      max_size_bytes: The maximum total size of the stored reports. Defaults to
+          no limit.
+      cache_past_date_ranges: Whether to keep reports of CUSTOM_DATE report
+          jobs that end before the mutable days regardless of ttl_seconds.
+      mutable_days: The number of days before today whose report data may
+          still change, with today taken in the earliest time zone, UTC-12.
+          Defaults to 1, i.e. today and yesterday.
+    """
+    self._directory = directory
+    self._ttl_seconds = ttl_seconds
+    self._max_size_bytes = max_size_bytes
+    self._cache_past_date_ranges = cache_past_date_ranges
+    self._mutable_days = mutable_days
+    self._lock = threading.Lock()
+    os.makedirs(directory, exist_ok=True)
+
+  def GetKey(self, report_job, network_code, version, export_format,
+             include_report_properties=False, include_totals_row=None,
+             use_gzip_compression=True):
+    """Returns the cache key of a report.
+
+    The report job's ID is ignored, as are unset fields and the order of keys
+    in its dictionaries, so equivalent report jobs share a key whether they
+    are dictionaries or SOAP objects.
+
+    Args:
+      report_job: The report job, as a dictionary or an instance of the SOAP
+          ReportJob class.
+      network_code: The network code the report job is run in.
+      version: The API version the report job is run with.
+      export_format: The export format of the report file.
+      [optional]
+      include_report_properties: Whether the report properties are included.
+      include_totals_row: Whether the totals row is included.
+      use_gzip_compression: Whether the report is gzip compressed.
+
+    Returns:
+      The cache key, as a hexadecimal string.
+    """
+    report_job = _PruneUnsetValues(
+        zeep.helpers.serialize_object(report_job, dict))
+    report_job.pop('id', None)
+    canonical = json.dumps(
+        [report_job, network_code, version, export_format,
+         include_report_properties, include_totals_row, use_gzip_compression],
+        sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+  def CopyTo(self, key, outfile):
+    """Copies a cached report into a file if it is cached and not expired.
+
+    Args:
+      key: The cache key of the report.
+      outfile: A writeable, file-like object to write to.
+
+    Returns:
+      True if the report was cached and copied, otherwise False.
+    """
+    report_file = self.Open(key)
+    if report_file is None:
+      return False
+    with report_file:
+      shutil.copyfileobj(report_file, outfile)
+    return True
+
+  def Open(self, key):
+    """Opens a cached report for reading if it is cached and not expired.
+
+    Args:
+      key: The cache key of the report.
+
+    Returns:
+      The report as a binary file object, which the caller must close, or
+      None if it isn't cached.
+    """
+    report_path = self._GetPath(key, self._REPORT_SUFFIX)
+    with self._lock:
+      expiry_time = self._GetExpiryTime(key)
+      if expiry_time is False:
+        return None
+      if expiry_time is not None and expiry_time <= time.time():
+        self._Remove(key)
+        return None
+      try:
+        report_file = open(report_path, 'rb')
+      except (IOError, OSError):
+        return None
+      # The modification time of a report tracks when it was last used.
+      os.utime(report_path, None)
+
+    _data_downloader_logger.debug('Report cache hit for %s', key)
+    return report_file
+
+  def Put(self, key, report_path, report_job):
+    """Moves a downloaded report into the cache.
+
+    Args:
+      key: The cache key of the report.
+      report_path: The path of the downloaded report, which must be in the
+          cache's directory, e.g. from CreateTemporaryFile.
+      report_job: The report job the report was downloaded for.
+    """
+    if self._cache_past_date_ranges and self._HasPastDateRange(report_job):
+      expiry_time = None
+    else:
+      expiry_time = time.time() + self._ttl_seconds
+
+    with self._lock:
+      os.replace(report_path, self._GetPath(key, self._REPORT_SUFFIX))
+      metadata_path = self._GetPath(key, self._METADATA_SUFFIX)
+      with open(metadata_path + '.tmp', 'w') as metadata_file:
+        json.dump({'expiry_time': expiry_time}, metadata_file)
+      os.replace(metadata_path + '.tmp', metadata_path)
+      self._Evict()
+
+  def CreateTemporaryFile(self):
+    """Returns a writeable temporary file to download a report into.
+
+    The file is created in the cache's directory so that Put can move it into
+    place atomically.
+    """
+    return tempfile.NamedTemporaryFile(dir=self._directory, suffix='.tmp',
+                                       delete=False)
+
+  def _GetPath(self, key, suffix):
+    return os.path.join(self._directory, key + suffix)
+
+  def _GetExpiryTime(self, key):
+    """Returns when a report expires, None if never, or False if not cached."""
+    try:
+      with open(self._GetPath(key, self._METADATA_SUFFIX)) as metadata_file:
+        return json.load(metadata_file)['expiry_time']
+    except (IOError, OSError, ValueError, KeyError):
+      return False
+
+  def _Remove(self, key):
+    for suffix in (self._METADATA_SUFFIX, self._REPORT_SUFFIX):
+      try:
+        os.remove(self._GetPath(key, suffix))
+      except OSError:
+        pass
+
+  def _Evict(self):
+    """Removes expired reports, then the least recently used over max size."""
+    now = time.time()
+    entries = []
+    for file_name in os.listdir(self._directory):
+      if not file_name.endswith(self._REPORT_SUFFIX):
+        continue
+      key = file_name[:-len(self._REPORT_SUFFIX)]
+      expiry_time = self._GetExpiryTime(key)
+      if expiry_time is False or (expiry_time is not None
+                                  and expiry_time <= now):
+        self._Remove(key)
+        continue
+      stat = os.stat(self._GetPath(key, self._REPORT_SUFFIX))
+      entries.append((stat.st_mtime, stat.st_size, key))
+
+    if self._max_size_bytes is None:
+      return
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, key in sorted(entries):
+      if total_size <= self._max_size_bytes:
+        break
+      _data_downloader_logger.debug('Evicting report %s from the cache', key)
+      self._Remove(key)
+      total_size -= size
+
+  def IsMutable(self, day):
+    """Returns whether the report data of a day may still change.
+
+    Args:
+      day: A datetime.date.
+
+    Returns:
+      True if day is within the mutable days before today in UTC-12, or in
+      the future.
+    """
+    # Networks report in their own time zones, so today is taken in the
+    # earliest time zone, UTC-12, where no network can be on an earlier day.
+    return day >= (datetime.datetime.now(_EARLIEST_TIME_ZONE).date()
+                   - datetime.timedelta(days=self._mutable_days))
+
+  def _HasPastDateRange(self, report_job):
+    """Returns whether a report job covers only days that can't change."""
+    report_query = zeep.helpers.serialize_object(report_job, dict).get(
+        'reportQuery') or {}
+    end_date = report_query.get('endDate')
+    if report_query.get('dateRangeType') != 'CUSTOM_DATE' or not end_date:
+      return False
+    return not self.IsMutable(_GetReportDate(end_date))
+
+
+class DataDownloader(object):
+  """A utility that can be used to download reports and PQL result sets."""
+
+  # The Arrow types of PQL values, other than NumberValue.
+  _PQL_ARROW_TYPES = {
+      'TextValue': pyarrow.string(),
+      'BooleanValue': pyarrow.bool_(),
+      'DateValue': pyarrow.date32(),
+      'DateTimeValue': pyarrow.timestamp('s', tz='UTC'),
+      'SetValue': pyarrow.list_(pyarrow.string()),
+  } if pyarrow else {}
+  # The export formats that can be streamed, mapped to their delimiters.
+  _STREAMABLE_EXPORT_FORMATS = {'CSV_DUMP': ',', 'TSV': '\t'}
+  _PQL_WHERE_REGEX = re.compile(r'\s+WHERE\s+', re.IGNORECASE)
+  _PQL_ORDER_BY_REGEX = re.compile(r'\s+ORDER\s+BY\s+', re.IGNORECASE)
+
+  def __init__(self, ad_manager_client, version=sorted(_SERVICE_MAP.keys())[-1],
+               server=None, report_cache=None):
+    """Initializes a DataDownloader.
+
+    Args:
+      ad_manager_client: The AdManagerClient whose attributes will be used to
+          authorize your report download and PQL query requests.
+      [optional]
+      version: A string identifying the Ad Manager version to connect to.
+          This defaults to what is currently the latest version. This will be
+          updated in future releases to point to what is then the
+          latest version.
+      server: A string identifying the webserver hosting the Ad Manager API.
+      report_cache: A ReportCache used by RunReportToFile. Reports are not
+          cached by default.
+    """
+    if not server:
+      server = DEFAULT_ENDPOINT
+
+    if server[-1] == '/':
+      server = server[:-1]
+
+    self._ad_manager_client = ad_manager_client
+    self._version = version
+    self._server = server
+    self._report_service = None
+    self._pql_service = None
+    self._report_cache = report_cache
+    self.proxy_config = self._ad_manager_client.proxy_config
+    self.http_session = self._ad_manager_client.http_session
+    self._http_headers = dict(
+        self._ad_manager_client.custom_http_headers or {})
+    self._url_opener = None
+
+  @property
+  def url_opener(self):
+    """Deprecated. A urllib opener with the proxy settings and custom headers.
+
+    Reports are downloaded with http_session, so the opener isn't used. It will
+    be removed in the next major release.
+    """
+    warnings.warn(_URL_OPENER_DEPRECATION_MESSAGE, DeprecationWarning,
+                  stacklevel=2)
+    if self._url_opener is None:
+      self._url_opener = self.proxy_config.BuildOpener()
+      self._url_opener.addheaders.extend(self._http_headers.items())
+    return self._url_opener
+
+  @url_opener.setter
+  def url_opener(self, url_opener):
+    warnings.warn(_URL_OPENER_DEPRECATION_MESSAGE, DeprecationWarning,
+                  stacklevel=2)
+    self._url_opener = url_opener
+
+  def _GetReportService(self):
+    """Lazily initializes a report service client."""
+    if not self._report_service:
+      self._report_service = self._ad_manager_client.GetService(
+          'ReportService', self._version, self._server)
+    return self._report_service
+
+  def _GetPqlService(self):
+    """Lazily initializes a PQL service client."""
+    if not self._pql_service:
+      self._pql_service = self._ad_manager_client.GetService(
+          'PublisherQueryLanguageService', self._version, self._server)
+    return self._pql_service
+
+  def WaitForReport(self, report_job, poll_time_seconds=30,
+                    polling_strategy=None):
+    """Runs a report, then waits (blocks) for the report to finish generating.
+
+    Args:
+      report_job: The report job to wait for. This may be a dictionary or an
+          instance of the SOAP ReportJob class.
+      poll_time_seconds: The number of seconds to wait between calls to
+          getReportJobStatus. Defaults to 30 seconds.
+      polling_strategy: A ReportPollingStrategy deciding how long to wait
+          between calls to getReportJobStatus, e.g. a
+          BackoffReportPollingStrategy. Overrides poll_time_seconds.
+
+    Returns:
+      The completed report job's ID as a string.
+
+    Raises:
+      An AdManagerReportError if the report job fails to complete, or an
+      AdManagerReportTimeoutError if it doesn't finish before the polling
+      strategy's deadline.
+    """
+    if polling_strategy is None:
+      polling_strategy = FixedReportPollingStrategy(poll_time_seconds)
+
+    service = self._GetReportService()
+    start_time = time.time()
+    report_job_id = service.runReportJob(report_job)['id']
+
+    status = service.getReportJobStatus(report_job_id)
+    poll_count = 1
+
+    while status != 'COMPLETED' and status != 'FAILED':
+      _data_downloader_logger.debug('Report job status: %s', status)
+      poll_seconds = self._GetPollSeconds(polling_strategy, report_job,
+                                          report_job_id, poll_count,
+                                          start_time)
+      time.sleep(poll_seconds)
+      status = service.getReportJobStatus(report_job_id)
+      poll_count += 1
+
+    if status == 'FAILED':
+      raise googleads.errors.AdManagerReportError(report_job_id)
+    else:
+      _data_downloader_logger.debug('Report has completed successfully')
+      return report_job_id
+
+  def _GetPollSeconds(self, polling_strategy, report_job, report_job_id,
+                      poll_count, start_time):
+    """Returns how long to wait before polling a report job again.
+
+    Args:
+      polling_strategy: The ReportPollingStrategy of the report job.
+      report_job: The report job being polled.
+      report_job_id: The ID of the report job.
+      poll_count: The number of times the report job has been polled.
+      start_time: The time the report job was started, as from time.time().
+
+    Returns:
+      The number of seconds to wait, shortened to end at the deadline.
+
+    Raises:
+      AdManagerReportTimeoutError: If the deadline has passed.
+    """
+    poll_seconds = polling_strategy.GetPollSeconds(report_job, poll_count)
+    if polling_strategy.deadline_seconds is not None:
+      remaining_seconds = (start_time + polling_strategy.deadline_seconds
+                           - time.time())
+      if remaining_seconds <= 0:
+        raise googleads.errors.AdManagerReportTimeoutError(
+            report_job_id, polling_strategy.deadline_seconds)
+      poll_seconds = min(poll_seconds, remaining_seconds)
+    return poll_seconds
+
+  def RunReports(self, report_jobs, download_function=None, callback=None,
+                 poll_time_seconds=30,
+                 max_downloads_in_flight=DEFAULT_REPORT_DOWNLOADS_IN_FLIGHT,
+                 polling_strategy=None):
+    """Runs report jobs together and downloads each one as soon as it completes.
+
+    All report jobs are started up front and their statuses are polled on one
+    schedule from the calling thread. Completed reports are handed to
+    download_function on a pool of worker threads while the remaining jobs keep
+    being polled. A failure only affects the report job it belongs to.
+
+    Args:
+      report_jobs: A list of report jobs to run. Each may be a dictionary or
+          an instance of the SOAP ReportJob class.
+      [optional]
+      download_function: A function taking a completed report job's ID, e.g.
+          a wrapper around DownloadReportToFile, whose return value is the
+          ReportJobResult's result. Defaults to returning the report job ID.
+      callback: A function called with each ReportJobResult, on the calling
+          thread, as soon as its report job has completed or failed.
+      poll_time_seconds: The number of seconds to wait between polling the
+          statuses of the running report jobs. Defaults to 30 seconds.
+      max_downloads_in_flight: The maximum number of completed reports that
+          are downloaded at a time.
+      polling_strategy: A ReportPollingStrategy deciding how long to wait
+          between polls of each report job, e.g. a
+          BackoffReportPollingStrategy. Overrides poll_time_seconds. A report
+          job that passes its deadline fails with an
+          AdManagerReportTimeoutError.
+
+    Returns:
+      A list of ReportJobResults, in the order of report_jobs.
+
+    Raises:
+      GoogleAdsValueError: If max_downloads_in_flight is less than 1.
+    """
+    if max_downloads_in_flight < 1:
+      raise googleads.errors.GoogleAdsValueError(
+          'max_downloads_in_flight must be at least 1.')
+
+    if polling_strategy is None:
+      polling_strategy = FixedReportPollingStrategy(poll_time_seconds)
+
+    service = self._GetReportService()
+    results = [ReportJobResult(report_job) for report_job in report_jobs]
+
+    def Finish(report_job_result):
+      if report_job_result.error is not None:
+        _data_downloader_logger.warning(
+            'Report job %s failed: %s', report_job_result.report_job_id,
+            report_job_result.error)
+      if callback:
+        callback(report_job_result)
+
+    running = []
+    # The start time, poll count and next poll time of each running report job.
+    schedules = {}
+    for report_job_result in results:
+      try:
+        report_job_result.report_job_id = service.runReportJob(
+            report_job_result.report_job)['id']
+      except Exception as e:
+        report_job_result.error = e
+        Finish(report_job_result)
+      else:
+        running.append(report_job_result)
+        schedules[report_job_result] = (time.time(), 0, 0)
+
+    downloads = {}
+    poll_time = time.time()
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_downloads_in_flight) as executor:
+      while running or downloads:
+        if running:
+          still_running = []
+          for report_job_result in running:
+            start_time, poll_count, next_poll_time = schedules[
+                report_job_result]
+            if next_poll_time > poll_time:
+              still_running.append(report_job_result)
+              continue
+
+            report_job_id = report_job_result.report_job_id
+            try:
+              status = service.getReportJobStatus(report_job_id)
+            except Exception as e:
+              report_job_result.error = e
+              Finish(report_job_result)
+              continue
+
+            if status == 'COMPLETED':
+              _data_downloader_logger.debug(
+                  'Report job %s has completed successfully', report_job_id)
+              if download_function:
+                downloads[executor.submit(
+                    download_function, report_job_id)] = report_job_result
+              else:
+                report_job_result.result = report_job_id
+                Finish(report_job_result)
+            elif status == 'FAILED':
+              report_job_result.error = googleads.errors.AdManagerReportError(
+                  report_job_id)
+              Finish(report_job_result)
+            else:
+              _data_downloader_logger.debug(
+                  'Report job %s status: %s', report_job_id, status)
+              try:
+                poll_seconds = self._GetPollSeconds(
+                    polling_strategy, report_job_result.report_job,
+                    report_job_id, poll_count + 1, start_time)
+              except googleads.errors.AdManagerReportTimeoutError as e:
+                report_job_result.error = e
+                Finish(report_job_result)
+                continue
+              schedules[report_job_result] = (start_time, poll_count + 1,
+                                              poll_time + poll_seconds)
+              still_running.append(report_job_result)
+          running = still_running
+        next_poll_time = (min(schedules[report_job_result][2]
+                              for report_job_result in running)
+                          if running else None)
+
+        # Downloads are collected until the next poll is due.
+        while downloads:
+          wait_seconds = next_poll_time - time.time() if running else None
+          if wait_seconds is not None and wait_seconds <= 0:
+            break
+          done, _ = concurrent.futures.wait(
+              downloads, timeout=wait_seconds,
+              return_when=concurrent.futures.FIRST_COMPLETED)
+          for future in done:
+            report_job_result = downloads.pop(future)
+            try:
+              report_job_result.result = future.result()
+            except Exception as e:
+              report_job_result.error = e
+            Finish(report_job_result)
+
+        if running:
+          if next_poll_time > time.time():
+            time.sleep(next_poll_time - time.time())
+          poll_time = max(time.time(), next_poll_time)
+
+    return results
+
+  def RunReportToFile(self, report_job, export_format, outfile,
+                      include_report_properties=False, include_totals_row=None,
+                      use_gzip_compression=True, polling_strategy=None,
+                      max_connections=1):
+    """Runs a report, waits for it to finish and downloads it to a file.
+
+    If the DataDownloader has a ReportCache holding the report, it is copied
+    from there without running the report job.
+
+    Args:
+      report_job: The report job to run. This may be a dictionary or an
+          instance of the SOAP ReportJob class.
+      export_format: The export format for the report file, as a string.
+      outfile: A writeable, file-like object to write to.
+      [optional]
+      include_report_properties: Whether or not to include the report
+        properties (e.g. network, user, date generated...)
+        in the generated report.
+      include_totals_row: Whether or not to include the totals row.
+      use_gzip_compression: Whether or not to use gzip compression.
+      polling_strategy: A ReportPollingStrategy used while waiting for the
+          report job.
+      max_connections: The maximum number of connections to download the
+          report with, as in DownloadReportToFile.
+
+    Returns:
+      The report job's ID as a string, or None if the report was copied from
+      the cache.
+
+    Raises:
+      An AdManagerReportError if the report job fails to complete.
+    """
+    if not self._report_cache:
+      report_job_id = self.WaitForReport(report_job,
+                                         polling_strategy=polling_strategy)
+      self.DownloadReportToFile(
+          report_job_id, export_format, outfile, include_report_properties,
+          include_totals_row, use_gzip_compression, max_connections)
+      return report_job_id
+
+    key = self._report_cache.GetKey(
+        report_job, self._ad_manager_client.network_code, self._version,
+        export_format, include_report_properties, include_totals_row,
+        use_gzip_compression)
+    if self._report_cache.CopyTo(key, outfile):
+      return None
+
+    report_job_id = self.WaitForReport(report_job,
+                                       polling_strategy=polling_strategy)
+    report_file = self._report_cache.CreateTemporaryFile()
+    try:
+      with report_file:
+        self.DownloadReportToFile(
+            report_job_id, export_format, report_file,
+            include_report_properties, include_totals_row,
+            use_gzip_compression, max_connections)
+        report_file.seek(0)
+        shutil.copyfileobj(report_file, outfile)
+      self._report_cache.Put(key, report_file.name, report_job)
+    finally:
+      if os.path.exists(report_file.name):
+        os.remove(report_file.name)
+    return report_job_id
+
+  def DownloadReportByDayToFile(
+      self, report_job, export_format, outfile, partition_cache,
+      polling_strategy=None,
+      max_downloads_in_flight=DEFAULT_REPORT_DOWNLOADS_IN_FLIGHT):
+    """Downloads a CUSTOM_DATE report as one partition per day.
+
+    Each day of the report job's date range is run as its own report job and
+    stored in partition_cache. Days that are already stored and can no longer
+    change are reused, so a rolling date range only fetches its new and recent
+    days. The partitions are merged into outfile in date order with a single
+    header row, matching a full run of the report, whose rows are ordered by
+    its first dimension, DATE.
+
+    Reports are downloaded uncompressed, without report properties or a totals
+    row, since those can't be merged.
+
+    Args:
+      report_job: The report job to run. This may be a dictionary or an
+          instance of the SOAP ReportJob class. Its reportQuery must have a
+          CUSTOM_DATE date range and DATE as its first dimension.
+      export_format: The export format for the report file, either CSV_DUMP
+          or TSV.
+      outfile: A writeable, file-like object to write to.
+      partition_cache: The ReportCache the daily partitions are stored in.
+      [optional]
+      polling_strategy: A ReportPollingStrategy used while waiting for the
+          daily report jobs.
+      max_downloads_in_flight: The maximum number of daily reports that are
+          downloaded at a time.
+
+    Returns:
+      A list of the days that were fetched rather than reused, as
+      datetime.dates.
+
+    Raises:
+      GoogleAdsValueError: If the report job or export format can't be
+        partitioned by day.
+      The error of the first daily report job that failed. The days that
+      succeeded are stored, so a retry only fetches the failed days.
+    """
+    report_job = copy.deepcopy(zeep.helpers.serialize_object(report_job, dict))
+    report_job.pop('id', None)
+    report_query = report_job.get('reportQuery') or {}
+    if (report_query.get('dateRangeType') != 'CUSTOM_DATE'
+        or not report_query.get('startDate')
+        or not report_query.get('endDate')):
+      raise googleads.errors.GoogleAdsValueError(
+          'Partitioning by day requires a CUSTOM_DATE date range.')
+    if (report_query.get('dimensions') or [None])[0] != 'DATE':
+      raise googleads.errors.GoogleAdsValueError(
+          'Partitioning by day requires DATE as the first dimension.')
+    if export_format not in self._STREAMABLE_EXPORT_FORMATS:
+      raise googleads.errors.GoogleAdsValueError(
+          'Partitioning by day is only supported for the %s export formats.'
+          % ' and '.join(sorted(self._STREAMABLE_EXPORT_FORMATS)))
+
+    start_date = _GetReportDate(report_query['startDate'])
+    end_date = _GetReportDate(report_query['endDate'])
+    days = [start_date + datetime.timedelta(days=i)
+            for i in range((end_date - start_date).days + 1)]
+    day_report_jobs = {}
+    keys = {}
+    for day in days:
+      day_report_jobs[day] = dict(
+          report_job, reportQuery=dict(report_query, startDate=day,
+                                       endDate=day))
+      keys[day] = partition_cache.GetKey(
+          day_report_jobs[day], self._ad_manager_client.network_code,
+          self._version, export_format, False, False, False)
+
+    fetched_days = []
+    for day in days:
+      if partition_cache.IsMutable(day):
+        fetched_days.append(day)
+        continue
+      report_file = partition_cache.Open(keys[day])
+      if report_file is None:
+        fetched_days.append(day)
+      else:
+        report_file.close()
+    _data_downloader_logger.debug(
+        'Fetching %d of %d daily report partitions', len(fetched_days),
+        len(days))
+
+    def Download(report_job_id):
+      report_file = partition_cache.CreateTemporaryFile()
+      try:
+        with report_file:
+          self.DownloadReportToFile(report_job_id, export_format, report_file,
+                                    False, False, False)
+      except Exception:
+        os.remove(report_file.name)
+        raise
+      return report_file.name
+
+    results = self.RunReports(
+        [day_report_jobs[day] for day in fetched_days],
+        download_function=Download, polling_strategy=polling_strategy,
+        max_downloads_in_flight=max_downloads_in_flight)
+    fetched_paths = dict(zip(fetched_days, [result.result
+                                            for result in results]))
+    try:
+      failures = [result for result in results if result.error is not None]
+      if failures:
+        raise failures[0].error
+
+      # Fetched partitions are merged before being stored, since recent days
+      # may expire from the cache as soon as they are stored.
+      for i, day in enumerate(days):
+        if day in fetched_paths:
+          report_file = open(fetched_paths[day], 'rb')
+        else:
+          report_file = partition_cache.Open(keys[day])
+          if report_file is None:
+            raise googleads.errors.GoogleAdsError(
+                'The report partition of %s was evicted while merging.' % day)
+        with report_file:
+          header = report_file.readline()
+          if i == 0:
+            outfile.write(header)
+          shutil.copyfileobj(report_file, outfile)
+    finally:
+      for day, path in fetched_paths.items():
+        if path is not None:
+          partition_cache.Put(keys[day], path, day_report_jobs[day])
+    return fetched_days
+
+  def DownloadReportToFile(self, report_job_id, export_format, outfile,
+                           include_report_properties=False,
+                           include_totals_row=None, use_gzip_compression=True,
+                           max_connections=1, chunk_size=_CHUNK_SIZE,
+                           max_retries=3):
+    """Downloads report data and writes it to a file.
+
+    The report job must be completed before calling this function.
+
+    If the connection drops, the download is resumed from the last byte written
+    using an HTTP Range request. With more than one connection, the size of the
+    report is probed and byte ranges of it are downloaded in parallel, which
+    requires outfile to be seekable; otherwise it is downloaded sequentially.
+
+    Args:
+      report_job_id: The ID of the report job to wait for, as a string.
+      export_format: The export format for the report file, as a string.
+      outfile: A writeable, file-like object to write to.
+      include_report_properties: Whether or not to include the report
+        properties (e.g. network, user, date generated...)
+        in the generated report.
+      include_totals_row: Whether or not to include the totals row.
+      use_gzip_compression: Whether or not to use gzip compression.
+      max_connections: The maximum number of parallel range requests.
+      chunk_size: The number of bytes read at a time, or None to adapt it to
+        the observed throughput.
+      max_retries: The number of times each range is resumed after a dropped
+        connection before giving up.
+    """
+    report_url = self._GetReportDownloadUrl(
+        report_job_id, export_format, include_report_properties,
+        include_totals_row, use_gzip_compression)
+
+    if max_connections > 1 and self._IsSeekable(outfile):
+      self._DownloadRangesToFile(report_url, outfile, max_connections,
+                                 chunk_size, max_retries)
+    else:
+      self._DownloadRange(report_url, lambda _, chunk: outfile.write(chunk), 0,
+                          None, chunk_size, max_retries)
+
+  def StreamReportRows(self, report_job_id, export_format='CSV_DUMP',
+                       include_report_properties=False,
+                       include_totals_row=False, chunk_size=None,
+                       max_retries=3):
+    """Streams the rows of a report without writing it to disk.
+
+    The report job must be completed before calling this function.
+
+    The gzip compressed report is downloaded in a background thread, which
+    stays a bounded number of chunks ahead, and decompressed and parsed as it
+    arrives. Memory use is therefore constant regardless of the report size.
+    Dropped connections are resumed as in DownloadReportToFile.
+
+    Values of metric columns (Column.*) and of ID dimensions are converted to
+    ints or floats where possible; all other values are strings.
+
+    Args:
+      report_job_id: The ID of the report job to stream, as a string.
+      export_format: The export format for the report, either CSV_DUMP or TSV.
+      include_report_properties: Whether or not to include the report
+        properties (e.g. network, user, date generated...)
+        in the generated report.
+      include_totals_row: Whether or not to include the totals row. Defaults
+        to False for every export format, so that only data rows are yielded.
+      chunk_size: The number of bytes read at a time, or None to adapt it to
+        the observed throughput.
+      max_retries: The number of times the download is resumed after a dropped
+        connection before giving up.
+
+    Returns:
+      A generator yielding each row as a dict keyed by the report's header.
+
+    Raises:
+      GoogleAdsValueError: If the export format cannot be streamed.
+    """
+    if export_format not in self._STREAMABLE_EXPORT_FORMATS:
+      raise googleads.errors.GoogleAdsValueError(
+          'Only %s reports can be streamed.' % ', '.join(
+              sorted(self._STREAMABLE_EXPORT_FORMATS)))
+
+    report_url = self._GetReportDownloadUrl(
+        report_job_id, export_format, include_report_properties,
+        include_totals_row, True)
+    lines = self._DecodeReportLines(
+        self._StreamReportChunks(report_url, chunk_size, max_retries))
+    return self._ParseReportRows(
+        lines, self._STREAMABLE_EXPORT_FORMATS[export_format])
+
+  def StreamReportBatches(self, report_job_id, export_format='CSV_DUMP',
+                          column_types=None, chunk_size=None, max_retries=3):
+    """Streams a report into Arrow record batches without writing it to disk.
+
+    The report job must be completed before calling this function.
+
+    The report is downloaded and decompressed as in StreamReportRows, and
+    parsed by Arrow's streaming CSV reader, so no Python object is created per
+    value. Column types are inferred from the report's header: Dimension.DATE
+    is read as a date, ID dimensions as int64, with null for values that
+    aren't IDs such as '-', metric columns (Column.*) as float64 and
+    everything else as strings. The totals row and report properties are not
+    included.
+
+    Args:
+      report_job_id: The ID of the report job to stream, as a string.
+      export_format: The export format for the report, either CSV_DUMP or TSV.
+      column_types: A dict mapping column names to Arrow types, overriding the
+        inferred types.
+      chunk_size: The number of bytes read at a time, or None to adapt it to
+        the observed throughput.
+      max_retries: The number of times the download is resumed after a dropped
+        connection before giving up.
+
+    Returns:
+      A generator yielding pyarrow.RecordBatch objects.
+
+    Raises:
+      GoogleAdsError: If pyarrow is not installed.
+      GoogleAdsValueError: If the export format cannot be streamed.
+    """
+    _CheckArrowAvailable()
+    if export_format not in self._STREAMABLE_EXPORT_FORMATS:
+      raise googleads.errors.GoogleAdsValueError(
+          'Only %s reports can be streamed.' % ', '.join(
+              sorted(self._STREAMABLE_EXPORT_FORMATS)))
+
+    report_url = self._GetReportDownloadUrl(report_job_id, export_format, False,
+                                            False, True)
+    data = self._DecompressReportChunks(
+        self._StreamReportChunks(report_url, chunk_size, max_retries))
+    return self._ParseReportBatches(
+        data, self._STREAMABLE_EXPORT_FORMATS[export_format],
+        column_types or {})
+
+  def DownloadReportToParquet(self, report_job_id, where,
+                              export_format='CSV_DUMP', column_types=None,
+                              chunk_size=None, max_retries=3):
+    """Downloads a report into a Parquet file, one record batch at a time.
+
+    The report job must be completed before calling this function.
+
+    Args:
+      report_job_id: The ID of the report job to download, as a string.
+      where: A path or writeable file-like object to write the Parquet file to.
+      export_format: The export format for the report, either CSV_DUMP or TSV.
+      column_types: A dict mapping column names to Arrow types, overriding the
+        inferred types.
+      chunk_size: The number of bytes read at a time, or None to adapt it to
+        the observed throughput.
+      max_retries: The number of times the download is resumed after a dropped
+        connection before giving up.
+    """
+    self._WriteBatchesToParquet(
+        self.StreamReportBatches(report_job_id, export_format, column_types,
+                                 chunk_size, max_retries), where)
+
+  def _ParseReportBatches(self, data, delimiter, column_types):
+    """Parses decompressed report data into Arrow record batches.
+
+    Args:
+      data: An iterable of decompressed report data.
+      delimiter: The delimiter of the report's values.
+      column_types: A dict mapping column names to Arrow types, overriding the
+        inferred types.
+
+    Yields:
+      pyarrow.RecordBatch objects.
+    """
+    data = iter(data)
+    # Read the header first so that the type of every column can be set.
+    buffered = b''
+    for chunk in data:
+      buffered += chunk
+      if b'\n' in buffered:
+        break
+    if not buffered.strip():
+      return
+
+    header_line = buffered.split(b'\n', 1)[0].decode('utf-8-sig')
+    header = next(csv.reader([header_line], delimiter=delimiter))
+    types = {column: self._GetReportColumnArrowType(column)
+             for column in header}
+    # ID columns are read as strings and converted to int64 batch by batch, so
+    # that values which aren't IDs, e.g. '-', become null instead of failing.
+    id_columns = [index for index, column in enumerate(header)
+                  if column.endswith('_ID') and column not in column_types]
+    for index in id_columns:
+      types[header[index]] = pyarrow.string()
+    types.update(column_types)
+
+    # Arrow parses each read as a block, so reads must be filled completely.
+    reader = pyarrow.csv.open_csv(
+        io.BufferedReader(_IterableStream(itertools.chain([buffered], data))),
+        parse_options=pyarrow.csv.ParseOptions(delimiter=delimiter,
+                                               newlines_in_values=True),
+        convert_options=pyarrow.csv.ConvertOptions(column_types=types))
+    for batch in reader:
+      yield self._ConvertReportIdColumns(batch, id_columns)
+
+  def _ConvertReportIdColumns(self, batch, id_columns):
+    """Converts ID columns of a record batch from strings to int64.
+
+    Args:
+      batch: A pyarrow.RecordBatch whose ID columns hold strings.
+      id_columns: The indices of the ID columns.
+
+    Returns:
+      The pyarrow.RecordBatch with its ID columns as int64, where values that
+      aren't integers are null.
+    """
+    if not id_columns:
+      return batch
+    arrays = list(batch.columns)
+    for index in id_columns:
+      values = arrays[index]
+      is_integer = pyarrow.compute.match_substring_regex(values, r'^-?\d+$')
+      arrays[index] = pyarrow.compute.if_else(
+          is_integer, values, pyarrow.scalar(None, pyarrow.string())).cast(
+              pyarrow.int64())
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=pyarrow.schema(
+        [field.with_type(pyarrow.int64()) if index in id_columns else field
+         for index, field in enumerate(batch.schema)]))
+
+  def _GetReportColumnArrowType(self, column):
+    """Returns the Arrow type of a report column."""
+    if column.startswith('Column.'):
+      return pyarrow.float64()
+    elif column.endswith('_ID'):
+      return pyarrow.int64()
+    elif column == 'Dimension.DATE':
+      return pyarrow.date32()
+    return pyarrow.string()
+
+  def _GetReportDownloadUrl(self, report_job_id, export_format,
+                            include_report_properties, include_totals_row,
+                            use_gzip_compression):
+    """Returns the URL to download a report with the given options."""
+    service = self._GetReportService()
+
+    if include_totals_row is None:  # True unless CSV export if not specified
+      include_totals_row = True if export_format != 'CSV_DUMP' else False
+    opts = {
+        'exportFormat': export_format,
+        'includeReportProperties': include_report_properties,
+        'includeTotalsRow': include_totals_row,
+        'useGzipCompression': use_gzip_compression
+    }
+    report_url = service.getReportDownloadUrlWithOptions(report_job_id, opts)
+    _data_downloader_logger.info('Request Summary: Report job ID: %s, %s',
+                                 report_job_id, opts)
+    _data_downloader_logger.info('Report URL: %s', report_url)
+    return report_url
+
+  def _StreamReportChunks(self, url, chunk_size, max_retries):
+    """Yields the chunks of a report downloaded in a background thread.
+
+    Args:
+      url: The URL to download.
+      chunk_size: The number of bytes read at a time, or None to adapt it.
+      max_retries: The number of times the download is resumed.
+
+    Yields:
+      The raw chunks of the report.
+    """
+    chunks = queue.Queue(_STREAM_PREFETCH_CHUNKS)
+    closed = threading.Event()
+
+    def Put(item):
+      """Queues an item, returning False if the stream was closed."""
+      while not closed.is_set():
+        try:
+          chunks.put(item, timeout=0.1)
+          return True
+        except queue.Full:
+          pass
+      return False
+
+    def Write(_, chunk):
+      if not Put(chunk):
+        raise _StreamClosedError()
+
+    def Download():
+      try:
+        self._DownloadRange(url, Write, 0, None, chunk_size, max_retries)
+        Put(None)
+      except _StreamClosedError:
+        pass
+      except Exception as e:
+        Put(e)
+
+    threading.Thread(target=Download, daemon=True).start()
+    try:
+      while True:
+        chunk = chunks.get()
+        if chunk is None:
+          return
+        elif isinstance(chunk, Exception):
+          raise chunk
+        yield chunk
+    finally:
+      closed.set()
+
+  def _DecompressReportChunks(self, chunks):
+    """Decompresses gzip compressed report chunks.
+
+    Args:
+      chunks: An iterable of gzip compressed chunks.
+
+    Yields:
+      The decompressed data of each chunk.
+
+    Raises:
+      GoogleAdsError: If the compressed data ended unexpectedly.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    for chunk in chunks:
+      data = decompressor.decompress(chunk)
+      # Reports may be made of several concatenated gzip members.
+      while decompressor.unused_data:
+        unused_data = decompressor.unused_data
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data += decompressor.decompress(unused_data)
+      if data:
+        yield data
+
+    if not decompressor.eof:
+      raise googleads.errors.GoogleAdsError(
+          'The report download ended before the end of the gzip stream.')
+
+  def _DecodeReportLines(self, chunks):
+    """Decompresses and decodes gzip compressed chunks into lines of text.
+
+    Args:
+      chunks: An iterable of gzip compressed chunks.
+
+    Yields:
+      The lines of the text, including their line endings.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+
+    for data in self._DecompressReportChunks(chunks):
+      lines = (pending + decoder.decode(data)).split('\n')
+      pending = lines.pop()
+      for line in lines:
+        yield line + '\n'
+
+    pending += decoder.decode(b'', True)
+    if pending:
+      yield pending
+
+  def _ParseReportRows(self, lines, delimiter):
+    """Parses report lines into typed rows.
+
+    Args:
+      lines: An iterable of the report's lines.
+      delimiter: The delimiter of the report's values.
+
+    Yields:
+      Each row as a dict keyed by the report's header.
+    """
+    reader = csv.reader(lines, delimiter=delimiter)
+    header = next(reader, None)
+    if not header:
+      return
+
+    typed_columns = [self._IsNumericReportColumn(column) for column in header]
+    for row in reader:
+      yield {
+          column: self._ConvertReportValue(value) if typed else value
+          for column, typed, value in zip(header, typed_columns, row)}
+
+  def _IsNumericReportColumn(self, column):
+    """Returns whether a report column holds metrics or IDs."""
+    return column.startswith('Column.') or column.endswith('_ID')
+
+  def _ConvertReportValue(self, value):
+    """Converts a metric or ID value to an int or float where possible."""
+    try:
+      return int(value)
+    except ValueError:
+      try:
+        return float(value)
+      except ValueError:
+        return value
+
+  def _DownloadRangesToFile(self, url, outfile, max_connections, chunk_size,
+                            max_retries):
+    """Downloads a URL to a seekable file in parallel byte ranges.
+
+    Args:
+      url: The URL to download.
+      outfile: A writeable, seekable file-like object to write to.
+      max_connections: The maximum number of parallel range requests.
+      chunk_size: The number of bytes read at a time, or None to adapt it.
+      max_retries: The number of times each range is resumed.
+    """
+    headers = dict(self._http_headers, Range='bytes=0-0')
+    probe_response = self._GetDownloadResponse(url, headers)
+
+    if probe_response.status_code == 416:  # The report is empty.
+      probe_response.close()
+      return
+    elif (probe_response.status_code != 206
+          or not probe_response.headers.get('Content-Range', '').split('/')[-1]
+          .isdigit()):
+      # Ranges are not supported, so download the whole response.
+      self._DownloadRange(url, lambda _, chunk: outfile.write(chunk), 0, None,
+                          chunk_size, max_retries, probe_response)
+      return
+
+    probe_response.close()
+    size = int(probe_response.headers['Content-Range'].split('/')[-1])
+    part_size = max(_MIN_RANGE_PART_SIZE, -(-size // max_connections))
+    base_position = outfile.tell()
+    write_lock = threading.Lock()
+
+    def Write(position, chunk):
+      with write_lock:
+        outfile.seek(base_position + position)
+        outfile.write(chunk)
+
+    with concurrent.futures.ThreadPoolExecutor(max_connections) as executor:
+      futures = [
+          executor.submit(self._DownloadRange, url, Write, start,
+                          min(start + part_size, size), chunk_size, max_retries)
+          for start in range(0, size, part_size)]
+      try:
+        for future in futures:
+          future.result()
+      finally:
+        for future in futures:
+          future.cancel()
+
+    outfile.seek(base_position + size)
+
+  def _DownloadRange(self, url, write, start, end, chunk_size, max_retries,
+                     response=None):
+    """Downloads a byte range of a URL, resuming it if the connection drops.
+
+    Args:
+      url: The URL to download.
+      write: A function taking the position of a chunk and the chunk to write.
+      start: The position of the first byte to download.
+      end: The position after the last byte to download, or None to download
+        until the end.
+      chunk_size: The number of bytes read at a time, or None to adapt it.
+      max_retries: The number of times the range is resumed.
+      [optional]
+      response: A response for the range to read before making any requests.
+
+    Raises:
+      GoogleAdsError: If a dropped download cannot be resumed because the
+        server does not support range requests.
+    """
+    position = start
+    retries = 0
+
+    while end is None or position < end:
+      try:
+        if response is None:
+          headers = dict(self._http_headers)
+          if position or end is not None:
+            headers['Range'] = 'bytes=%d-%s' % (
+                position, '' if end is None else end - 1)
+          response = self._GetDownloadResponse(url, headers)
+          if 'Range' in headers and response.status_code != 206:
+            response.close()
+            raise googleads.errors.GoogleAdsError(
+                'Unable to resume the report download as the server does not '
+                'support range requests.')
+
+        with response:
+          for chunk in self._ReadChunks(response, chunk_size):
+            write(position, chunk)
+            position += len(chunk)
+        response = None
+
+        if end is None:
+          return
+        elif position < end:
+          raise urllib3.exceptions.ProtocolError(
+              'The connection closed after %d of %d bytes.' % (
+                  position - start, end - start))
+      except _RESUMABLE_DOWNLOAD_ERRORS as e:
+        response = None
+        if retries >= max_retries:
+          raise
+        retries += 1
+        _data_downloader_logger.warning(
+            'Resuming report download at byte %d after error: %s', position, e)
+
+  def _GetDownloadResponse(self, url, headers):
+    """Requests a report URL and checks the response status."""
+    # The raw response is written to the report file and Range offsets count
+    # its bytes, so the session must not negotiate a transfer encoding.
+    headers = dict(headers, **{'Accept-Encoding': 'identity'})
+    response = self.http_session.get(
+        url, headers=headers, stream=True,
+        timeout=self._ad_manager_client.timeout)
+
+    _data_downloader_logger.debug(
+        'Incoming response: %s %s REDACTED REPORT DATA', response.status_code,
+        response.reason)
+
+    if response.status_code != 416:
+      response.raise_for_status()
+    return response
+
+  def _ReadChunks(self, response, chunk_size):
+    """Yields the raw chunks of a streamed response.
+
+    The raw stream is read so that the report is written exactly as served,
+    matching useGzipCompression, without being decoded by requests.
+
+    Args:
+      response: The streamed response to read.
+      chunk_size: The number of bytes read at a time, or None to grow it while
+        reads complete quickly and shrink it when they are slow.
+
+    Yields:
+      The chunks of the response body.
+    """
+    adaptive = chunk_size is None
+    if adaptive:
+      chunk_size = _CHUNK_SIZE
+
+    while True:
+      start_time = time.time()
+      chunk = response.raw.read(chunk_size, decode_content=False)
+      if not chunk: break
+      yield chunk
+
+      if adaptive:
+        read_seconds = time.time() - start_time
+        if len(chunk) == chunk_size and read_seconds < 0.05:
+          chunk_size = min(chunk_size * 2, _MAX_CHUNK_SIZE)
+        elif read_seconds > 0.5:
+          chunk_size = max(chunk_size // 2, _CHUNK_SIZE)
+
+  def _IsSeekable(self, outfile):
+    """Returns whether chunks can be written at any position of outfile."""
+    try:
+      return outfile.seekable()
+    except (AttributeError, ValueError):
+      return False
+
+  def DownloadPqlResultToList(self, pql_query, values=None,
+                              max_pages_in_flight=1, keyset_column=None,
+                              page_sizer=None):
+    """Downloads the results of a PQL query to a list.
+
+    Args:
+      pql_query: str a statement filter to apply (the query should not include
+                 the limit or the offset)
+      [optional]
+      values: A dict of python objects or a list of raw SOAP values to bind
+              to the pql_query.
+      max_pages_in_flight: int the maximum number of pages requested
+                           concurrently. Rows are still returned in order.
+      keyset_column: str a unique column, e.g. 'Id', to page by instead of by
+                     offset. It must be selected by the pql_query, which must
+                     not include an ORDER BY clause.
+      page_sizer: AdaptivePageSizer used to adapt the page size to the
+                  observed responses instead of using SUGGESTED_PAGE_LIMIT.
+
+    Returns:
+      a list of lists with the first being the header row and each subsequent
+      list being a row of results.
+    """
+    results = []
+    self._PageThroughPqlSet(pql_query, results.append, values,
+                            max_pages_in_flight, keyset_column, page_sizer)
+    return results
+
+  def DownloadPqlResultToCsv(self, pql_query, file_handle, values=None,
+                             max_pages_in_flight=1, keyset_column=None,
+                             page_sizer=None):
+    """Downloads the results of a PQL query to CSV.
+
+    Args:
+      pql_query: str a statement filter to apply (the query should not include
+                 the limit or the offset)
+      file_handle: file the file object to write to.
+      [optional]
+      values: A dict of python objects or a list of raw SOAP values to bind
+              to the pql_query.
+      max_pages_in_flight: int the maximum number of pages requested
+                           concurrently. Rows are still written in order.
+      keyset_column: str a unique column, e.g. 'Id', to page by instead of by
+                     offset. It must be selected by the pql_query, which must
+                     not include an ORDER BY clause.
+      page_sizer: AdaptivePageSizer used to adapt the page size to the
+                  observed responses instead of using SUGGESTED_PAGE_LIMIT.
+    """
+    pql_writer = csv.writer(file_handle, delimiter=',',
+                            quotechar='"', quoting=csv.QUOTE_ALL)
+    self._PageThroughPqlSet(pql_query, pql_writer.writerow, values,
+                            max_pages_in_flight, keyset_column, page_sizer)
+
+  def IteratePqlResultBatches(self, pql_query, values=None,
+                              max_pages_in_flight=1, keyset_column=None,
+                              page_sizer=None, schema=None):
+    """Downloads the results of a PQL query as Arrow record batches.
+
+    Each page of results is converted into a record batch column by column,
+    without creating the intermediate values of DownloadPqlResultToList. The
+    schema is inferred from the value types of the first page: TextValue as
+    strings, NumberValue as int64 or float64, BooleanValue as booleans,
+    DateValue as dates, DateTimeValue as UTC timestamps and SetValue as lists
+    of strings.
+
+    Args:
+      pql_query: str a statement filter to apply (the query should not include
+                 the limit or the offset)
+      [optional]
+      values: A dict of python objects or a list of raw SOAP values to bind
+              to the pql_query.
+      max_pages_in_flight: int the maximum number of pages requested
+                           concurrently. Batches are still yielded in order.
+      keyset_column: str a unique column, e.g. 'Id', to page by instead of by
+                     offset.
+      page_sizer: AdaptivePageSizer used to adapt the page size to the
+                  observed responses.
+      schema: pyarrow.Schema to convert the results to instead of inferring
+              it, e.g. if a NumberValue column holds both integers and
+              decimals.
+
+    Returns:
+      A generator yielding a pyarrow.RecordBatch for each page of results.
+
+    Raises:
+      GoogleAdsError: If pyarrow is not installed.
+    """
+    _CheckArrowAvailable()
+    pages = self._IteratePqlPages(pql_query, values, max_pages_in_flight,
+                                  keyset_column, page_sizer)
+    return self._ConvertPqlPagesToBatches(pages, schema)
+
+  def DownloadPqlResultToParquet(self, pql_query, where, values=None,
+                                 max_pages_in_flight=1, keyset_column=None,
+                                 page_sizer=None, schema=None):
+    """Downloads the results of a PQL query into a Parquet file.
+
+    Args:
+      pql_query: str a statement filter to apply (the query should not include
+                 the limit or the offset)
+      where: str or file a path or writeable file-like object to write the
+             Parquet file to.
+      [optional]
+      values: A dict of python objects or a list of raw SOAP values to bind
+              to the pql_query.
+      max_pages_in_flight: int the maximum number of pages requested
+                           concurrently.
+      keyset_column: str a unique column, e.g. 'Id', to page by instead of by
+                     offset.
+      page_sizer: AdaptivePageSizer used to adapt the page size to the
+                  observed responses.
+      schema: pyarrow.Schema to convert the results to instead of inferring
+              it.
+    """
+    self._WriteBatchesToParquet(
+        self.IteratePqlResultBatches(pql_query, values, max_pages_in_flight,
+                                     keyset_column, page_sizer, schema),
+        where, schema)
+
+  def _ConvertPqlPagesToBatches(self, pages, schema):
+    """Converts PQL result pages into Arrow record batches."""
+    for response in pages:
+      if schema is None:
+        schema = self._GetPqlArrowSchema(response)
+
+      rows = response['rows']
+      yield pyarrow.RecordBatch.from_arrays(
+          [self._ConvertPqlColumnToArrow(
+              [row['values'][index] for row in rows], field.type)
+           for index, field in enumerate(schema)], schema=schema)
+
+  def _GetPqlArrowSchema(self, response):
+    """Infers the Arrow schema of a PQL result set from its first page."""
+    fields = []
+    for index, label in enumerate(response['columnTypes']):
+      cells = [row['values'][index] for row in response['rows']]
+      class_type = AdManagerClassType(cells[0]) if cells else 'TextValue'
+
+      if class_type == 'NumberValue':
+        is_decimal = any(
+            'value' in cell and cell['value'] and
+            any(character in cell['value'] for character in '.eE')
+            for cell in cells)
+        data_type = pyarrow.float64() if is_decimal else pyarrow.int64()
+      else:
+        data_type = self._PQL_ARROW_TYPES.get(class_type, pyarrow.string())
+      fields.append(pyarrow.field(label['labelName'], data_type))
+    return pyarrow.schema(fields)
+
+  def _ConvertPqlColumnToArrow(self, cells, data_type):
+    """Converts the PQL values of a column into an Arrow array.
+
+    Args:
+      cells: list the PQL Value objects of the column.
+      data_type: pyarrow.DataType the type to convert to.
+
+    Returns:
+      pyarrow.Array the converted column.
+    """
+    if pyarrow.types.is_list(data_type):
+      return pyarrow.array(
+          [[str(value['value']) for value in cell['values']]
+           if 'values' in cell and cell['values'] is not None else None
+           for cell in cells], data_type)
+
+    fields = [cell['value'] if 'value' in cell else None for cell in cells]
+    if pyarrow.types.is_date32(data_type):
+      return pyarrow.array(
+          [datetime.date(int(field['year']), int(field['month']),
+                         int(field['day'])) if field else None
+           for field in fields], data_type)
+    elif pyarrow.types.is_timestamp(data_type):
+      return pyarrow.array(
+          [self._ConvertDateTimeToTimestamp(field) if field else None
+           for field in fields], data_type)
+    elif pyarrow.types.is_boolean(data_type):
+      return pyarrow.array(fields, data_type)
+    # Numbers are parsed by Arrow rather than one Python object at a time.
+    return pyarrow.array(
+        [field if field != '' else None for field in fields],
+        pyarrow.string()).cast(data_type)
+
+  def _ConvertDateTimeToTimestamp(self, date_time_value):
+    """Converts a PQL dateTime value to seconds since the epoch."""
+    date = date_time_value['date']
+    year, month, day = int(date['year']), int(date['month']), int(date['day'])
+    hour = int(date_time_value['hour'])
+    minute = int(date_time_value['minute'])
+    second = int(date_time_value['second'])
+    offset_seconds, _ = _GetUtcOffset(date_time_value['timeZoneId'], year,
+                                      month, day)
+    if offset_seconds is None:
+      return int(_GetTimeZone(date_time_value['timeZoneId']).localize(
+          datetime.datetime(year, month, day, hour, minute, second))
+                 .timestamp())
+    return ((datetime.date(year, month, day).toordinal() - _EPOCH_ORDINAL)
+            * 86400 + hour * 3600 + minute * 60 + second - offset_seconds)
+
+  def _WriteBatchesToParquet(self, batches, where, schema=None):
+    """Writes Arrow record batches into a Parquet file as they arrive.
+
+    Args:
+      batches: An iterable of pyarrow.RecordBatch objects.
+      where: A path or writeable file-like object to write to.
+      schema: The pyarrow.Schema to write if there are no batches.
+    """
+    writer = None
+    try:
+      for batch in batches:
+        if writer is None:
+          writer = pyarrow.parquet.ParquetWriter(where, batch.schema)
+        writer.write_batch(batch)
+      if writer is None:
+        writer = pyarrow.parquet.ParquetWriter(
+            where, schema or pyarrow.schema([]))
+    finally:
+      if writer is not None:
+        writer.close()
+
+  def _ConvertValueForCsv(self, pql_value):
+    """Sanitizes a field value from a Value object to a CSV suitable format.
+
+    Args:
+      pql_value: dict a dictionary containing the data for a single field of an
+                 entity.
 
     Returns:
       str a CSV writer friendly value formatted by Value.Type.
@@ -1031,7 +3417,9 @@ class DataDownloader(object):
     else:
       return '-'
 
-  def _PageThroughPqlSet(self, pql_query, output_function, values):
+  def _PageThroughPqlSet(self, pql_query, output_function, values,
+                         max_pages_in_flight=1, keyset_column=None,
+                         page_sizer=None):
     """Pages through a pql_query and performs an action (output_function).
 
     Args:
@@ -1041,38 +3429,265 @@ class DataDownloader(object):
                        memory)
       values: A dict of python objects or a list of raw SOAP values to bind
               to the pql_query.
+      [optional]
+      max_pages_in_flight: int the maximum number of pages requested at a time.
+      keyset_column: str a unique column to page by instead of by offset.
+      page_sizer: AdaptivePageSizer used to choose the size of each page.
+    """
+    pages = self._IteratePqlPages(pql_query, values, max_pages_in_flight,
+                                  keyset_column, page_sizer)
+    conversion_plan = None
+    for page_index, response in enumerate(pages):
+      # Write the header row only on first pull
+      if page_index == 0:
+        output_function([label['labelName']
+                         for label in response['columnTypes']])
+
+      entities = response['rows']
+      if not entities:
+        continue
+      # The conversion of each column is chosen once from the first row. Columns
+      # of a page with values of another type, e.g. a null TextValue in a
+      # column of NumberValues, are converted value by value instead.
+      if conversion_plan is None:
+        conversion_plan = self._GetPqlConversionPlan(entities[0])
+
+      columns = []
+      for index, (value_class, convert_column) in enumerate(conversion_plan):
+        pql_values = [entity['values'][index] for entity in entities]
+        if set(map(type, pql_values)) != {value_class}:
+          convert_column = self._ConvertOtherColumnForCsv
+        columns.append(convert_column(pql_values))
+      for row in zip(*columns):
+        output_function(list(row))
+
+  def _GetPqlConversionPlan(self, entity):
+    """Returns the functions converting each column of a PQL result set.
+
+    Each function converts a list of PQL values of the column's value type
+    into the same values _ConvertValueForCsv would return for each of them.
+
+    Args:
+      entity: dict a row of the PQL result set.
+
+    Returns:
+      list of tuples of the value class and conversion function of each
+      column, in column order.
+    """
+    column_converters = {
+        'TextValue': self._ConvertTextColumnForCsv,
+        'NumberValue': self._ConvertNumberColumnForCsv,
+        'DateValue': self._ConvertDateColumnForCsv,
+        'DateTimeValue': self._ConvertDateTimeColumnForCsv,
+    }
+    return [(type(value),
+             column_converters.get(AdManagerClassType(value),
+                                   self._ConvertOtherColumnForCsv))
+            for value in entity['values']]
+
+  def _ConvertTextColumnForCsv(self, pql_values):
+    """Converts a column of TextValues like _ConvertValueForCsv."""
+    return [field.replace('"', '""') if field else '-'
+            for field in self._GetPqlFields(pql_values)]
+
+  def _ConvertNumberColumnForCsv(self, pql_values):
+    """Converts a column of NumberValues like _ConvertValueForCsv."""
+    return [(float(field) if '.' in field else int(field)) if field else '-'
+            for field in self._GetPqlFields(pql_values)]
+
+  def _ConvertDateColumnForCsv(self, pql_values):
+    """Converts a column of DateValues like _ConvertValueForCsv."""
+    return [datetime.date(int(field['year']), int(field['month']),
+                          int(field['day'])).isoformat() if field else '-'
+            for field in self._GetPqlFields(pql_values)]
+
+  def _ConvertDateTimeColumnForCsv(self, pql_values):
+    """Converts a column of DateTimeValues like _ConvertValueForCsv."""
+    return [self._FormatDateTime(field) if field else '-'
+            for field in self._GetPqlFields(pql_values)]
+
+  def _ConvertOtherColumnForCsv(self, pql_values):
+    """Converts a column of any other PQL values like _ConvertValueForCsv."""
+    return [self._ConvertValueForCsv(pql_value) for pql_value in pql_values]
+
+  def _GetPqlFields(self, pql_values):
+    """Returns the fields of a column of single PQL values."""
+    return [pql_value['value'] if 'value' in pql_value else None
+            for pql_value in pql_values]
+
+  def _IteratePqlPages(self, pql_query, values, max_pages_in_flight=1,
+                       keyset_column=None, page_sizer=None):
+    """Returns a generator of the pages of a pql_query's result set.
+
+    Pages are requested ahead of the one being consumed, but are always yielded
+    in offset order. As the size of a PQL result set is not known in advance,
+    up to max_pages_in_flight - 1 requests past its end may be made.
+
+    Args:
+      pql_query: str a statement filter to apply (the query should not include
+                 the limit or the offset)
+      values: A dict of python objects or a list of raw SOAP values to bind
+              to the pql_query.
+      [optional]
+      max_pages_in_flight: int the maximum number of pages requested at a time.
+      keyset_column: str a unique column to page by instead of by offset. It
+                     must be selected by the pql_query, which must not include
+                     an ORDER BY clause.
+      page_sizer: AdaptivePageSizer used to choose the size of each page
+                  instead of SUGGESTED_PAGE_LIMIT. Timed out requests are
+                  retried with a smaller page until its minimum page size.
+
+    Returns:
+      A generator yielding each PQL ResultSet with rows.
+
+    Raises:
+      GoogleAdsValueError: If max_pages_in_flight is less than 1, or greater
+          than 1 when paging by keyset or with a page_sizer, or the pql_query
+          cannot be paged by keyset.
     """
+    if max_pages_in_flight < 1:
+      raise googleads.errors.GoogleAdsValueError(
+          'max_pages_in_flight must be at least 1.')
+    if max_pages_in_flight != 1 and (keyset_column or page_sizer):
+      raise googleads.errors.GoogleAdsValueError(
+          'Pages cannot be requested concurrently when paging by keyset or '
+          'with a page sizer.')
+
     if isinstance(values, dict):
       values = PQLHelper.GetQueryValuesFromDict(values, self._version)
 
+    if keyset_column:
+      first_query = self._GetKeysetQuery(pql_query, keyset_column, False)
+      keyset_query = self._GetKeysetQuery(pql_query, keyset_column, True)
+
     pql_service = self._GetPqlService()
-    current_offset = 0
 
-    while True:
-      query_w_limit_offset = '%s LIMIT %d OFFSET %d' % (pql_query,
-                                                        SUGGESTED_PAGE_LIMIT,
-                                                        current_offset)
-      response = pql_service.select({'query': query_w_limit_offset,
-                                     'values': values})
-
-      if 'rows' in response:
-        # Write the header row only on first pull
-        if current_offset == 0:
-          header = response['columnTypes']
-          output_function([label['labelName'] for label in header])
-
-        entities = response['rows']
-        result_set_size = len(entities)
-
-        for entity in entities:
-          output_function([self._ConvertValueForCsv(value) for value
-                           in entity['values']])
-
-        current_offset += result_set_size
-        if result_set_size != SUGGESTED_PAGE_LIMIT:
-          break
+    def Select(offset, last_key):
+      """Selects the page at an offset or after a key, and its page size."""
+      while True:
+        page_size = page_sizer.page_size if page_sizer else SUGGESTED_PAGE_LIMIT
+        if not keyset_column:
+          statement = {'query': '%s LIMIT %d OFFSET %d' % (pql_query, page_size,
+                                                           offset),
+                       'values': values}
+        elif last_key is None:
+          statement = {'query': first_query % page_size, 'values': values}
+        else:
+          statement = {'query': keyset_query % page_size,
+                       'values': list(values or []) + [{
+                           'key': _KEYSET_BIND_VARIABLE, 'value': last_key}]}
+
+        start_time = time.time()
+        try:
+          response = pql_service.select(statement)
+        except requests.exceptions.Timeout:
+          if page_sizer and page_sizer.RecordTimeout():
+            continue
+          raise
+
+        if page_sizer:
+          rows = response['rows'] if 'rows' in response else []
+          page_sizer.RecordPage(
+              page_size, len(rows), time.time() - start_time,
+              sum(len(row['values']) for row in rows))
+        return response, page_size
+
+    def GetPages():
+      """Yields the pages of the result set in order."""
+      with concurrent.futures.ThreadPoolExecutor(
+          max_pages_in_flight) as executor:
+        pending = collections.deque(
+            executor.submit(Select, offset, None) for offset in range(
+                0, max_pages_in_flight * SUGGESTED_PAGE_LIMIT,
+                SUGGESTED_PAGE_LIMIT))
+        next_offset = max_pages_in_flight * SUGGESTED_PAGE_LIMIT
+        try:
+          current_offset = 0
+          while pending:
+            response, page_size = pending.popleft().result()
+            if 'rows' not in response:
+              break
+
+            if current_offset == 0 and keyset_column:
+              keyset_index = self._GetKeysetColumnIndex(
+                  response['columnTypes'], keyset_column)
+
+            entities = response['rows']
+            result_set_size = len(entities)
+
+            # Keep the window full while the result set continues.
+            if result_set_size == page_size:
+              if keyset_column:
+                pending.append(executor.submit(
+                    Select, None, entities[-1]['values'][keyset_index]))
+              elif page_sizer:
+                pending.append(executor.submit(
+                    Select, current_offset + page_size, None))
+              else:
+                pending.append(executor.submit(Select, next_offset, None))
+                next_offset += SUGGESTED_PAGE_LIMIT
+
+            yield response
+
+            current_offset += result_set_size
+            if result_set_size != page_size:
+              break
+        finally:
+          for future in pending:
+            future.cancel()
+
+    return GetPages()
+
+  def _GetKeysetQuery(self, pql_query, keyset_column, after_last_key):
+    """Rewrites a pql_query to fetch a page ordered by a keyset column.
+
+    Args:
+      pql_query: str a statement filter to apply (the query should not include
+                 the limit, offset or order by)
+      keyset_column: str the column to page by.
+      after_last_key: bool whether to only select rows after the last key.
+
+    Returns:
+      str the query for a page of results, with a %d placeholder for its
+      limit.
+
+    Raises:
+      GoogleAdsValueError: If the pql_query includes an ORDER BY clause.
+    """
+    if self._PQL_ORDER_BY_REGEX.search(pql_query):
+      raise googleads.errors.GoogleAdsValueError(
+          'The pql_query must not include an ORDER BY clause when paging by '
+          'keyset.')
+
+    if after_last_key:
+      keyset_clause = '%s > :%s' % (keyset_column, _KEYSET_BIND_VARIABLE)
+      query_parts = self._PQL_WHERE_REGEX.split(pql_query, 1)
+      if len(query_parts) == 2:
+        pql_query = '%s WHERE (%s) AND %s' % (query_parts[0], query_parts[1],
+                                              keyset_clause)
       else:
-        break
+        pql_query = '%s WHERE %s' % (pql_query, keyset_clause)
+
+    return '%s ORDER BY %s ASC LIMIT %%d' % (
+        pql_query.replace('%', '%%'), keyset_column)
+
+  def _GetKeysetColumnIndex(self, header, keyset_column):
+    """Returns the index of the keyset column in the PQL result columns.
+
+    Args:
+      header: list the columnTypes of the PQL result set.
+      keyset_column: str the column to page by.
+
+    Raises:
+      GoogleAdsValueError: If the keyset column was not selected.
+    """
+    labels = [label['labelName'].lower() for label in header]
+    try:
+      return labels.index(keyset_column.lower())
+    except ValueError:
+      raise googleads.errors.GoogleAdsValueError(
+          'The keyset column %s must be selected by the pql_query.'
+          % keyset_column)
 
   def _ConvertDateTimeToOffset(self, date_time_value):
     """Converts the PQL formatted response for a dateTime object.
@@ -1086,14 +3701,31 @@ class DataDownloader(object):
       str: A string representation of the date time value uniform to
            ReportService.
     """
-    date_time_obj = datetime.datetime(int(date_time_value['date']['year']),
-                                      int(date_time_value['date']['month']),
-                                      int(date_time_value['date']['day']),
+    return self._FormatDateTime(date_time_value)
+
+  def _FormatDateTime(self, date_time_value):
+    """Formats a PQL dateTime value in its time zone.
+
+    Args:
+      date_time_value: dict The date time value from the PQL response.
+
+    Returns:
+      str: An ISO 8061 representation of the date time value.
+    """
+    date = date_time_value['date']
+    date_time_obj = datetime.datetime(int(date['year']), int(date['month']),
+                                      int(date['day']),
                                       int(date_time_value['hour']),
                                       int(date_time_value['minute']),
                                       int(date_time_value['second']))
-    date_time_str = pytz.timezone(
-        date_time_value['timeZoneId']).localize(date_time_obj).isoformat()
+    _, suffix = _GetUtcOffset(date_time_value['timeZoneId'],
+                              date_time_obj.year, date_time_obj.month,
+                              date_time_obj.day)
+    if suffix is not None:
+      return date_time_obj.isoformat() + suffix
+
+    date_time_str = _GetTimeZone(date_time_value['timeZoneId']).localize(
+        date_time_obj).isoformat()
 
     if date_time_str[-5:] == '00:00':
       return date_time_str[:-6] + 'Z'
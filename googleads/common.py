@@ -17,12 +17,16 @@
 import abc
 import base64
 import binascii
+import collections
+import contextlib
 from functools import wraps
 import inspect
+import io
 import locale
 import logging
 import logging.config
 import os
+import pickle
 import ssl
 import sys
 import threading
@@ -31,18 +35,36 @@ from urllib.request import HTTPSHandler, ProxyHandler, build_opener
 
 import lxml.builder
 import lxml.etree
+import requests
+import requests.adapters
 import requests.exceptions
 import yaml
 import zeep
 import zeep.cache
 import zeep.exceptions
 import zeep.helpers
+import zeep.plugins
 import zeep.transports
+import zeep.wsdl
+import zeep.wsdl.messages.soap
+import zeep.wsdl.utils
 import zeep.xsd
 import googleads.errors
 import googleads.oauth2
 import googleads.util
 
+try:
+  import httpx
+except ImportError:
+  httpx = None
+
+try:
+  import zeep.settings
+  _ZeepSettings = zeep.settings.Settings
+except ImportError:
+  # zeep.settings was added in zeep 3.0.0.
+  _ZeepSettings = None
+
 
 _logger = logging.getLogger(__name__)
 
@@ -84,6 +106,35 @@ _utility_registry = googleads.util.UtilityRegistry()
 _UTILITY_REGISTER_YAML_KEY = 'include_utilities_in_user_agent'
 _UTILITY_LOCK = threading.Lock()
 
+# The default number of parsed WSDL documents kept in memory by the process-wide
+# WSDL document cache.
+_DEFAULT_WSDL_DOCUMENT_CACHE_SIZE = 100
+# The default number of pooled connections kept per host by HTTP sessions.
+DEFAULT_HTTP_POOL_SIZE = 10
+# The header stored in WSDL document snapshots. Snapshots are only compatible
+# with the library and zeep versions that created them.
+_WSDL_SNAPSHOT_HEADER = ('googleads-wsdl-snapshot', VERSION, zeep.__version__)
+# The modules zeep assigns to the classes it generates while parsing a schema.
+_ZEEP_DYNAMIC_MODULES = ('zeep.xsd.dynamic_types', 'zeep.objects')
+
+# Response modes of ZeepServiceProxy. Responses are deserialized into zeep
+# objects by default, or parsed directly into dicts and lists, streaming the
+# results of pages.
+RESPONSE_MODE_ZEEP = 'zeep'
+RESPONSE_MODE_DICT = 'dict'
+RESPONSE_MODE_STREAM = 'stream'
+_RESPONSE_MODES = (RESPONSE_MODE_ZEEP, RESPONSE_MODE_DICT,
+                   RESPONSE_MODE_STREAM)
+_SOAP_ENVELOPE_NAMESPACE = 'http://schemas.xmlsoap.org/soap/envelope/'
+_SOAP_BODY_TAG = '{%s}Body' % _SOAP_ENVELOPE_NAMESPACE
+_SOAP_FAULT_TAG = '{%s}Fault' % _SOAP_ENVELOPE_NAMESPACE
+_XSI_NAMESPACE = 'http://www.w3.org/2001/XMLSchema-instance'
+_XSI_TYPE_ATTRIBUTE = '{%s}type' % _XSI_NAMESPACE
+_XSI_NIL_ATTRIBUTE = '{%s}nil' % _XSI_NAMESPACE
+# The number of rendered SOAP headers each service keeps, keyed by method and
+# header values.
+_SOAP_HEADER_CACHE_SIZE = 64
+
 
 def GenerateLibSig(short_name):
   """Generates a library signature suitable for a user agent field.
@@ -477,6 +528,74 @@ class ProxyConfig(object):
     """
     return build_opener(*self.GetHandlers())
 
+  def BuildSession(self, pool_size=DEFAULT_HTTP_POOL_SIZE, keep_alive=True,
+                   adapter=None):
+    """Builds a pooled requests.Session using the ProxyConfig settings.
+
+    Args:
+      pool_size: An integer specifying the maximum number of connections kept
+        open per host.
+      keep_alive: A boolean indicating whether connections should be kept open
+        and reused between requests.
+      adapter: An optional requests.adapters.HTTPAdapter to mount instead of a
+        new one of pool_size, so that the session shares its connection pool
+        with other sessions.
+
+    Returns:
+      A requests.Session instance configured with the ProxyConfig settings.
+    """
+    session = requests.Session()
+    if adapter is None:
+      adapter = requests.adapters.HTTPAdapter(
+          pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.proxies = self.proxies
+
+    if self.disable_certificate_validation:
+      session.verify = False
+    elif self.cafile:
+      session.verify = self.cafile
+
+    if not keep_alive:
+      session.headers['Connection'] = 'close'
+
+    return session
+
+  def BuildAsyncClient(self, pool_size=DEFAULT_HTTP_POOL_SIZE, keep_alive=True,
+                       timeout=None):
+    """Builds a pooled httpx.AsyncClient using the ProxyConfig settings.
+
+    Args:
+      pool_size: An integer specifying the maximum number of open connections.
+      keep_alive: A boolean indicating whether connections should be kept open
+        and reused between requests.
+      timeout: An optional timeout in seconds for requests.
+
+    Returns:
+      An httpx.AsyncClient instance configured with the ProxyConfig settings.
+
+    Raises:
+      GoogleAdsError: If httpx or zeep 4.0.0 or later is not installed.
+    """
+    _CheckAsyncSupported()
+    return httpx.AsyncClient(
+        verify=self.GetHttpxVerify(), proxy=self.GetHttpxProxy(),
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=pool_size,
+                            max_keepalive_connections=(
+                                pool_size if keep_alive else 0)))
+
+  def GetHttpxProxy(self):
+    """Returns the proxy URL to use with httpx, or None."""
+    return self.proxies.get('https') or self.proxies.get('http')
+
+  def GetHttpxVerify(self):
+    """Returns the certificate verification setting to use with httpx."""
+    if self.disable_certificate_validation:
+      return False
+    return self.ssl_context or True
+
   def GetHandlers(self):
     """Retrieve the appropriate urllib handlers for the given configuration.
 
@@ -495,25 +614,264 @@ class ProxyConfig(object):
     return handlers
 
 
+# The process-wide cache of parsed WSDL documents shared by all service proxies.
+# Parsing a WSDL and its XSD imports is expensive even when the raw bytes are
+# served from a zeep.cache.Base, so parsed documents are kept in memory keyed by
+# the WSDL endpoint (which includes the server and service name) and version.
+_wsdl_document_cache = googleads.util.LruCache(
+    _DEFAULT_WSDL_DOCUMENT_CACHE_SIZE)
+# zeep.Client only accepts an already parsed document since zeep 4.2.0, so
+# older versions of zeep parse the WSDL for every service proxy.
+_ZEEP_CLIENT_ACCEPTS_DOCUMENT = tuple(
+    int(part) for part in zeep.__version__.split('.')[:2]
+    if part.isdigit()) >= (4, 2)
+
+
+def InvalidateWsdlDocumentCache(endpoint=None, version=None):
+  """Removes parsed WSDL documents from the process-wide cache.
+
+  Service proxies created afterwards will download and parse their WSDL again.
+
+  Args:
+    endpoint: An optional string URL of the WSDL to invalidate. If not set,
+      documents for all endpoints are removed.
+    version: An optional string API version to invalidate. If not set,
+      documents for all versions are removed.
+  """
+  _wsdl_document_cache.Invalidate(
+      lambda key: ((endpoint is None or key[0] == endpoint) and
+                   (version is None or key[1] == version)))
+
+
+def SetWsdlDocumentCacheSize(max_size):
+  """Sets the number of parsed WSDL documents kept in the process-wide cache.
+
+  Args:
+    max_size: An integer specifying the maximum number of documents to keep.
+      A value of 0 disables the cache.
+  """
+  _wsdl_document_cache.SetMaxSize(max_size)
+
+
+def _RestoreZeepSettings(kwargs):
+  """Recreates zeep.settings.Settings while unpickling a WSDL snapshot."""
+  return _ZeepSettings(**kwargs)
+
+
+def _RestoreXmlElement(data):
+  """Recreates an lxml element while unpickling a WSDL snapshot."""
+  return lxml.etree.fromstring(data)
+
+
+def _RestoreDynamicType(name, bases, attributes):
+  """Recreates a class generated by zeep while unpickling a WSDL snapshot."""
+  return type(name, bases, attributes)
+
+
+def _RestoreTransport():
+  """Placeholder for the transport of a WSDL document in a snapshot."""
+  return None
+
+
+class _WsdlDocumentPickler(pickle.Pickler):
+  """A pickler for parsed zeep WSDL documents.
+
+  zeep documents reference classes generated at parse time, lxml objects, and
+  thread-local settings, none of which can be pickled directly. This reduces
+  them to data that is enough to recreate them when the snapshot is loaded. The
+  document's transport is dropped since each service proxy supplies its own.
+  """
+
+  def reducer_override(self, obj):
+    """Returns a custom reduction for objects the default pickler can't handle.
+
+    Args:
+      obj: The object being pickled.
+
+    Returns:
+      A reduction tuple, or NotImplemented to use the default pickling.
+    """
+    if isinstance(obj, type):
+      if obj.__module__ in _ZEEP_DYNAMIC_MODULES:
+        attributes = {k: v for k, v in vars(obj).items()
+                      if k not in ('__dict__', '__weakref__')}
+        return _RestoreDynamicType, (obj.__name__, obj.__bases__, attributes)
+      return NotImplemented
+    elif _ZeepSettings is not None and isinstance(obj, _ZeepSettings):
+      names = getattr(type(obj), '__slots__', None) or list(vars(obj))
+      return _RestoreZeepSettings, ({
+          k: getattr(obj, k) for k in names if not k.startswith('_')},)
+    elif isinstance(obj, lxml.etree._Element):
+      return _RestoreXmlElement, (lxml.etree.tostring(obj),)
+    elif isinstance(obj, lxml.etree.QName):
+      return lxml.etree.QName, (obj.text,)
+    elif isinstance(obj, zeep.transports.Transport):
+      return _RestoreTransport, ()
+    return NotImplemented
+
+
+def SaveWsdlDocumentSnapshot(document, path):
+  """Writes a parsed WSDL document to a snapshot file.
+
+  Args:
+    document: The zeep.wsdl.Document to save.
+    path: A string path of the snapshot file to write. Missing parent
+      directories are created.
+  """
+  directory = os.path.dirname(path)
+  if directory and not os.path.isdir(directory):
+    os.makedirs(directory)
+
+  with open(path, 'wb') as handle:
+    pickler = _WsdlDocumentPickler(handle, protocol=pickle.HIGHEST_PROTOCOL)
+    pickler.dump((_WSDL_SNAPSHOT_HEADER, document))
+
+
+def LoadWsdlDocumentSnapshot(endpoint, version, path):
+  """Loads a WSDL document snapshot into the process-wide WSDL document cache.
+
+  Service proxies subsequently created for the endpoint and version reuse the
+  loaded document instead of downloading and parsing the WSDL. Snapshots are
+  unpickled, so only load files you created yourself.
+
+  Args:
+    endpoint: A string URL of the WSDL the snapshot was created from.
+    version: A string identifying the API version of the WSDL.
+    path: A string path of the snapshot file.
+
+  Returns:
+    The cached zeep.wsdl.Document, or None if the snapshot doesn't exist or
+    was created by a different library or zeep version.
+  """
+  document = _wsdl_document_cache.Get((endpoint, version))
+  if document is not None:
+    return document
+
+  try:
+    with open(path, 'rb') as handle:
+      header, document = pickle.load(handle)
+  except IOError:
+    return None
+  except (pickle.UnpicklingError, AttributeError, EOFError, ImportError,
+          IndexError, TypeError, ValueError) as e:
+    _logger.warning('Ignoring unreadable WSDL snapshot %s: %s', path, e)
+    return None
+
+  if header != _WSDL_SNAPSHOT_HEADER:
+    _logger.warning('Ignoring WSDL snapshot %s created by %s.', path, header)
+    return None
+
+  _wsdl_document_cache.Set((endpoint, version), document)
+  return document
+
+
 class _ZeepProxyTransport(zeep.transports.Transport):
   """A Zeep transport which configures caching, proxy support, and timeouts."""
-  def __init__(self, timeout, proxy_config, cache):
+  def __init__(self, timeout, proxy_config, cache, session=None):
     """Initializes _ZeepProxyTransport.
 
     Args:
       timeout: An integer timeout in MS for connections.
       proxy_config: A ProxyConfig instance representing proxy settings.
       cache: A zeep.cache.Base instance representing a cache strategy to employ.
+      session: An optional requests.Session to send requests with, allowing
+        connections to be shared with other transports. zeep mounts a file://
+        adapter on it, so it shouldn't be used for anything but SOAP requests.
     """
     if not cache:
       cache = zeep.cache.SqliteCache()
     elif cache == ZeepServiceProxy.NO_CACHE:
       cache = None
 
+    user_agent = session.headers.get('User-Agent') if session else None
     super(_ZeepProxyTransport, self).__init__(
-        timeout=timeout, operation_timeout=timeout, cache=cache)
+        timeout=timeout, operation_timeout=timeout, cache=cache,
+        session=session)
 
+    # zeep replaces the User-Agent of the session it's given with its own.
+    if user_agent:
+      self.session.headers['User-Agent'] = user_agent
     self.session.proxies = proxy_config.proxies
+    # The rendered SOAP header spliced into envelopes posted by each thread.
+    self._spliced_soap_header = threading.local()
+
+  @contextlib.contextmanager
+  def SplicedSOAPHeader(self, soap_header):
+    """Splices a rendered SOAP header into envelopes posted by this thread.
+
+    Args:
+      soap_header: The serialized soap-env:Header element, as bytes.
+
+    Yields:
+      None, while envelopes are spliced.
+    """
+    self._spliced_soap_header.value = soap_header
+    try:
+      yield
+    finally:
+      self._spliced_soap_header.value = None
+
+  def post_xml(self, address, envelope, headers):
+    """Serializes and posts an envelope, splicing in a rendered SOAP header.
+
+    Args:
+      address: The URL the envelope is posted to.
+      envelope: The soap-env:Envelope element, without a header if a SOAP
+          header is spliced.
+      headers: A dict of HTTP headers.
+
+    Returns:
+      The requests.Response of the post.
+    """
+    soap_header = getattr(self._spliced_soap_header, 'value', None)
+    if soap_header is None:
+      return super(_ZeepProxyTransport, self).post_xml(
+          address, envelope, headers)
+
+    message = zeep.wsdl.utils.etree_to_string(envelope)
+    # The header goes right after the envelope's start tag, which follows the
+    # XML declaration.
+    body_start = message.index(b'>', message.index(b'<', 1)) + 1
+    return self.post(address, b''.join(
+        (message[:body_start], soap_header, message[body_start:])), headers)
+
+
+def _CreateZeepAsyncTransport(timeout, proxy_config, cache, client=None):
+  """Creates an asynchronous zeep transport with caching, proxy and timeouts.
+
+  The transport is only built on demand, since zeep.transports.AsyncTransport
+  requires zeep 4.0.0 or later, which synchronous services don't.
+
+  Args:
+    timeout: An integer timeout in MS for connections.
+    proxy_config: A ProxyConfig instance representing proxy settings.
+    cache: A zeep.cache.Base instance representing a cache strategy to employ.
+    client: An optional httpx.AsyncClient to send requests with, allowing
+      connections to be shared with other transports.
+
+  Returns:
+    A zeep.transports.AsyncTransport instance.
+  """
+  if not cache:
+    cache = zeep.cache.SqliteCache()
+  elif cache == ZeepServiceProxy.NO_CACHE:
+    cache = None
+
+  if client is None:
+    client = proxy_config.BuildAsyncClient(timeout=timeout)
+
+  return zeep.transports.AsyncTransport(
+      client=client, cache=cache, timeout=timeout, operation_timeout=timeout,
+      verify_ssl=proxy_config.GetHttpxVerify(),
+      proxy=proxy_config.GetHttpxProxy())
+
+
+def _CheckAsyncSupported():
+  """Raises a GoogleAdsError if asynchronous requests aren't supported."""
+  if httpx is None or not hasattr(zeep.transports, 'AsyncTransport'):
+    raise googleads.errors.GoogleAdsError(
+        'httpx and zeep 4.0.0 or later are required for asynchronous '
+        'requests. Install them with "pip install googleads[async]".')
 
 
 class SoapPacker(object):
@@ -716,6 +1074,200 @@ class _ZeepAuthHeaderPlugin(zeep.Plugin):
     return envelope, http_headers
 
 
+class _PackingPlan(object):
+  """A precomputed recipe for packing dictionaries into a zeep complex type.
+
+  Plans hold the element map of their type, so it isn't rebuilt for every
+  packed object. For types that are a plain sequence of elements, as nearly
+  all Ad Manager types are, objects are also constructed directly from the
+  packed values instead of through zeep's generic signature processing.
+  """
+
+  def __init__(self, elem_type):
+    """Initializes a _PackingPlan.
+
+    Args:
+      elem_type: The zeep.xsd.ComplexType objects are packed into.
+    """
+    self.elem_type = elem_type
+    self.elements = dict(elem_type.elements)
+    self.type_attr = next((e_name for e_name, _ in elem_type.elements
+                           if e_name.endswith('.Type')), None)
+    self._value_class = None
+    if self._IsPlainSequence(elem_type):
+      self._value_class = elem_type._value_class
+      self._defaults = [(e_name, element.accepts_multiple,
+                         element.default_value)
+                        for e_name, element in elem_type.elements]
+      self._complex_elements = frozenset(
+          e_name for e_name, element in elem_type.elements
+          if isinstance(element.type, zeep.xsd.ComplexType))
+
+  @staticmethod
+  def _IsPlainSequence(elem_type):
+    """Returns whether a type's elements form a single, plain sequence."""
+    if not isinstance(elem_type, zeep.xsd.ComplexType) or (
+        elem_type._array_type or elem_type.attributes):
+      return False
+    nested = elem_type.elements_nested
+    return len(nested) <= 1 and all(
+        isinstance(indicator, zeep.xsd.Sequence)
+        and not indicator.accepts_multiple
+        and all(isinstance(child, zeep.xsd.Element) for child in indicator)
+        for _, indicator in nested)
+
+  def Create(self, arguments):
+    """Creates an instance of the type from packed element values.
+
+    Args:
+      arguments: A dict mapping element names to packed values.
+
+    Returns:
+      An instance of the type.
+    """
+    if self._value_class is None or not self._CanCreateDirectly(arguments):
+      return self.elem_type(**arguments)
+
+    values = collections.OrderedDict(
+        (e_name, [] if accepts_multiple else default)
+        for e_name, accepts_multiple, default in self._defaults)
+    values.update(arguments)
+    instance = self._value_class.__new__(self._value_class)
+    instance.__values__ = values
+    return instance
+
+  def _CanCreateDirectly(self, arguments):
+    """Returns whether zeep would store the arguments without converting them.
+
+    zeep converts values of complex elements that aren't already objects, and
+    rejects unknown elements, so those cases are left to zeep.
+    """
+    for e_name, value in arguments.items():
+      if e_name not in self.elements:
+        return False
+      if e_name in self._complex_elements:
+        values = value if isinstance(value, list) else (value,)
+        if not all(item is None or isinstance(item, zeep.xsd.CompoundValue)
+                   for item in values):
+          return False
+    return True
+
+
+class _ParsingPlan(object):
+  """A precomputed recipe for parsing XML elements of a zeep complex type.
+
+  Plans map the localname of each child element to the element's name, type,
+  and whether it repeats, so responses can be parsed into dicts without
+  building zeep objects.
+  """
+
+  def __init__(self, elem_type):
+    """Initializes a _ParsingPlan.
+
+    Args:
+      elem_type: The zeep.xsd.ComplexType of the parsed elements.
+    """
+    self.elem_type = elem_type
+    self.children = {}
+    self._defaults = {}
+    self._list_names = []
+    for e_name, element in elem_type.elements:
+      localname = element.qname.localname if element.qname else e_name
+      self.children[localname] = (e_name, element.type,
+                                  element.accepts_multiple)
+      if element.accepts_multiple:
+        self._list_names.append(e_name)
+      else:
+        self._defaults[e_name] = None
+
+  def NewValue(self):
+    """Returns a dict holding the values of elements missing from the XML.
+
+    As with zeep objects, repeated elements default to an empty list and other
+    elements to None.
+    """
+    value = self._defaults.copy()
+    for e_name in self._list_names:
+      value[e_name] = []
+    return value
+
+
+class StreamedPage(object):
+  """A page whose results are parsed from the response as they're iterated.
+
+  Results are only parsed when they're reached, and the XML of each result is
+  discarded once parsed, so memory use doesn't grow with the size of the page.
+  The page supports the dict syntax of parsed pages, but its results can only
+  be iterated over once.
+
+  Fields of the page that precede its results in the response, e.g.
+  totalResultSetSize and startIndex, can be read right away. Any that follow
+  the results are set once all results have been iterated over.
+
+  Attributes:
+    result_count: The number of results yielded so far.
+    last_result: The last result yielded so far, or None.
+  """
+
+  _NO_RESULT = object()
+
+  def __init__(self, results, response_value):
+    """Initializes a StreamedPage.
+
+    The first result is parsed right away, so that faults are raised when the
+    page is returned and not while iterating over it.
+
+    Args:
+      results: An iterator yielding the dict of each result.
+      response_value: The dict of the response element, whose rval is set to
+          the dict of the page once its start tag has been parsed.
+    """
+    self._results = results
+    self._response_value = response_value
+    self._first_result = next(results, self._NO_RESULT)
+    self.result_count = 0
+    self.last_result = None
+
+  def __iter__(self):
+    if self._first_result is not self._NO_RESULT:
+      first_result, self._first_result = self._first_result, self._NO_RESULT
+      self._Track(first_result)
+      yield first_result
+    for result in self._results:
+      self._Track(result)
+      yield result
+
+  def _Track(self, result):
+    """Records a result that is about to be yielded."""
+    self.result_count += 1
+    self.last_result = result
+
+  def __getitem__(self, key):
+    if key == 'results':
+      return iter(self)
+    return self._GetPage()[key]
+
+  def __contains__(self, key):
+    return key in self._GetPage()
+
+  def get(self, key, default=None):
+    """Returns a field of the page, or default if the page has no such field.
+
+    Args:
+      key: A string name of the field.
+      [optional]
+      default: The value returned if the page has no such field.
+
+    Returns:
+      The value of the field. For 'results', an iterator over the results.
+    """
+    return self[key] if key in self else default
+
+  def _GetPage(self):
+    """Returns the dict of the page's fields parsed so far."""
+    return self._response_value['rval'] or {}
+
+
 class ZeepServiceProxy(GoogleSoapService):
   """Wraps a zeep service object, allowing custom logic to be injected.
 
@@ -732,7 +1284,8 @@ class ZeepServiceProxy(GoogleSoapService):
   NO_CACHE = 'zeep_no_cache'
 
   def __init__(self, endpoint, header_handler, packer,
-               proxy_config, timeout, version, cache=None):
+               proxy_config, timeout, version, cache=None, http_session=None,
+               response_mode=RESPONSE_MODE_ZEEP):
     """Initializes a zeep service proxy.
 
     Args:
@@ -747,9 +1300,20 @@ class ZeepServiceProxy(GoogleSoapService):
       cache: An instance of zeep.cache.Base to pass to the underlying SOAP
           library for caching. A file cache by default. To disable, pass
           googleads.common.ZeepServiceProxy.NO_CACHE.
+      http_session: An optional requests.Session used to send requests. If not
+          set, a new session is created for this service.
+      response_mode: How responses are deserialized. RESPONSE_MODE_ZEEP, the
+          default, returns zeep objects. RESPONSE_MODE_DICT parses responses
+          directly into dicts and lists, which is faster and uses less memory
+          for large responses. Dicts hold the same keys and defaults as zeep
+          objects, plus an 'xsi_type' key where the response names a derived
+          type. RESPONSE_MODE_STREAM also parses responses into dicts, but
+          returns pages as a StreamedPage that yields each result as soon as
+          it has been parsed.
 
     Raises:
-      GoogleAdsValueError: The wrong type was given for caching.
+      GoogleAdsValueError: The wrong type was given for caching, or the
+          response mode is unknown or unsupported by the installed zeep.
     """
     super(ZeepServiceProxy, self).__init__(header_handler, packer, version)
 
@@ -757,19 +1321,77 @@ class ZeepServiceProxy(GoogleSoapService):
                       cache == self.NO_CACHE):
       raise googleads.errors.GoogleAdsValueError(
           'Must use a proper zeep cache with zeep.')
+    if response_mode not in _RESPONSE_MODES:
+      raise googleads.errors.GoogleAdsValueError(
+          'Unknown response mode %s. Supported modes: %s'
+          % (response_mode, _RESPONSE_MODES))
+    if response_mode != RESPONSE_MODE_ZEEP and _ZeepSettings is None:
+      raise googleads.errors.GoogleAdsValueError(
+          'Response mode %s requires zeep 3.0.0 or later.' % response_mode)
+    self._response_mode = response_mode
 
-    transport = _ZeepProxyTransport(timeout, proxy_config, cache)
+    transport = self._CreateTransport(
+        timeout, proxy_config, cache, http_session)
     plugins = [_ZeepAuthHeaderPlugin(header_handler),
                googleads.util.ZeepLogger()]
+    # Reuse an already parsed WSDL document if one is available, since parsing
+    # the schema is far more expensive than creating the client around it.
+    document = None
+    if _ZEEP_CLIENT_ACCEPTS_DOCUMENT:
+      document = _wsdl_document_cache.Get((endpoint, version))
     try:
-      self.zeep_client = zeep.Client(
-          endpoint, transport=transport, plugins=plugins)
-    except requests.exceptions.HTTPError as e:
+      self.zeep_client = self._CreateZeepClient(
+          document if document is not None else endpoint, transport, plugins)
+    except (requests.exceptions.HTTPError,
+            zeep.exceptions.TransportError) as e:
       raise googleads.errors.GoogleAdsSoapTransportError(str(e))
 
+    if (_ZEEP_CLIENT_ACCEPTS_DOCUMENT and document is None and
+        isinstance(self.zeep_client.wsdl, zeep.wsdl.Document)):
+      _wsdl_document_cache.Set((endpoint, version), self.zeep_client.wsdl)
+
     first_service = list(self.zeep_client.wsdl.services.values())[0]
     first_port = list(first_service.ports.values())[0]
     self._method_bindings = first_port.binding
+    # Packing plans by zeep type, and the parameters of each method.
+    self._packing_plans = {}
+    self._method_params = {}
+    # The schema's types by localname, built by _GetTypesByLocalname.
+    self._types_by_localname = None
+    # Parsing plans by zeep type, and the response type of each method.
+    self._parsing_plans = {}
+    self._response_types = {}
+    # Rendered SOAP headers by method name and header values.
+    self._soap_headers = googleads.util.LruCache(_SOAP_HEADER_CACHE_SIZE)
+    self._splices_soap_headers = self._CanSpliceSOAPHeaders()
+
+  def _CreateTransport(self, timeout, proxy_config, cache, http_session):
+    """Creates the zeep transport used to load the WSDL and send requests.
+
+    Args:
+      timeout: An integer to set the connection timeout.
+      proxy_config: A ProxyConfig that represents proxy settings.
+      cache: A zeep.cache.Base instance, NO_CACHE, or None for the default.
+      http_session: An optional requests.Session used to send requests.
+
+    Returns:
+      A zeep.transports.Transport instance.
+    """
+    return _ZeepProxyTransport(
+        timeout, proxy_config, cache, session=http_session)
+
+  def _CreateZeepClient(self, wsdl, transport, plugins):
+    """Creates the zeep client wrapped by this service proxy.
+
+    Args:
+      wsdl: A URL for the WSDL, or an already parsed zeep.wsdl.Document.
+      transport: The zeep.transports.Transport used by the client.
+      plugins: A list of zeep.Plugin instances.
+
+    Returns:
+      A zeep.Client instance.
+    """
+    return zeep.Client(wsdl, transport=transport, plugins=plugins)
 
   def CreateSoapElementForType(self, type_name):
     """Create an instance of a SOAP type.
@@ -836,8 +1458,11 @@ class ZeepServiceProxy(GoogleSoapService):
       A list of XML objects that can be passed to zeep.
     """
     # Get the params for the method to find the initial types to instantiate.
-    op_params = self.zeep_client.get_element(
-        '{%s}%s' % (self._GetBindingNamespace(), method_name)).type.elements
+    op_params = self._method_params.get(method_name)
+    if op_params is None:
+      op_params = self.zeep_client.get_element(
+          '{%s}%s' % (self._GetBindingNamespace(), method_name)).type.elements
+      self._method_params[method_name] = op_params
     result = [self._PackArgumentsHelper(param, param_data, set_type_attrs)
               for ((_, param), param_data) in zip(op_params, args)]
     return result
@@ -913,7 +1538,12 @@ class ZeepServiceProxy(GoogleSoapService):
       A zeep.exceptions.LookupError if the type cannot be found in any
         namespace.
     """
-    elem_type = None
+    types_by_localname = self._GetTypesByLocalname()
+    elem_type = types_by_localname.get(type_localname)
+    if elem_type is not None:
+      return elem_type
+
+    # Types outside the index, e.g. XML Schema built-ins, are searched for.
     last_exception = None
     for ns_prefix in self.zeep_client.wsdl.types.prefix_map.values():
       try:
@@ -925,8 +1555,38 @@ class ZeepServiceProxy(GoogleSoapService):
       break
     if not elem_type:
       raise last_exception
+    types_by_localname[type_localname] = elem_type
     return elem_type
 
+  def _GetTypesByLocalname(self):
+    """Returns an index of the schema's global types by localname.
+
+    Every dict with an xsi_type is looked up, and searching the namespaces one
+    by one raises a LookupError for each namespace before the type's own, so
+    the index is built once per service. Where several namespaces define a
+    localname, the type of the first namespace in the prefix map wins, as when
+    searching.
+
+    Returns:
+      A dict mapping type localnames to zeep types.
+    """
+    if self._types_by_localname is None:
+      schema = self.zeep_client.wsdl.types
+      namespace_order = {namespace: i for i, namespace
+                         in enumerate(schema.prefix_map.values())}
+      types_by_localname = {}
+      ranks = {}
+      for elem_type in schema.types:
+        qname = elem_type.qname
+        if qname is None or qname.namespace not in namespace_order:
+          continue
+        rank = namespace_order[qname.namespace]
+        if rank < ranks.get(qname.localname, len(namespace_order)):
+          types_by_localname[qname.localname] = elem_type
+          ranks[qname.localname] = rank
+      self._types_by_localname = types_by_localname
+    return self._types_by_localname
+
   def _CreateComplexTypeFromData(
       self, elem_type, type_is_override, data, set_type_attrs):
     """Initialize a SOAP element with specific data.
@@ -941,7 +1601,8 @@ class ZeepServiceProxy(GoogleSoapService):
     Returns:
       An fully initialized SOAP element.
     """
-    elem_arguments = dict(elem_type.elements)
+    plan = self._GetPackingPlan(elem_type)
+    elem_arguments = plan.elements
 
     # A post order traversal of the original data, need to instantiate from
     # the bottom up.
@@ -949,12 +1610,17 @@ class ZeepServiceProxy(GoogleSoapService):
         k: self._PackArgumentsHelper(elem_arguments[k], v, set_type_attrs)
         for k, v in data if k != 'xsi_type'}
     if set_type_attrs:
-      found_type_attr = next((e_name for e_name, _ in elem_type.elements
-                              if e_name.endswith('.Type')), None)
-      if found_type_attr and type_is_override:
-        instantiated_arguments[found_type_attr] = elem_type.qname.localname
+      if plan.type_attr and type_is_override:
+        instantiated_arguments[plan.type_attr] = elem_type.qname.localname
     # Now go back through the tree instantiating SOAP types as we go.
-    return elem_type(**instantiated_arguments)
+    return plan.Create(instantiated_arguments)
+
+  def _GetPackingPlan(self, elem_type):
+    """Returns the memoized _PackingPlan of a zeep type."""
+    plan = self._packing_plans.get(elem_type)
+    if plan is None:
+      plan = self._packing_plans[elem_type] = _PackingPlan(elem_type)
+    return plan
 
 
   def _GetZeepFormattedSOAPHeaders(self):
@@ -963,6 +1629,59 @@ class ZeepServiceProxy(GoogleSoapService):
     soap_headers = {'RequestHeader': headers}
     return soap_headers
 
+  def _CanSpliceSOAPHeaders(self):
+    """Returns whether rendered SOAP headers can be spliced into envelopes.
+
+    Rendering and splicing headers relies on private zeep APIs. If the
+    installed zeep lacks them, SOAP headers are passed to zeep as _soapheaders
+    instead.
+
+    Returns:
+      True if the installed zeep supports splicing SOAP headers.
+    """
+    return (hasattr(zeep.wsdl.messages.soap.SoapMessage, '_serialize_header')
+            and hasattr(self.zeep_client.wsdl.types, '_prefix_map_custom')
+            and hasattr(zeep.wsdl.utils, 'etree_to_string'))
+
+  def _GetRenderedSOAPHeader(self, method_name):
+    """Returns the serialized SOAP header of a request, if it can be cached.
+
+    Headers are rendered once per method and header values, e.g. network code
+    and application name, so requests don't create, render, and serialize a
+    SoapRequestHeader each time. A change to the header values renders a new
+    header.
+
+    Args:
+      method_name: The name of the method being called.
+
+    Returns:
+      The serialized soap-env:Header element as bytes, or None if the header
+      must be created by zeep, e.g. because envelopes are being logged or the
+      installed zeep doesn't support splicing headers.
+    """
+    if (not self._splices_soap_headers or
+        not isinstance(self.zeep_client.transport, _ZeepProxyTransport) or
+        self._IsEnvelopeLogged()):
+      return None
+    header_values = self._header_handler.GetSOAPHeaderValues()
+    if header_values is None:
+      return None
+
+    cache_key = (method_name, header_values)
+    soap_header = self._soap_headers.Get(cache_key)
+    if soap_header is None:
+      type_name, element_values = header_values
+      header = self.CreateSoapElementForType(type_name)
+      for name, value in element_values:
+        header[name] = value
+      message = self._method_bindings.get(method_name).input
+      nsmap = {'soap-env': message.nsmap['soap-env']}
+      nsmap.update(self.zeep_client.wsdl.types._prefix_map_custom)
+      soap_header = lxml.etree.tostring(message._serialize_header(
+          {'RequestHeader': header}, nsmap))
+      self._soap_headers.Set(cache_key, soap_header)
+    return soap_header
+
   def _CreateMethod(self, method_name):
     """Create a method wrapping an invocation to the SOAP service.
 
@@ -975,24 +1694,334 @@ class ZeepServiceProxy(GoogleSoapService):
     soap_service_method = self.zeep_client.service[method_name]
 
     def MakeSoapRequest(*args):
+      AddToUtilityRegistry('zeep')
+      soap_header = self._GetRenderedSOAPHeader(method_name)
+      if soap_header is None:
+        kwargs = {'_soapheaders': self._GetZeepFormattedSOAPHeaders()}
+        header_splicing = contextlib.nullcontext()
+      else:
+        kwargs = {}
+        header_splicing = self.zeep_client.transport.SplicedSOAPHeader(
+            soap_header)
+      packed_args = self._PackArguments(method_name, args)
+      try:
+        with header_splicing:
+          if self._response_mode == RESPONSE_MODE_ZEEP:
+            return soap_service_method(*packed_args, **kwargs)['body']['rval']
+          with self.zeep_client.settings(raw_response=True):
+            response = soap_service_method(*packed_args, **kwargs)
+        return self._ParseResponse(method_name, response)
+      except zeep.exceptions.Fault as e:
+        raise self._CreateServerFault(e)
+    return MakeSoapRequest
+
+  def _ParseResponse(self, method_name, response):
+    """Parses the rval of a SOAP response into dicts and lists.
+
+    The response is parsed in a single lxml iterparse pass, converting simple
+    values with their schema types. Unsuccessful responses and faults are left
+    to zeep, so they raise exactly as they do for zeep objects.
+
+    Args:
+      method_name: The name of the method that was called.
+      response: The requests.Response returned for the call.
+
+    Returns:
+      The rval of the response, as dicts, lists and simple values. In the
+      stream response mode, pages are returned as a StreamedPage instead.
+
+    Raises:
+      zeep.exceptions.Fault: The response is a SOAP fault.
+      zeep.exceptions.TransportError: The response isn't a SOAP response.
+    """
+    operation = self._method_bindings.get(method_name)
+    if response.status_code != 200:
+      return self._method_bindings.process_reply(
+          self.zeep_client, operation, response)
+
+    if self._IsEnvelopeLogged():
+      zeep.plugins.apply_ingress(
+          self.zeep_client, lxml.etree.fromstring(response.content),
+          response.headers, operation)
+
+    response_value = self._GetParsingPlan(
+        self._GetResponseType(method_name)).NewValue()
+    if (self._response_mode == RESPONSE_MODE_STREAM and
+        self._ReturnsPage(method_name)):
+      return StreamedPage(self._IterParseResponse(
+          method_name, response, response_value, True), response_value)
+
+    for _ in self._IterParseResponse(
+        method_name, response, response_value, False):
+      pass
+    return response_value['rval']
+
+  def _IterParseResponse(self, method_name, response, response_value,
+                         stream_results):
+    """Parses a SOAP response into a dict with the response's elements.
+
+    Each element is cleared and detached from the document once it has been
+    parsed, so the parsed document doesn't grow with the response.
+
+    Args:
+      method_name: The name of the method that was called.
+      response: The successful requests.Response returned for the call.
+      response_value: A dict that receives the values of the response
+          element's children, e.g. the rval.
+      stream_results: Whether entities of the results element of a page are
+          yielded as they're parsed, instead of being added to the page.
+
+    Yields:
+      The dict of each results entity, if stream_results is set.
+
+    Raises:
+      zeep.exceptions.Fault: The response is a SOAP fault.
+    """
+    settings = self.zeep_client.settings
+    # A stack of (element name, whether it repeats, parsing plan or None for
+    # simple types, value or simple type) for the open response elements.
+    # Values of complex elements are added to their parent when they start, and
+    # values of simple elements when they end.
+    stack = []
+    depth = 0
+    in_body = False
+    for event, element in lxml.etree.iterparse(
+        io.BytesIO(response.content), events=('start', 'end'),
+        resolve_entities=False, no_network=True,
+        huge_tree=settings.xml_huge_tree):
+      if event == 'start':
+        depth += 1
+        if depth == 2:
+          in_body = element.tag == _SOAP_BODY_TAG
+        elif depth == 3 and in_body:
+          if element.tag == _SOAP_FAULT_TAG:
+            self._method_bindings.process_reply(
+                self.zeep_client, self._method_bindings.get(method_name),
+                response)
+            return
+          plan = self._GetParsingPlan(self._GetResponseType(method_name))
+          stack.append((None, False, plan, response_value))
+        elif depth > 3 and stack:
+          entry = self._StartResponseElement(stack[-1], element)
+          stack.append(entry)
+          e_name, accepts_multiple, plan, value = entry
+          if plan is not None and not (
+              stream_results and depth == 5 and e_name == 'results'):
+            if accepts_multiple:
+              stack[-2][3][e_name].append(value)
+            else:
+              stack[-2][3][e_name] = value
+        continue
+
+      depth -= 1
+      if depth >= 3 and stack:
+        e_name, accepts_multiple, plan, value = stack.pop()
+        if e_name is None:
+          pass
+        elif plan is None:
+          value = self._ParseSimpleValue(value, element)
+          if accepts_multiple:
+            stack[-1][3][e_name].append(value)
+          else:
+            stack[-1][3][e_name] = value
+        elif stream_results and depth == 4 and e_name == 'results':
+          yield value
+      elif depth == 2:
+        stack = []
+      element.clear()
+      parent = element.getparent()
+      while element.getprevious() is not None:
+        del parent[0]
+
+  def _ReturnsPage(self, method_name):
+    """Returns whether a method's rval is a page with repeated results."""
+    rval = self._GetParsingPlan(
+        self._GetResponseType(method_name)).children.get('rval')
+    if rval is None or rval[2] or not isinstance(rval[1],
+                                                 zeep.xsd.ComplexType):
+      return False
+    results = self._GetParsingPlan(rval[1]).children.get('results')
+    return results is not None and results[2]
+
+  def _StartResponseElement(self, parent, element):
+    """Returns the parsing stack entry of a response element.
+
+    Args:
+      parent: The parsing stack entry of the element's parent.
+      element: The lxml.etree._Element whose start tag was parsed.
+
+    Returns:
+      A tuple of the element's name, whether it repeats, its parsing plan or
+      None if it's of a simple type, and its value or simple type. The name is
+      None for elements that are skipped, e.g. those unknown to the schema.
+    """
+    parent_plan = parent[2]
+    child = parent_plan.children.get(
+        element.tag.rpartition('}')[2]) if parent_plan else None
+    if child is None:
+      return (None, False, None, None)
+
+    e_name, elem_type, accepts_multiple = child
+    if element.get(_XSI_NIL_ATTRIBUTE) in ('true', '1'):
+      return (e_name, accepts_multiple, None, None)
+    type_override = element.get(_XSI_TYPE_ATTRIBUTE)
+    if type_override:
+      type_override = type_override.rpartition(':')[2]
+      elem_type = self._DiscoverElementTypeFromLocalname(type_override)
+    if not isinstance(elem_type, zeep.xsd.ComplexType):
+      return (e_name, accepts_multiple, None, elem_type)
+
+    plan = self._GetParsingPlan(elem_type)
+    value = plan.NewValue()
+    if type_override:
+      value['xsi_type'] = type_override
+    return (e_name, accepts_multiple, plan, value)
+
+  @staticmethod
+  def _ParseSimpleValue(elem_type, element):
+    """Converts the text of a simple typed element, as zeep does.
+
+    Args:
+      elem_type: The zeep simple type of the element, or None if it's nil.
+      element: The parsed lxml.etree._Element.
+
+    Returns:
+      The element's Python value, or None if it has no text.
+    """
+    if elem_type is None or element.text is None:
+      return None
+    try:
+      return elem_type.pythonvalue(element.text)
+    except (TypeError, ValueError):
+      _logger.exception('Error during xml -> python translation')
+      return None
+
+  def _GetParsingPlan(self, elem_type):
+    """Returns the memoized _ParsingPlan of a zeep type."""
+    plan = self._parsing_plans.get(elem_type)
+    if plan is None:
+      plan = self._parsing_plans[elem_type] = _ParsingPlan(elem_type)
+    return plan
+
+  def _GetResponseType(self, method_name):
+    """Returns the memoized zeep type of a method's response element."""
+    response_type = self._response_types.get(method_name)
+    if response_type is None:
+      response_type = self.zeep_client.get_element(
+          '{%s}%sResponse' % (self._GetBindingNamespace(), method_name)).type
+      self._response_types[method_name] = response_type
+    return response_type
+
+  def _IsEnvelopeLogged(self):
+    """Returns whether zeep plugins log the envelopes of SOAP messages."""
+    return logging.getLogger('googleads.soap').isEnabledFor(logging.DEBUG)
+
+  def _CreateServerFault(self, zeep_fault):
+    """Translates a zeep fault into a GoogleAdsServerFault.
+
+    Args:
+      zeep_fault: The zeep.exceptions.Fault raised for a SOAP request.
+
+    Returns:
+      A googleads.errors.GoogleAdsServerFault with the parsed API errors.
+    """
+    error_list = ()
+    if zeep_fault.detail is not None:
+      underlying_exception = zeep_fault.detail.find(
+          '{%s}ApiExceptionFault' % self._GetBindingNamespace())
+      fault_type = self.zeep_client.get_element(
+          '{%s}ApiExceptionFault' % self._GetBindingNamespace())
+      fault = fault_type.parse(
+          underlying_exception, self.zeep_client.wsdl.types)
+      error_list = fault.errors or error_list
+    return googleads.errors.GoogleAdsServerFault(
+        zeep_fault.detail, errors=error_list, message=zeep_fault.message)
+
+
+def GetAsyncServiceClassForLibrary():
+  return ZeepAsyncServiceProxy
+
+
+class ZeepAsyncServiceProxy(ZeepServiceProxy):
+  """A zeep service proxy whose SOAP methods are coroutines.
+
+  Requests are sent with httpx through zeep's asynchronous transport, so many
+  requests can be in flight from a single thread. Headers, argument packing,
+  and fault handling behave as they do for ZeepServiceProxy. The WSDL is still
+  loaded synchronously when the proxy is created.
+  """
+
+  def __init__(self, endpoint, header_handler, packer,
+               proxy_config, timeout, version, cache=None, http_client=None):
+    """Initializes an asynchronous zeep service proxy.
+
+    Args:
+      endpoint: A URL for the service.
+      header_handler: A HeaderHandler responsible for setting the SOAP and HTTP
+          headers on the service client.
+      packer: An optional subclass of googleads.common.SoapPacker that provides
+        customized packing logic.
+      proxy_config: A ProxyConfig that represents proxy settings.
+      timeout: An integer to set the connection timeout.
+      version: the version of the current API, e.g. 'v201811'
+      cache: An instance of zeep.cache.Base to pass to the underlying SOAP
+          library for caching. A file cache by default. To disable, pass
+          googleads.common.ZeepServiceProxy.NO_CACHE.
+      http_client: An optional httpx.AsyncClient used to send requests. If not
+          set, one is created from proxy_config for this service.
+
+    Raises:
+      GoogleAdsError: If httpx or zeep 4.0.0 or later is not installed.
+      GoogleAdsValueError: The wrong type was given for caching.
+    """
+    _CheckAsyncSupported()
+    self._http_client = http_client
+    super(ZeepAsyncServiceProxy, self).__init__(
+        endpoint, header_handler, packer, proxy_config, timeout, version,
+        cache=cache)
+
+  def _CreateTransport(self, timeout, proxy_config, cache, http_session):
+    """Creates the asynchronous zeep transport for this service."""
+    return _CreateZeepAsyncTransport(
+        timeout, proxy_config, cache, client=self._http_client)
+
+  def _CreateZeepClient(self, wsdl, transport, plugins):
+    """Creates the asynchronous zeep client wrapped by this service proxy."""
+    return zeep.AsyncClient(wsdl, transport=transport, plugins=plugins)
+
+  async def Close(self):
+    """Closes the HTTP clients created for this service.
+
+    The httpx.Client the transport loads the WSDL with is always closed. The
+    httpx.AsyncClient requests are sent with is only closed if it was created
+    for this service rather than passed in as http_client.
+    """
+    transport = self.zeep_client.transport
+    transport.wsdl_client.close()
+    if self._http_client is None:
+      await transport.aclose()
+
+  def _CreateMethod(self, method_name):
+    """Create a coroutine function wrapping an invocation to the service.
+
+    Args:
+      method_name: A string identifying the name of the SOAP method to call.
+
+    Returns:
+      A coroutine function that can be awaited to make the desired request.
+    """
+    soap_service_method = self.zeep_client.service[method_name]
+
+    async def MakeSoapRequest(*args):
       AddToUtilityRegistry('zeep')
       soap_headers = self._GetZeepFormattedSOAPHeaders()
       packed_args = self._PackArguments(method_name, args)
       try:
-        return soap_service_method(
-            *packed_args, _soapheaders=soap_headers)['body']['rval']
+        response = await soap_service_method(
+            *packed_args, _soapheaders=soap_headers)
       except zeep.exceptions.Fault as e:
-        error_list = ()
-        if e.detail is not None:
-          underlying_exception = e.detail.find(
-              '{%s}ApiExceptionFault' % self._GetBindingNamespace())
-          fault_type = self.zeep_client.get_element(
-              '{%s}ApiExceptionFault' % self._GetBindingNamespace())
-          fault = fault_type.parse(
-              underlying_exception, self.zeep_client.wsdl.types)
-          error_list = fault.errors or error_list
-        raise googleads.errors.GoogleAdsServerFault(
-            e.detail, errors=error_list, message=e.message)
+        raise self._CreateServerFault(e)
+      return response['body']['rval']
     return MakeSoapRequest
 
 
@@ -1008,3 +2037,16 @@ class HeaderHandler(object):
   @abc.abstractmethod
   def GetHTTPHeaders(self):
     """Returns the required HTTP headers."""
+
+  def GetSOAPHeaderValues(self):
+    """Returns the values of the required SOAP headers, if they're cacheable.
+
+    Services cache rendered SOAP headers by these values, so they're only
+    rendered again when the values change.
+
+    Returns:
+      A tuple of the SOAP header type name and a tuple of (element name, value)
+      pairs, or None if SOAP headers must be created by GetSOAPHeaders for
+      every request.
+    """
+    return None
@@ -56,3 +56,25 @@ class AdManagerReportError(GoogleAdsError):
         'Ad Manager report job failed. The ID of the failed report is: %s'
         % report_job_id)
     self.report_job_id = report_job_id
+
+
+class AdManagerReportTimeoutError(AdManagerReportError):
+  """Error indicating that an Ad Manager report job did not finish in time.
+
+  Attributes:
+    report_job_id: The ID of the report job which did not finish.
+    deadline_seconds: The number of seconds the report job was waited for.
+  """
+
+  def __init__(self, report_job_id, deadline_seconds):
+    """Initializes a AdManagerReportTimeoutError.
+
+    Args:
+      report_job_id: The ID of the report job which did not finish.
+      deadline_seconds: The number of seconds the report job was waited for.
+    """
+    GoogleAdsError.__init__(
+        self, 'Ad Manager report job %s did not finish within %s seconds.'
+        % (report_job_id, deadline_seconds))
+    self.report_job_id = report_job_id
+    self.deadline_seconds = deadline_seconds
@@ -86,8 +86,30 @@ class GoogleRefreshableOAuth2Client(GoogleOAuth2Client):
   necessary.
   """
 
-  def Refresh(self):
-    """Refreshes the access token used by the client."""
+  def CreateHttpHeader(self, http_session=None):
+    """Creates an OAuth2 HTTP header.
+
+    The OAuth2 credentials will be refreshed as necessary.
+
+    Args:
+      [optional]
+      http_session: A requests.Session whose pooled connections are used to
+          refresh the credentials, instead of opening a new session.
+
+    Returns:
+      A dictionary containing one entry: the OAuth2 Bearer header under the
+      'Authorization' key.
+    """
+    raise NotImplementedError(
+        'You must subclass GoogleRefreshableOAuth2Client.')
+
+  def Refresh(self, http_session=None):
+    """Refreshes the access token used by the client.
+
+    Args:
+      [optional]
+      http_session: A requests.Session used to send the refresh request.
+    """
     raise NotImplementedError(
         'You must subclass GoogleRefreshableOAuth2Client.')
 
@@ -174,13 +196,18 @@ class GoogleRefreshTokenClient(GoogleRefreshableOAuth2Client):
     self.proxy_config = kwargs.get('proxy_config',
                                    googleads.common.ProxyConfig())
 
-  def CreateHttpHeader(self):
+  def CreateHttpHeader(self, http_session=None):
     """Creates an OAuth2 HTTP header.
 
     The OAuth2 credentials will be refreshed as necessary. In the event that
     the credentials fail to refresh, a message is logged but no exception is
     raised.
 
+    Args:
+      [optional]
+      http_session: A requests.Session whose pooled connections are used to
+          refresh the credentials, instead of opening a new session.
+
     Returns:
       A dictionary containing one entry: the OAuth2 Bearer header under the
       'Authorization' key.
@@ -191,17 +218,27 @@ class GoogleRefreshTokenClient(GoogleRefreshableOAuth2Client):
     oauth2_header = {}
 
     if self.creds.expiry is None or self.creds.expired:
-      self.Refresh()
+      self.Refresh(http_session)
 
     self.creds.apply(oauth2_header)
     return oauth2_header
 
-  def Refresh(self):
+  def Refresh(self, http_session=None):
     """Uses the Refresh Token to retrieve and set a new Access Token.
 
+    Args:
+      [optional]
+      http_session: A requests.Session used to send the refresh request. By
+          default, a new session configured with proxy_config is used.
+
     Raises:
       google.auth.exceptions.RefreshError: If the refresh fails.
     """
+    if http_session:
+      self.creds.refresh(
+          google.auth.transport.requests.Request(session=http_session))
+      return
+
     with requests.Session() as session:
       session.proxies = self.proxy_config.proxies
       session.verify = not self.proxy_config.disable_certificate_validation
@@ -227,23 +264,33 @@ class GoogleCredentialsClient(GoogleRefreshableOAuth2Client):
     """
     self.creds = credentials
 
-  def CreateHttpHeader(self):
+  def CreateHttpHeader(self, http_session=None):
     """Creates an OAuth2 HTTP header.
 
+    Args:
+      [optional]
+      http_session: A requests.Session whose pooled connections are used to
+          refresh the credentials, instead of opening a new session.
+
     Returns:
       A dictionary containing one entry: the OAuth2 Bearer header under the
       'Authorization' key.
     """
     if self.creds.expiry is None or self.creds.expired:
-      self.Refresh()
+      self.Refresh(http_session)
 
     oauth2_header = {}
     self.creds.apply(oauth2_header)
     return oauth2_header
 
-  def Refresh(self):
-    """Uses the credentials object to retrieve and set a new Access Token."""
-    transport = google.auth.transport.requests.Request()
+  def Refresh(self, http_session=None):
+    """Uses the credentials object to retrieve and set a new Access Token.
+
+    Args:
+      [optional]
+      http_session: A requests.Session used to send the refresh request.
+    """
+    transport = google.auth.transport.requests.Request(session=http_session)
     self.creds.refresh(transport)
 
 
@@ -288,13 +335,18 @@ class GoogleServiceAccountClient(GoogleRefreshableOAuth2Client):
                          googleads.common.ProxyConfig())
     self.Refresh()
 
-  def CreateHttpHeader(self):
+  def CreateHttpHeader(self, http_session=None):
     """Creates an OAuth2 HTTP header.
 
     The OAuth2 credentials will be refreshed as necessary. In the event that
     the credentials fail to refresh, a message is logged but no exception is
     raised.
 
+    Args:
+      [optional]
+      http_session: A requests.Session whose pooled connections are used to
+          refresh the credentials, instead of opening a new session.
+
     Returns:
       A dictionary containing one entry: the OAuth2 Bearer header under the
       'Authorization' key.
@@ -305,17 +357,27 @@ class GoogleServiceAccountClient(GoogleRefreshableOAuth2Client):
     oauth2_header = {}
 
     if self.creds.expiry is None or self.creds.expired:
-      self.Refresh()
+      self.Refresh(http_session)
 
     self.creds.apply(oauth2_header)
     return oauth2_header
 
-  def Refresh(self):
+  def Refresh(self, http_session=None):
     """Retrieve and set a new Access Token.
 
+    Args:
+      [optional]
+      http_session: A requests.Session used to send the refresh request. By
+          default, a new session configured with proxy_config is used.
+
     Raises:
       google.auth.exceptions.RefreshError: If the refresh fails.
     """
+    if http_session:
+      self.creds.refresh(
+          google.auth.transport.requests.Request(session=http_session))
+      return
+
     with requests.Session() as session:
       session.proxies = self.proxy_config.proxies
       session.verify = not self.proxy_config.disable_certificate_validation
@@ -14,6 +14,7 @@
 
 """Utilities used by the client library."""
 
+import collections
 import logging
 import re
 import threading
@@ -178,3 +179,86 @@ class UtilityRegistry(object):
   def SetEnabled(self, value):
     with self._lock:
       self._enabled = value
+
+
+class LruCache(object):
+  """A thread-safe, bounded mapping evicting the least recently used entry."""
+
+  def __init__(self, max_size):
+    """Initializes a LruCache.
+
+    Args:
+      max_size: An integer specifying the maximum number of entries to keep. A
+        value of 0 disables caching.
+    """
+    self._entries = collections.OrderedDict()
+    self._lock = threading.Lock()
+    self._max_size = max_size
+
+  def __contains__(self, key):
+    with self._lock:
+      return key in self._entries
+
+  def __len__(self):
+    with self._lock:
+      return len(self._entries)
+
+  def Get(self, key, default=None):
+    """Retrieves an entry, marking it as the most recently used.
+
+    Args:
+      key: The key of the entry.
+      default: The value returned if the key isn't cached.
+
+    Returns:
+      The cached value, or default if the key isn't cached.
+    """
+    with self._lock:
+      if key not in self._entries:
+        return default
+      self._entries.move_to_end(key)
+      return self._entries[key]
+
+  def Set(self, key, value):
+    """Stores an entry, evicting the least recently used ones if needed.
+
+    Args:
+      key: The key of the entry.
+      value: The value to store.
+    """
+    with self._lock:
+      if self._max_size <= 0:
+        return
+      self._entries[key] = value
+      self._entries.move_to_end(key)
+      self._Evict()
+
+  def Invalidate(self, match=None):
+    """Removes entries from the cache.
+
+    Args:
+      match: An optional callable receiving a key and returning True if the
+        entry should be removed. If not set, all entries are removed.
+    """
+    with self._lock:
+      if match is None:
+        self._entries.clear()
+      else:
+        for key in [key for key in self._entries if match(key)]:
+          del self._entries[key]
+
+  def SetMaxSize(self, max_size):
+    """Sets the maximum number of entries, evicting any over the limit.
+
+    Args:
+      max_size: An integer specifying the maximum number of entries to keep. A
+        value of 0 disables caching.
+    """
+    with self._lock:
+      self._max_size = max_size
+      self._Evict()
+
+  def _Evict(self):
+    """Evicts the least recently used entries. The lock must be held."""
+    while len(self._entries) > max(self._max_size, 0):
+      self._entries.popitem(last=False)
@@ -29,7 +29,11 @@ DEPENDENCIES = ['google-auth>=2.0.0,<3.0.0',
                 'PyYAML>=6.0, <7.0', 'requests>=2.0.0,<3.0.0',
                 'xmltodict>=0.9.2,<1.0.0', 'zeep>=2.5.0']
 
-TEST_DEPENDENCIES = ['mock>=2.0.0,<3.0.0', 'pyfakefs>=5.1.0']
+EXTRA_DEPENDENCIES = {'arrow': ['pyarrow>=14.0.0'],
+                      'async': ['httpx>=0.26.0', 'zeep>=4.0.0']}
+
+TEST_DEPENDENCIES = ['httpx>=0.26.0', 'mock>=2.0.0,<3.0.0', 'pyarrow>=14.0.0',
+                     'pyfakefs>=5.1.0']
 
 CLASSIFIERS = [
     'Intended Audience :: Developers',
@@ -110,5 +114,6 @@ setup(name='googleads',
       keywords='admanager google',
       classifiers=CLASSIFIERS,
       install_requires=DEPENDENCIES,
+      extras_require=EXTRA_DEPENDENCIES,
       tests_require=TEST_DEPENDENCIES,
       test_suite='tests')
@@ -15,21 +15,50 @@
 """Unit tests to cover the ad_manager module."""
 
 
+import asyncio
 import datetime
+import gzip
+import os
+import tempfile
+import threading
+import time
 import unittest
+import warnings
 
 import mock
+import pyarrow
+import pyarrow.parquet
 import pytz
 import io
+import requests
+import requests.adapters
+import requests.exceptions
+import urllib3.exceptions
+import urllib3.response
+import zeep
+import zeep.transports
 import googleads.ad_manager
 import googleads.common
 import googleads.errors
+import googleads.oauth2
 from . import testing
 
 
 CURRENT_VERSION = sorted(googleads.ad_manager._SERVICE_MAP.keys())[-1]
 
 
+def FixedNow(utc_now):
+  """Returns a datetime.datetime subclass whose now() is utc_now."""
+
+  class FixedDateTime(datetime.datetime):
+
+    @classmethod
+    def now(cls, tz=None):
+      return utc_now.astimezone(tz) if tz else utc_now.replace(tzinfo=None)
+
+  return FixedDateTime
+
+
 class BaseValue(object):
 
   def __init__(self, original_object):
@@ -106,6 +135,102 @@ def DecideValue(original_object):
     return BooleanValue(original_object)
 
 
+class FakeRangeResponse(object):
+  """A streamed report download response that may drop its connection."""
+
+  def __init__(self, data, status_code, headers, drop_after=None):
+    self.status_code = status_code
+    self.reason = 'fake reason'
+    self.headers = headers
+    self.raw = self
+    self._data = io.BytesIO(data)
+    self._drop_after = drop_after
+    self.closed = False
+
+  def read(self, size, decode_content=True):
+    if self._drop_after is not None and self._data.tell() >= self._drop_after:
+      raise urllib3.exceptions.ProtocolError('Connection dropped.')
+    if self._drop_after is not None:
+      size = min(size, self._drop_after - self._data.tell())
+    return self._data.read(size)
+
+  def raise_for_status(self):
+    if self.status_code >= 400:
+      raise requests.exceptions.HTTPError(self.status_code)
+
+  def close(self):
+    self.closed = True
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+
+class FakeRangeSession(object):
+  """Serves report data, honoring Range headers if supports_ranges is set."""
+
+  def __init__(self, data, supports_ranges=True, drops=None):
+    self.data = data
+    self.supports_ranges = supports_ranges
+    # Maps the start of a requested range to the bytes served before dropping.
+    self.drops = dict(drops or {})
+    self.ranges = []
+    self._lock = threading.Lock()
+
+  def get(self, url, headers, stream, timeout):
+    byte_range = headers.get('Range')
+    with self._lock:
+      self.ranges.append(byte_range)
+    if not byte_range or not self.supports_ranges:
+      with self._lock:
+        drop_after = self.drops.pop(0, None)
+      return FakeRangeResponse(self.data, 200, {}, drop_after)
+    if not self.data:
+      return FakeRangeResponse(b'', 416, {})
+
+    start, end = byte_range[len('bytes='):].split('-')
+    start = int(start)
+    end = int(end) + 1 if end else len(self.data)
+    with self._lock:
+      drop_after = self.drops.pop(start, None)
+    return FakeRangeResponse(
+        self.data[start:end], 206,
+        {'Content-Range': 'bytes %d-%d/%d' % (start, end - 1, len(self.data))},
+        drop_after)
+
+
+class FakeEncodingAdapter(requests.adapters.HTTPAdapter):
+  """Serves report data gzip encoded whenever the request accepts gzip.
+
+  Range headers are honored, with the byte range taken before encoding.
+  """
+
+  def __init__(self, data):
+    super(FakeEncodingAdapter, self).__init__()
+    self.data = data
+    self.requests = []
+
+  def send(self, request, **kwargs):
+    self.requests.append(request)
+    body, headers, status = self.data, {}, 200
+    byte_range = request.headers.get('Range')
+    if byte_range:
+      start, end = byte_range[len('bytes='):].split('-')
+      start = int(start)
+      end = int(end) + 1 if end else len(self.data)
+      body, status = self.data[start:end], 206
+      headers['Content-Range'] = 'bytes %d-%d/%d' % (start, end - 1,
+                                                    len(self.data))
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+      body = gzip.compress(body)
+      headers['Content-Encoding'] = 'gzip'
+    return self.build_response(request, urllib3.response.HTTPResponse(
+        body=io.BytesIO(body), headers=headers, status=status,
+        preload_content=False, decode_content=False))
+
+
 class AdManagerHeaderHandlerTest(testing.CleanUtilityRegistryTestCase):
   """Tests for the googleads.ad_manager._AdManagerHeaderHandler class."""
 
@@ -139,6 +264,18 @@ class AdManagerHeaderHandlerTest(testing.CleanUtilityRegistryTestCase):
     # Check that the returned headers have the correct values.
     self.assertEqual(header_result, self.oauth_header)
 
+  def testGetHTTPHeaders_refreshableOAuth2Client(self):
+    oauth2_client = mock.Mock(
+        spec=googleads.oauth2.GoogleRefreshableOAuth2Client)
+    oauth2_client.CreateHttpHeader.return_value = self.oauth_header
+    self.ad_manager_client.oauth2_client = oauth2_client
+
+    header_result = self.header_handler.GetHTTPHeaders()
+
+    self.assertEqual(header_result, self.oauth_header)
+    oauth2_client.CreateHttpHeader.assert_called_once_with(
+        http_session=self.ad_manager_client.http_session)
+
   def testGetHTTPHeadersWithCustomHeaders(self):
     self.ad_manager_client.oauth2_client.CreateHttpHeader.return_value = (
         self.oauth_header)
@@ -166,6 +303,21 @@ class AdManagerHeaderHandlerTest(testing.CleanUtilityRegistryTestCase):
                 googleads.ad_manager._AdManagerHeaderHandler._PRODUCT_SIG)]),
         header_result.applicationName)
 
+  def testGetSOAPHeaderValues(self):
+    self.ad_manager_client.network_code = self.network_code
+    self.ad_manager_client.application_name = self.app_name
+
+    header_values = self.header_handler.GetSOAPHeaderValues()
+
+    self.assertEqual(header_values, ('ns0:SoapRequestHeader', (
+        ('networkCode', self.network_code),
+        ('applicationName', ''.join([
+            self.app_name,
+            googleads.common.GenerateLibSig(
+                googleads.ad_manager._AdManagerHeaderHandler._PRODUCT_SIG)])
+        ))))
+    hash(header_values)
+
   def testGetSOAPHeadersUserAgentWithUtility(self):
     create_method = mock.Mock()
     self.ad_manager_client.network_code = self.network_code
@@ -258,6 +410,43 @@ class AdManagerClientTest(unittest.TestCase):
         self.oauth2_client, self.application_name, self.network_code,
         **kwargs)
 
+  def testInitializeSharesConnectionPool(self):
+    ad_manager = googleads.ad_manager.AdManagerClient(
+        self.oauth2_client, self.application_name, http_pool_size=25,
+        http_keep_alive=False)
+
+    adapter = ad_manager.http_session.get_adapter('https://ads.google.com')
+    self.assertEqual(adapter._pool_maxsize, 25)
+    self.assertIs(
+        ad_manager._soap_http_session.get_adapter('https://ads.google.com'),
+        adapter)
+    self.assertIsNot(ad_manager._soap_http_session, ad_manager.http_session)
+    self.assertEqual(ad_manager.http_session.headers['Connection'], 'close')
+
+  def testInitializeDoesNotModifyOAuth2Client(self):
+    oauth2_client = mock.Mock(
+        spec=googleads.oauth2.GoogleRefreshableOAuth2Client)
+
+    googleads.ad_manager.AdManagerClient(oauth2_client, self.application_name)
+
+    self.assertNotIn('http_session', vars(oauth2_client))
+
+  def testSOAPSessionDoesNotChangeDownloadSession(self):
+    ad_manager = googleads.ad_manager.AdManagerClient(
+        self.oauth2_client, self.application_name)
+    user_agent = ad_manager.http_session.headers['User-Agent']
+
+    googleads.common._ZeepProxyTransport(
+        100, ad_manager.proxy_config,
+        googleads.common.ZeepServiceProxy.NO_CACHE,
+        session=ad_manager._soap_http_session)
+
+    self.assertEqual(ad_manager._soap_http_session.headers['User-Agent'],
+                     user_agent)
+    self.assertNotIn('file://', ad_manager.http_session.adapters)
+    self.assertEqual(ad_manager.http_session.headers['User-Agent'],
+                     user_agent)
+
   def testLoadFromString(self):
     with mock.patch('googleads.common.LoadFromString') as mock_load:
       mock_load.return_value = {
@@ -317,8 +506,9 @@ class AdManagerClientTest(unittest.TestCase):
         self.application_name, self.network_code, self.https_proxy, self.cache)
 
   def testGetService_success(self):
+    proxy_config = mock.Mock()
     ad_manager = self.CreateAdManagerClient(
-        cache='cache', proxy_config='proxy', timeout='timeout')
+        cache='cache', proxy_config=proxy_config, timeout='timeout')
     service_name = googleads.ad_manager._SERVICE_MAP[self.version][0]
 
     # Use a custom server. Also test what happens if the server ends with a
@@ -336,11 +526,113 @@ class AdManagerClientTest(unittest.TestCase):
       impl.assert_called_once_with(
           'https://testing.test.com/apis/ads/publisher/%s/%s?wsdl'
           % (self.version, service_name), ad_manager._header_handler,
-          googleads.ad_manager._AdManagerPacker, 'proxy', 'timeout',
-          self.version, cache='cache')
+          googleads.ad_manager._AdManagerPacker, proxy_config, 'timeout',
+          self.version, cache='cache',
+          http_session=ad_manager._soap_http_session,
+          response_mode=googleads.common.RESPONSE_MODE_ZEEP)
       self.assertEqual(service, mock_service)
 
 
+  def testGetService_memoized(self):
+    ad_manager = self.CreateAdManagerClient()
+    service_name = googleads.ad_manager._SERVICE_MAP[self.version][0]
+
+    with mock.patch('googleads.common.'
+                    'GetServiceClassForLibrary') as mock_get_service:
+      impl = mock_get_service.return_value
+      impl.side_effect = lambda *args, **kwargs: mock.Mock()
+
+      service = ad_manager.GetService(service_name, self.version)
+      self.assertIs(service, ad_manager.GetService(service_name, self.version))
+      self.assertIs(service, ad_manager.GetService(
+          service_name, self.version, 'https://ads.google.com/'))
+      self.assertEqual(impl.call_count, 1)
+
+      other = ad_manager.GetService(
+          service_name, self.version, 'https://testing.test.com')
+      self.assertIsNot(service, other)
+      self.assertEqual(impl.call_count, 2)
+
+      ad_manager.ClearServiceCache()
+      self.assertIsNot(service, ad_manager.GetService(
+          service_name, self.version))
+      self.assertEqual(impl.call_count, 3)
+
+      dict_service = ad_manager.GetService(
+          service_name, self.version,
+          response_mode=googleads.common.RESPONSE_MODE_DICT)
+      self.assertIsNot(service, dict_service)
+      self.assertIs(dict_service, ad_manager.GetService(
+          service_name, self.version,
+          response_mode=googleads.common.RESPONSE_MODE_DICT))
+      self.assertEqual(impl.call_args[1]['response_mode'],
+                       googleads.common.RESPONSE_MODE_DICT)
+      self.assertEqual(impl.call_count, 4)
+
+  def testGetService_memoizationDisabled(self):
+    ad_manager = self.CreateAdManagerClient(service_cache_size=0)
+    service_name = googleads.ad_manager._SERVICE_MAP[self.version][0]
+
+    with mock.patch('googleads.common.'
+                    'GetServiceClassForLibrary') as mock_get_service:
+      impl = mock_get_service.return_value
+      impl.side_effect = lambda *args, **kwargs: mock.Mock()
+
+      service = ad_manager.GetService(service_name, self.version)
+      self.assertIsNot(service, ad_manager.GetService(
+          service_name, self.version))
+      self.assertEqual(impl.call_count, 2)
+
+  def testGetService_memoizedFollowsHeaderChanges(self):
+    ad_manager = self.CreateAdManagerClient()
+    service_name = googleads.ad_manager._SERVICE_MAP[self.version][0]
+
+    with mock.patch('googleads.common.'
+                    'GetServiceClassForLibrary') as mock_get_service:
+      ad_manager.GetService(service_name, self.version)
+      header_handler = mock_get_service.return_value.call_args[0][1]
+
+    ad_manager.network_code = '67890'
+    header = header_handler.GetSOAPHeaders(lambda unused_type: mock.Mock())
+    self.assertEqual(header.networkCode, '67890')
+
+  def testGetService_loadsSchemaSnapshot(self):
+    ad_manager = self.CreateAdManagerClient(schema_snapshot_dir='/snapshots')
+    service_name = googleads.ad_manager._SERVICE_MAP[self.version][0]
+
+    with mock.patch('googleads.common.'
+                    'GetServiceClassForLibrary'), \
+        mock.patch('googleads.common.LoadWsdlDocumentSnapshot') as mock_load:
+      ad_manager.GetService(service_name, self.version)
+
+      mock_load.assert_called_once_with(
+          'https://ads.google.com/apis/ads/publisher/%s/%s?wsdl'
+          % (self.version, service_name), self.version,
+          '/snapshots/%s/%s.pickle' % (self.version, service_name))
+
+  def testBuildSchemaSnapshot(self):
+    ad_manager = self.CreateAdManagerClient()
+    service_names = googleads.ad_manager._SERVICE_MAP[self.version][:2]
+
+    with mock.patch('googleads.common.'
+                    'GetServiceClassForLibrary') as mock_get_service, \
+        mock.patch('googleads.common.SaveWsdlDocumentSnapshot') as mock_save:
+      paths = ad_manager.BuildSchemaSnapshot(
+          '/snapshots', self.version, service_names=service_names)
+
+      document = mock_get_service.return_value.return_value.zeep_client.wsdl
+      expected_paths = ['/snapshots/%s/%s.pickle' % (self.version, name)
+                        for name in service_names]
+      self.assertEqual(paths, expected_paths)
+      mock_save.assert_has_calls(
+          [mock.call(document, path) for path in expected_paths])
+
+  def testBuildSchemaSnapshot_badVersion(self):
+    ad_manager = self.CreateAdManagerClient()
+    self.assertRaises(
+        googleads.errors.GoogleAdsValueError, ad_manager.BuildSchemaSnapshot,
+        '/snapshots', '11111')
+
   def testGetService_badService(self):
     ad_manager = self.CreateAdManagerClient()
     with mock.patch('googleads.common.'
@@ -372,6 +664,70 @@ class AdManagerClientTest(unittest.TestCase):
                         ad_manager.GetService, service, self.version)
 
 
+@unittest.skipUnless(hasattr(zeep.transports, 'AsyncTransport'),
+                     'requires zeep 4.0.0 or later')
+class AsyncAdManagerClientTest(unittest.TestCase):
+  """Tests for the googleads.ad_manager.AsyncAdManagerClient class."""
+
+  def setUp(self):
+    self.oauth2_client = mock.Mock()
+    self.version = sorted(googleads.ad_manager._SERVICE_MAP.keys())[-1]
+    self.ad_manager = googleads.ad_manager.AsyncAdManagerClient(
+        self.oauth2_client, 'application name', '12345', cache='cache',
+        timeout='timeout', http_pool_size=5)
+
+  def testGetService(self):
+    service_name = googleads.ad_manager._SERVICE_MAP[self.version][0]
+    with mock.patch('googleads.common.'
+                    'GetAsyncServiceClassForLibrary') as mock_get_service:
+      impl = mock_get_service.return_value
+
+      service = self.ad_manager.GetService(service_name, self.version)
+
+      impl.assert_called_once_with(
+          'https://ads.google.com/apis/ads/publisher/%s/%s?wsdl'
+          % (self.version, service_name), self.ad_manager._header_handler,
+          googleads.ad_manager._AdManagerPacker, self.ad_manager.proxy_config,
+          'timeout', self.version, cache='cache',
+          http_client=self.ad_manager.async_http_client)
+      self.assertEqual(service, impl.return_value)
+      self.assertIs(service, self.ad_manager.GetService(
+          service_name, self.version))
+
+  def testGetServiceDictResponsesNotSupported(self):
+    service_name = googleads.ad_manager._SERVICE_MAP[self.version][0]
+    with mock.patch('googleads.common.GetAsyncServiceClassForLibrary'):
+      self.assertRaises(
+          googleads.errors.GoogleAdsValueError, self.ad_manager.GetService,
+          service_name, self.version,
+          response_mode=googleads.common.RESPONSE_MODE_DICT)
+
+  def testClose(self):
+    async def UseClient():
+      async with self.ad_manager as client:
+        self.assertIs(client, self.ad_manager)
+
+    asyncio.run(UseClient())
+    self.assertTrue(self.ad_manager.async_http_client.is_closed)
+
+  def testCloseClosesServices(self):
+    service_name = googleads.ad_manager._SERVICE_MAP[self.version][0]
+    with mock.patch('googleads.common.'
+                    'GetAsyncServiceClassForLibrary') as mock_get_service:
+      service = mock_get_service.return_value.return_value
+      service.Close = mock.AsyncMock()
+      self.ad_manager.GetService(service_name, self.version)
+
+    asyncio.run(self.ad_manager.Close())
+
+    service.Close.assert_awaited_once_with()
+    self.assertTrue(self.ad_manager.async_http_client.is_closed)
+
+  def testGetDataDownloaderNotSupported(self):
+    self.assertRaises(
+        googleads.errors.GoogleAdsError, self.ad_manager.GetDataDownloader)
+
+
 class AdManagerPackerTest(unittest.TestCase):
   """Tests for the googleads.ad_manager._AdManagerPacker class."""
 
@@ -396,6 +752,21 @@ class AdManagerPackerTest(unittest.TestCase):
     self.assertRaises(googleads.errors.GoogleAdsValueError,
                       self.packer.Pack, input_date, CURRENT_VERSION)
 
+  def testPackDateTimeZoneInfo(self):
+    # zoneinfo time zones name their ID key rather than zone.
+    class ZoneInfo(datetime.tzinfo):
+      key = 'America/New_York'
+
+    input_date = datetime.datetime(2017, 1, 2, 3, 4, 5, tzinfo=ZoneInfo())
+    result = self.packer.Pack(input_date, CURRENT_VERSION)
+    self.assertEqual(result['timeZoneId'], 'America/New_York')
+
+  def testPackDateTimeNeedsTimeZoneId(self):
+    input_date = datetime.datetime(2017, 1, 2, 3, 4, 5,
+                                   tzinfo=datetime.timezone.utc)
+    self.assertRaises(googleads.errors.GoogleAdsValueError,
+                      self.packer.Pack, input_date, CURRENT_VERSION)
+
   def testPackUnsupportedObjectType(self):
     obj = object()
     self.assertEqual(googleads.ad_manager._AdManagerPacker.
@@ -636,6 +1007,373 @@ class DataDownloaderTest(unittest.TestCase):
          'query': ('SELECT Id, Name FROM Line_Item LIMIT 500 OFFSET 0')})
     self.assertEqual([], result_set)
 
+  def _CreatePqlSelect(self, total_rows, delays=None):
+    delays = delays or {}
+    lock = threading.Lock()
+    self.selected_offsets = []
+
+    def Select(statement):
+      offset = int(statement['query'].split('OFFSET ')[1])
+      with lock:
+        self.selected_offsets.append(offset)
+      time.sleep(delays.get(offset, 0.001))
+      row_count = max(0, min(googleads.ad_manager.SUGGESTED_PAGE_LIMIT,
+                             total_rows - offset))
+      if not row_count:
+        return {}
+      return {'columnTypes': [{'labelName': 'Id'}],
+              'rows': [{'values': [NumberValue({'value': str(offset + i)})]}
+                       for i in range(row_count)]}
+
+    return Select
+
+  def testDownloadPqlResultToList_parallel(self):
+    self.pql_service.select.side_effect = self._CreatePqlSelect(
+        1700, {0: 0.05, 1000: 0.02})
+
+    result_set = self.report_downloader.DownloadPqlResultToList(
+        'SELECT Id FROM Line_Item', max_pages_in_flight=3)
+
+    self.assertEqual(result_set, [['Id']] + [[i] for i in range(1700)])
+    self.assertEqual(sorted(self.selected_offsets)[:4], [0, 500, 1000, 1500])
+    self.assertLessEqual(len(self.selected_offsets), 6)
+
+  def testDownloadPqlResultToList_parallelExactMultipleOfPageSize(self):
+    self.pql_service.select.side_effect = self._CreatePqlSelect(1000)
+
+    result_set = self.report_downloader.DownloadPqlResultToList(
+        'SELECT Id FROM Line_Item', max_pages_in_flight=4)
+
+    self.assertEqual(result_set, [['Id']] + [[i] for i in range(1000)])
+
+  def testDownloadPqlResultToCsv_parallelMatchesSequential(self):
+    self.pql_service.select.side_effect = self._CreatePqlSelect(1234)
+    sequential_file = io.StringIO()
+    self.report_downloader.DownloadPqlResultToCsv(
+        'SELECT Id FROM Line_Item', sequential_file)
+    self.assertEqual(self.selected_offsets, [0, 500, 1000])
+
+    self.pql_service.select.side_effect = self._CreatePqlSelect(
+        1234, {0: 0.03})
+    parallel_file = io.StringIO()
+    self.report_downloader.DownloadPqlResultToCsv(
+        'SELECT Id FROM Line_Item', parallel_file, max_pages_in_flight=8)
+
+    self.assertEqual(sequential_file.getvalue(), parallel_file.getvalue())
+
+  def testDownloadPqlResultToList_invalidMaxPagesInFlight(self):
+    self.assertRaises(
+        googleads.errors.GoogleAdsValueError,
+        self.report_downloader.DownloadPqlResultToList,
+        'SELECT Id FROM Line_Item', max_pages_in_flight=0)
+
+  def testDownloadPqlResultToList_keyset(self):
+    def CreateResponse(first_id, row_count):
+      return {'columnTypes': [{'labelName': 'Name'}, {'labelName': 'Id'}],
+              'rows': [{'values': [TextValue({'value': 'n'}),
+                                   NumberValue({'value': str(first_id + i)})]}
+                       for i in range(row_count)]}
+
+    self.pql_service.select.side_effect = [
+        CreateResponse(1, googleads.ad_manager.SUGGESTED_PAGE_LIMIT),
+        CreateResponse(1001, 3)]
+
+    result_set = self.report_downloader.DownloadPqlResultToList(
+        'SELECT Name, Id FROM Line_Item where Status = :status OR Id = 2',
+        {'status': 'READY'}, keyset_column='Id')
+
+    self.assertEqual(len(result_set),
+                     1 + googleads.ad_manager.SUGGESTED_PAGE_LIMIT + 3)
+    self.assertEqual(result_set[-1], ['n', 1003])
+    first_call, second_call = self.pql_service.select.call_args_list
+    self.assertEqual(
+        first_call[0][0]['query'],
+        'SELECT Name, Id FROM Line_Item where Status = :status OR Id = 2 '
+        'ORDER BY Id ASC LIMIT 500')
+    self.assertEqual(
+        second_call[0][0]['query'],
+        'SELECT Name, Id FROM Line_Item WHERE (Status = :status OR Id = 2) '
+        'AND Id > :__last_id ORDER BY Id ASC LIMIT 500')
+    self.assertEqual(second_call[0][0]['values'][0]['key'], 'status')
+    self.assertEqual(second_call[0][0]['values'][1]['key'], '__last_id')
+    self.assertEqual(second_call[0][0]['values'][1]['value']['value'], '500')
+
+  def testDownloadPqlResultToList_keysetColumnNotSelected(self):
+    self.pql_service.select.return_value = {'rows': self.generic_rval,
+                                            'columnTypes': self.generic_header}
+
+    self.assertRaises(
+        googleads.errors.GoogleAdsValueError,
+        self.report_downloader.DownloadPqlResultToList,
+        'SELECT Name FROM Line_Item', keyset_column='Id')
+
+  def testDownloadPqlResultToList_keysetWithOrderBy(self):
+    self.assertRaises(
+        googleads.errors.GoogleAdsValueError,
+        self.report_downloader.DownloadPqlResultToList,
+        'SELECT Id FROM Line_Item ORDER BY Name', keyset_column='Id')
+    self.assertRaises(
+        googleads.errors.GoogleAdsValueError,
+        self.report_downloader.DownloadPqlResultToList,
+        'SELECT Id FROM Line_Item', max_pages_in_flight=2, keyset_column='Id')
+
+  def testDownloadPqlResultToList_pageSizer(self):
+    selected = []
+
+    def Select(statement):
+      limit = int(statement['query'].split('LIMIT ')[1].split()[0])
+      offset = int(statement['query'].split('OFFSET ')[1])
+      selected.append((offset, limit))
+      if limit > 1000:
+        raise requests.exceptions.ReadTimeout()
+      return {'columnTypes': [{'labelName': 'Id'}],
+              'rows': [{'values': [NumberValue({'value': str(i)})]}
+                       for i in range(offset, min(offset + limit, 2600))]}
+
+    self.pql_service.select.side_effect = Select
+    page_sizer = googleads.ad_manager.AdaptivePageSizer(
+        initial_page_size=500, min_page_size=100, max_page_size=5000)
+
+    result_set = self.report_downloader.DownloadPqlResultToList(
+        'SELECT Id FROM Line_Item', page_sizer=page_sizer)
+
+    self.assertEqual(result_set, [['Id']] + [[i] for i in range(2600)])
+    self.assertEqual(selected, [(0, 500), (500, 1000), (1500, 2000),
+                                (1500, 1000), (2500, 1000)])
+    metrics = page_sizer.GetMetrics()
+    self.assertEqual(metrics['timeouts'], 1)
+    self.assertEqual(metrics['rows'], 2600)
+
+  def testDownloadPqlResultToList_pageSizerTimeoutAtMinimum(self):
+    self.pql_service.select.side_effect = requests.exceptions.ReadTimeout()
+    page_sizer = googleads.ad_manager.AdaptivePageSizer(
+        initial_page_size=100, min_page_size=100)
+
+    self.assertRaises(
+        requests.exceptions.ReadTimeout,
+        self.report_downloader.DownloadPqlResultToList,
+        'SELECT Id FROM Line_Item', page_sizer=page_sizer)
+
+  def testDownloadPqlResultToList_convertsByColumn(self):
+    rows = self.generic_rval + [{'values': [
+        TextValue({'value': None}), DateValue({'value': None}),
+        NumberValue({'value': '1.5'}), DateTimeValue({'value': None}),
+        NumberValue({'value': '7'}), SetValue({'values': []})]}]
+    self.pql_service.select.return_value = {
+        'rows': rows, 'columnTypes': [{'labelName': str(i)} for i in range(6)]}
+
+    with mock.patch.object(
+        self.report_downloader, '_GetPqlConversionPlan',
+        wraps=self.report_downloader._GetPqlConversionPlan) as get_plan:
+      result_set = self.report_downloader.DownloadPqlResultToList(
+          'SELECT * FROM Line_Item')
+      get_plan.assert_called_once_with(rows[0])
+
+    self.assertEqual(result_set[1:], [
+        [self.report_downloader._ConvertValueForCsv(value)
+         for value in row['values']] for row in rows])
+    self.assertEqual(result_set[3], ['-', '-', 1.5, '-', 7, '-'])
+
+  def testDownloadPqlResultToList_mixedValueTypes(self):
+    rows = [
+        {'values': [TextValue({'value': None}), NumberValue({'value': '1'})]},
+        {'values': [NumberValue({'value': '5'}), TextValue({'value': 'abc'})]},
+        {'values': [NumberValue({'value': '2.5'}),
+                    NumberValue({'value': '3'})]}]
+    self.pql_service.select.return_value = {
+        'rows': rows, 'columnTypes': [{'labelName': 'A'}, {'labelName': 'B'}]}
+
+    result_set = self.report_downloader.DownloadPqlResultToList(
+        'SELECT A, B FROM Line_Item')
+
+    self.assertEqual(result_set, [['A', 'B'], ['-', 1], [5, 'abc'], [2.5, 3]])
+    self.assertEqual(result_set[1:], [
+        [self.report_downloader._ConvertValueForCsv(value)
+         for value in row['values']] for row in rows])
+
+  def testConvertDateTimeToOffset_matchesLocalize(self):
+    # Includes daylight saving time transition days, whose offsets aren't
+    # cached, and a zone whose offset isn't a whole number of hours.
+    for time_zone_id, year, month, day, hour, minute in (
+        ('America/New_York', 2024, 3, 9, 12, 0),
+        ('America/New_York', 2024, 3, 10, 1, 59),
+        ('America/New_York', 2024, 3, 10, 3, 0),
+        ('America/New_York', 2024, 11, 3, 1, 30),
+        ('America/New_York', 2024, 11, 3, 23, 59),
+        ('Asia/Kolkata', 2024, 6, 1, 0, 0),
+        ('Europe/London', 2024, 1, 1, 12, 0),
+        ('GMT', 2013, 1, 3, 2, 2)):
+      date_time_value = {
+          'date': {'year': str(year), 'month': '%02d' % month,
+                   'day': '%02d' % day},
+          'hour': '%02d' % hour, 'minute': '%02d' % minute, 'second': '07',
+          'timeZoneId': time_zone_id}
+      localized = pytz.timezone(time_zone_id).localize(
+          datetime.datetime(year, month, day, hour, minute, 7))
+      expected = localized.isoformat()
+      if expected[-5:] == '00:00':
+        expected = expected[:-6] + 'Z'
+
+      for _ in range(2):
+        self.assertEqual(
+            self.report_downloader._ConvertDateTimeToOffset(date_time_value),
+            expected)
+        self.assertEqual(
+            self.report_downloader._ConvertDateTimeToTimestamp(
+                date_time_value),
+            int(localized.timestamp()))
+
+  def testGetUtcOffset_transitionDay(self):
+    self.assertEqual(googleads.ad_manager._GetUtcOffset(
+        'America/New_York', 2024, 3, 9), (-18000, '-05:00'))
+    self.assertEqual(googleads.ad_manager._GetUtcOffset(
+        'America/New_York', 2024, 3, 10), (None, None))
+    self.assertEqual(googleads.ad_manager._GetUtcOffset(
+        'America/New_York', 2024, 3, 11), (-14400, '-04:00'))
+    self.assertEqual(googleads.ad_manager._GetUtcOffset(
+        'UTC', 2024, 3, 10), (0, 'Z'))
+
+  def testIteratePqlResultBatches(self):
+    header = [{'labelName': name} for name in (
+        'Text', 'Date', 'Number', 'DateTime', 'Missing', 'Set')]
+    self.pql_service.select.return_value = {'rows': self.generic_rval,
+                                            'columnTypes': header}
+
+    batches = list(self.report_downloader.IteratePqlResultBatches(
+        'SELECT * FROM Line_Item'))
+
+    self.assertEqual(len(batches), 1)
+    self.assertEqual(batches[0].schema, pyarrow.schema([
+        ('Text', pyarrow.string()), ('Date', pyarrow.date32()),
+        ('Number', pyarrow.int64()),
+        ('DateTime', pyarrow.timestamp('s', tz='UTC')),
+        ('Missing', pyarrow.int64()),
+        ('Set', pyarrow.list_(pyarrow.string()))]))
+    self.assertEqual(batches[0].to_pydict(), {
+        'Text': ['Some random PQL response...',
+                 'A second row of PQL response!'],
+        'Date': [datetime.date(1999, 4, 3), datetime.date(2009, 2, 5)],
+        'Number': [123, 345],
+        'DateTime': [
+            datetime.datetime(2012, 11, 5, 20, 12, 12, tzinfo=pytz.utc),
+            datetime.datetime(2013, 1, 3, 2, 2, 2, tzinfo=pytz.utc)],
+        'Missing': [None, 123456],
+        'Set': [['Whatcha thinkin about?', 'Oh nothing, just String stuff...'],
+                ['Look at how many commas and "s there are',
+                 'this,is...how,Christopher Walken, talks']]})
+
+  def testDownloadPqlResultToParquet(self):
+    def Select(statement):
+      offset = int(statement['query'].split('OFFSET ')[1])
+      row_count = 500 if offset < 1000 else 3
+      return {'columnTypes': [{'labelName': 'Id'}, {'labelName': 'Ctr'},
+                              {'labelName': 'Active'}],
+              'rows': [{'values': [
+                  NumberValue({'value': str(offset + i)}),
+                  NumberValue({'value': '0.5' if i % 2 else '1'}),
+                  BooleanValue({'value': bool(i % 2)})]}
+                       for i in range(row_count)]}
+
+    self.pql_service.select.side_effect = Select
+    outfile = io.BytesIO()
+
+    self.report_downloader.DownloadPqlResultToParquet(
+        'SELECT Id, Ctr, Active FROM Line_Item', outfile)
+
+    table = pyarrow.parquet.read_table(io.BytesIO(outfile.getvalue()))
+    self.assertEqual(table.num_rows, 1003)
+    self.assertEqual(table.column('Id').to_pylist(), list(range(1003)))
+    self.assertEqual(table.schema.field('Ctr').type, pyarrow.float64())
+    self.assertEqual(table.column('Active').to_pylist()[:2], [False, True])
+
+  def testDownloadPqlResultToParquet_noRows(self):
+    self.pql_service.select.return_value = {}
+    outfile = io.BytesIO()
+
+    self.report_downloader.DownloadPqlResultToParquet(
+        'SELECT Id FROM Line_Item', outfile)
+
+    self.assertEqual(
+        pyarrow.parquet.read_table(io.BytesIO(outfile.getvalue())).num_rows, 0)
+
+  def testStreamReportBatches(self):
+    report = ('Dimension.DATE,Dimension.LINE_ITEM_ID,Dimension.LINE_ITEM_NAME,'
+              'Column.AD_SERVER_IMPRESSIONS,Column.AD_SERVER_CTR\n'
+              '2024-01-01,123,"Line, ""quoted""",1000,0.25\n'
+              '2024-01-02,456,"007\n\u00e9",,0\n')
+    data = gzip.compress(report.encode('utf-8'))
+
+    with mock.patch.object(self.report_downloader, 'http_session',
+                           FakeRangeSession(data)):
+      batches = list(self.report_downloader.StreamReportBatches(
+          '123', chunk_size=7,
+          column_types={'Column.AD_SERVER_IMPRESSIONS': pyarrow.int64()}))
+
+    table = pyarrow.Table.from_batches(batches)
+    self.assertEqual(table.schema, pyarrow.schema([
+        ('Dimension.DATE', pyarrow.date32()),
+        ('Dimension.LINE_ITEM_ID', pyarrow.int64()),
+        ('Dimension.LINE_ITEM_NAME', pyarrow.string()),
+        ('Column.AD_SERVER_IMPRESSIONS', pyarrow.int64()),
+        ('Column.AD_SERVER_CTR', pyarrow.float64())]))
+    self.assertEqual(table.to_pydict(), {
+        'Dimension.DATE': [datetime.date(2024, 1, 1),
+                           datetime.date(2024, 1, 2)],
+        'Dimension.LINE_ITEM_ID': [123, 456],
+        'Dimension.LINE_ITEM_NAME': ['Line, "quoted"', '007\n\u00e9'],
+        'Column.AD_SERVER_IMPRESSIONS': [1000, None],
+        'Column.AD_SERVER_CTR': [0.25, 0.0]})
+    self.report_service.getReportDownloadUrlWithOptions.assert_called_once_with(
+        '123', {'exportFormat': 'CSV_DUMP', 'includeReportProperties': False,
+                'includeTotalsRow': False, 'useGzipCompression': True})
+
+  def testStreamReportBatches_unparseableIds(self):
+    report = ('Dimension.ORDER_ID,Dimension.LINE_ITEM_ID,Column.CLICKS\n'
+              '123,-,1\n'
+              '-,N/A,2\n'
+              '456,789,3\n')
+
+    with mock.patch.object(self.report_downloader, 'http_session',
+                           FakeRangeSession(gzip.compress(
+                               report.encode('utf-8')))):
+      batches = list(self.report_downloader.StreamReportBatches('123'))
+
+    table = pyarrow.Table.from_batches(batches)
+    self.assertEqual(table.schema.field('Dimension.ORDER_ID').type,
+                     pyarrow.int64())
+    self.assertEqual(table.to_pydict(), {
+        'Dimension.ORDER_ID': [123, None, 456],
+        'Dimension.LINE_ITEM_ID': [None, None, 789],
+        'Column.CLICKS': [1.0, 2.0, 3.0]})
+
+  def testDownloadReportToParquet(self):
+    data = gzip.compress(b'Dimension.AD_UNIT_ID\tColumn.CLICKS\n' + b''.join(
+        b'%d\t%d\n' % (i, i * 2) for i in range(50000)))
+    outfile = io.BytesIO()
+
+    with mock.patch.object(self.report_downloader, 'http_session',
+                           FakeRangeSession(data)):
+      self.report_downloader.DownloadReportToParquet('123', outfile, 'TSV')
+
+    table = pyarrow.parquet.read_table(io.BytesIO(outfile.getvalue()))
+    self.assertEqual(table.column('Dimension.AD_UNIT_ID').to_pylist(),
+                     list(range(50000)))
+    self.assertEqual(table.column('Column.CLICKS')[-1].as_py(), 99998.0)
+
+  def testStreamReportBatches_emptyReport(self):
+    with mock.patch.object(self.report_downloader, 'http_session',
+                           FakeRangeSession(gzip.compress(b''))):
+      self.assertEqual(
+          list(self.report_downloader.StreamReportBatches('123')), [])
+
+  def testArrowOutputRequiresPyarrow(self):
+    with mock.patch('googleads.ad_manager.pyarrow', None):
+      self.assertRaises(googleads.errors.GoogleAdsError,
+                        self.report_downloader.IteratePqlResultBatches,
+                        'SELECT Id FROM Line_Item')
+      self.assertRaises(googleads.errors.GoogleAdsError,
+                        self.report_downloader.StreamReportBatches, '123')
+
   def testWaitForReport_success(self):
     id_ = '1g684'
     input_ = {'reportQuery': 'something', 'id': id_}
@@ -670,25 +1408,394 @@ class DataDownloaderTest(unittest.TestCase):
         googleads.errors.AdManagerReportError,
         self.report_downloader.WaitForReport, {'id': 'obj'})
 
+  def _SetUpReportJobs(self, statuses):
+    """Fakes report jobs named after the keys of statuses.
+
+    Args:
+      statuses: A dict mapping report job IDs to the statuses returned by
+        successive getReportJobStatus calls. An exception as a report job's
+        statuses makes runReportJob raise it.
+    """
+    statuses = {report_job_id: (iter(report_job_statuses)
+                                if isinstance(report_job_statuses, list)
+                                else report_job_statuses)
+                for report_job_id, report_job_statuses in statuses.items()}
+
+    def RunReportJob(report_job):
+      if isinstance(statuses[report_job['id']], Exception):
+        raise statuses[report_job['id']]
+      return report_job
+
+    self.report_service.runReportJob.side_effect = RunReportJob
+    self.report_service.getReportJobStatus.side_effect = (
+        lambda report_job_id: next(statuses[report_job_id]))
+
+  def testRunReports(self):
+    self._SetUpReportJobs({
+        'a': ['IN_PROGRESS', 'IN_PROGRESS', 'COMPLETED'],
+        'b': ['COMPLETED'],
+        'c': ['IN_PROGRESS', 'FAILED']})
+    completed = []
+
+    with mock.patch('time.sleep') as mock_sleep:
+      results = self.report_downloader.RunReports(
+          [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}],
+          download_function=lambda report_job_id: report_job_id.upper(),
+          callback=completed.append)
+
+    self.assertEqual([result.report_job_id for result in results],
+                     ['a', 'b', 'c'])
+    self.assertEqual([result.result for result in results], ['A', 'B', None])
+    self.assertTrue(results[0].succeeded)
+    self.assertIsInstance(results[2].error,
+                          googleads.errors.AdManagerReportError)
+    self.assertEqual(sorted(result.report_job_id for result in completed),
+                     ['a', 'b', 'c'])
+    self.assertEqual(completed[-1].report_job_id, 'a')
+    self.assertEqual(self.report_service.getReportJobStatus.call_count, 6)
+    # Statuses are polled together, not once per report job.
+    self.assertEqual(mock_sleep.call_count, 2)
+
+  def testRunReports_noDownloadFunction(self):
+    self._SetUpReportJobs({'a': ['IN_PROGRESS', 'COMPLETED']})
+
+    with mock.patch('time.sleep') as mock_sleep:
+      results = self.report_downloader.RunReports([{'id': 'a'}])
+      self.assertEqual(mock_sleep.call_count, 1)
+      self.assertAlmostEqual(mock_sleep.call_args[0][0], 30, places=0)
+
+    self.assertEqual(results[0].result, 'a')
+    self.assertIsNone(results[0].error)
+
+  def testRunReports_failuresArePerJob(self):
+    error = googleads.errors.GoogleAdsServerFault(None, 'bad query')
+    self._SetUpReportJobs({'a': error, 'b': ['COMPLETED'], 'c': ['COMPLETED']})
+
+    def Download(report_job_id):
+      if report_job_id == 'c':
+        raise IOError('disk full')
+      return report_job_id
+
+    results = self.report_downloader.RunReports(
+        [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}], download_function=Download,
+        poll_time_seconds=0)
+
+    self.assertIsNone(results[0].report_job_id)
+    self.assertIs(results[0].error, error)
+    self.assertEqual(results[1].result, 'b')
+    self.assertIsInstance(results[2].error, IOError)
+    self.assertFalse(results[2].succeeded)
+
+  def testRunReports_pollsWhileDownloading(self):
+    self._SetUpReportJobs({'a': ['COMPLETED'],
+                           'b': ['IN_PROGRESS'] * 3 + ['COMPLETED']})
+    download_started = threading.Event()
+    release_download = threading.Event()
+    download_order = []
+
+    def Download(report_job_id):
+      if report_job_id == 'a':
+        download_started.set()
+        release_download.wait(5)
+      download_order.append(report_job_id)
+      return report_job_id
+
+    def Callback(result):
+      if result.report_job_id == 'b':
+        release_download.set()
+
+    results = self.report_downloader.RunReports(
+        [{'id': 'a'}, {'id': 'b'}], download_function=Download,
+        callback=Callback, poll_time_seconds=0.01)
+
+    self.assertTrue(download_started.is_set())
+    self.assertEqual(download_order, ['b', 'a'])
+    self.assertEqual([result.result for result in results], ['a', 'b'])
+
+  def testRunReports_pollingStrategy(self):
+    self._SetUpReportJobs({
+        'small': ['IN_PROGRESS', 'COMPLETED'],
+        'large': ['IN_PROGRESS'] * 4 + ['COMPLETED'],
+        'stuck': ['IN_PROGRESS'] * 10})
+    polling_strategy = googleads.ad_manager.BackoffReportPollingStrategy(
+        initial_poll_seconds=1, max_poll_seconds=4, jitter_fraction=0,
+        deadline_seconds=10)
+    clock = [1000.0]
+    polls = []
+
+    def Sleep(seconds):
+      clock[0] += seconds
+
+    def GetReportJobStatus(report_job_id):
+      polls.append((clock[0] - 1000, report_job_id))
+      return get_report_job_status(report_job_id)
+
+    get_report_job_status = self.report_service.getReportJobStatus.side_effect
+    self.report_service.getReportJobStatus.side_effect = GetReportJobStatus
+
+    with mock.patch('time.time', side_effect=lambda: clock[0]), mock.patch(
+        'time.sleep', side_effect=Sleep):
+      results = self.report_downloader.RunReports(
+          [{'id': 'small'}, {'id': 'large'}, {'id': 'stuck'}],
+          polling_strategy=polling_strategy)
+
+    self.assertEqual([result.result for result in results],
+                     ['small', 'large', None])
+    self.assertIsInstance(results[2].error,
+                          googleads.errors.AdManagerReportTimeoutError)
+    self.assertEqual([time_ for time_, report_job_id in polls
+                      if report_job_id == 'large'], [0, 1, 3, 7, 10])
+    self.assertEqual([time_ for time_, report_job_id in polls
+                      if report_job_id == 'small'], [0, 1])
+
+  def testRunReports_invalidMaxDownloadsInFlight(self):
+    self.assertRaises(
+        googleads.errors.GoogleAdsValueError,
+        self.report_downloader.RunReports, [{'id': 'a'}],
+        max_downloads_in_flight=0)
+
+  def testWaitForReport_pollingStrategy(self):
+    self.report_service.getReportJobStatus.side_effect = (
+        ['IN_PROGRESS'] * 5 + ['COMPLETED'])
+    self.report_service.runReportJob.return_value = {'id': '1'}
+    polling_strategy = googleads.ad_manager.BackoffReportPollingStrategy(
+        initial_poll_seconds=2, max_poll_seconds=10, jitter_fraction=0)
+
+    with mock.patch('time.sleep') as mock_sleep:
+      rval = self.report_downloader.WaitForReport(
+          {'id': '1'}, polling_strategy=polling_strategy)
+
+    self.assertEqual(rval, '1')
+    self.assertEqual([call[0][0] for call in mock_sleep.call_args_list],
+                     [2, 4, 8, 10, 10])
+
+  def testWaitForReport_deadline(self):
+    self.report_service.getReportJobStatus.return_value = 'IN_PROGRESS'
+    self.report_service.runReportJob.return_value = {'id': '1'}
+    polling_strategy = googleads.ad_manager.FixedReportPollingStrategy(
+        poll_seconds=30, deadline_seconds=45)
+    clock = [1000.0]
+
+    def Sleep(seconds):
+      clock[0] += seconds
+
+    with mock.patch('time.time', side_effect=lambda: clock[0]), mock.patch(
+        'time.sleep', side_effect=Sleep) as mock_sleep:
+      with self.assertRaises(
+          googleads.errors.AdManagerReportTimeoutError) as context:
+        self.report_downloader.WaitForReport(
+            {'id': '1'}, polling_strategy=polling_strategy)
+
+    self.assertEqual(context.exception.report_job_id, '1')
+    self.assertEqual([call[0][0] for call in mock_sleep.call_args_list],
+                     [30, 15])
+    self.assertEqual(self.report_service.getReportJobStatus.call_count, 3)
+
+  def testRunReportToFile_cache(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    self.report_downloader._report_cache = googleads.ad_manager.ReportCache(
+        directory.name)
+    report_job = {'reportQuery': {'dimensions': ['DATE']}}
+
+    def Download(report_job_id, export_format, outfile, *args):
+      outfile.write(b'report ' + report_job_id.encode('utf-8'))
+
+    with mock.patch.object(
+        self.report_downloader, 'WaitForReport',
+        return_value='123') as wait_for_report, mock.patch.object(
+            self.report_downloader, 'DownloadReportToFile',
+            side_effect=Download) as download:
+      first_outfile = io.BytesIO()
+      first_id = self.report_downloader.RunReportToFile(
+          report_job, 'CSV_DUMP', first_outfile)
+      second_outfile = io.BytesIO()
+      second_id = self.report_downloader.RunReportToFile(
+          dict(report_job, id='456'), 'CSV_DUMP', second_outfile)
+      self.report_downloader.RunReportToFile(report_job, 'TSV', io.BytesIO())
+
+    self.assertEqual(first_id, '123')
+    self.assertIsNone(second_id)
+    self.assertEqual(first_outfile.getvalue(), b'report 123')
+    self.assertEqual(second_outfile.getvalue(), b'report 123')
+    self.assertEqual(wait_for_report.call_count, 2)
+    self.assertEqual(download.call_count, 2)
+    self.assertFalse([file_name for file_name in os.listdir(directory.name)
+                      if file_name.endswith('.tmp')])
+
+  def testRunReportToFile_failedDownloadIsNotCached(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    self.report_downloader._report_cache = googleads.ad_manager.ReportCache(
+        directory.name)
+
+    with mock.patch.object(
+        self.report_downloader, 'WaitForReport',
+        return_value='123'), mock.patch.object(
+            self.report_downloader, 'DownloadReportToFile',
+            side_effect=IOError('connection lost')):
+      self.assertRaises(IOError, self.report_downloader.RunReportToFile,
+                        {'reportQuery': {}}, 'CSV_DUMP', io.BytesIO())
+
+    self.assertEqual(os.listdir(directory.name), [])
+
+  def testRunReportToFile_noCache(self):
+    outfile = io.BytesIO()
+    with mock.patch.object(
+        self.report_downloader, 'WaitForReport',
+        return_value='123') as wait_for_report, mock.patch.object(
+            self.report_downloader, 'DownloadReportToFile') as download:
+      self.assertEqual(self.report_downloader.RunReportToFile(
+          {'reportQuery': {}}, 'CSV_DUMP', outfile), '123')
+
+    wait_for_report.assert_called_once_with({'reportQuery': {}},
+                                            polling_strategy=None)
+    download.assert_called_once_with('123', 'CSV_DUMP', outfile, False, None,
+                                     True, 1)
+
+  def _SetUpDailyReports(self, failing_days=()):
+    """Fakes daily report jobs whose reports have one row for their day."""
+    report_jobs = {}
+
+    def RunReportJob(report_job):
+      report_job_id = str(len(report_jobs))
+      report_jobs[report_job_id] = report_job
+      return {'id': report_job_id}
+
+    def GetReportJobStatus(report_job_id):
+      day = report_jobs[report_job_id]['reportQuery']['startDate']
+      return 'FAILED' if day in failing_days else 'COMPLETED'
+
+    def Download(report_job_id, export_format, outfile, *args):
+      day = report_jobs[report_job_id]['reportQuery']['startDate']
+      outfile.write(('Dimension.DATE,Column.AD_SERVER_IMPRESSIONS\n'
+                     '%s,%d\n' % (day, day.day)).encode('utf-8'))
+
+    self.report_service.runReportJob.side_effect = RunReportJob
+    self.report_service.getReportJobStatus.side_effect = GetReportJobStatus
+    return mock.patch.object(self.report_downloader, 'DownloadReportToFile',
+                             side_effect=Download)
+
+  def _CreateDailyReportJob(self, start_date, end_date):
+    return {'id': '1', 'reportQuery': {
+        'dimensions': ['DATE'], 'columns': ['AD_SERVER_IMPRESSIONS'],
+        'dateRangeType': 'CUSTOM_DATE',
+        'startDate': {'year': start_date.year, 'month': start_date.month,
+                      'day': start_date.day},
+        'endDate': end_date}}
+
+  def testDownloadReportByDayToFile(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    partition_cache = googleads.ad_manager.ReportCache(directory.name,
+                                                       ttl_seconds=0)
+    today = datetime.datetime.now(
+        googleads.ad_manager._EARLIEST_TIME_ZONE).date()
+    day = datetime.timedelta(days=1)
+
+    with self._SetUpDailyReports() as download:
+      first_outfile = io.BytesIO()
+      first_days = self.report_downloader.DownloadReportByDayToFile(
+          self._CreateDailyReportJob(today - 5 * day, today - 2 * day),
+          'CSV_DUMP', first_outfile, partition_cache)
+      # A day later, the range has rolled forward by a day.
+      second_outfile = io.BytesIO()
+      second_days = self.report_downloader.DownloadReportByDayToFile(
+          self._CreateDailyReportJob(today - 4 * day, today),
+          'CSV_DUMP', second_outfile, partition_cache)
+
+    self.assertEqual(first_days, [today - i * day for i in (5, 4, 3, 2)])
+    self.assertEqual(second_days, [today - day, today])
+    self.assertEqual(download.call_count, 6)
+    self.assertEqual(
+        second_outfile.getvalue().decode('utf-8'),
+        'Dimension.DATE,Column.AD_SERVER_IMPRESSIONS\n' + ''.join(
+            '%s,%d\n' % (today - i * day, (today - i * day).day)
+            for i in (4, 3, 2, 1, 0)))
+    # Recent days are stored only until they expire.
+    self.assertEqual(
+        len([file_name for file_name in os.listdir(directory.name)
+             if file_name.endswith('.report')]), 4)
+
+  def testDownloadReportByDayToFile_timeZoneBehindUtc(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    partition_cache = googleads.ad_manager.ReportCache(directory.name)
+    # It is January 2nd in UTC, but still January 1st for a network in
+    # America/Los_Angeles, whose yesterday is December 31st.
+    utc_now = datetime.datetime(2024, 1, 2, 3, tzinfo=pytz.utc)
+    self.assertEqual(
+        utc_now.astimezone(pytz.timezone('America/Los_Angeles')).date(),
+        datetime.date(2024, 1, 1))
+    report_job = self._CreateDailyReportJob(datetime.date(2023, 12, 28),
+                                            datetime.date(2023, 12, 31))
+
+    with mock.patch('datetime.datetime', FixedNow(utc_now)):
+      with self._SetUpDailyReports():
+        first_days = self.report_downloader.DownloadReportByDayToFile(
+            report_job, 'CSV_DUMP', io.BytesIO(), partition_cache)
+        second_days = self.report_downloader.DownloadReportByDayToFile(
+            report_job, 'CSV_DUMP', io.BytesIO(), partition_cache)
+
+    self.assertEqual(len(first_days), 4)
+    self.assertEqual(second_days, [datetime.date(2023, 12, 31)])
+
+  def testDownloadReportByDayToFile_failedDay(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    partition_cache = googleads.ad_manager.ReportCache(directory.name)
+    start_date = datetime.date(2020, 1, 1)
+    report_job = self._CreateDailyReportJob(start_date,
+                                            datetime.date(2020, 1, 3))
+
+    with self._SetUpDailyReports(failing_days=[datetime.date(2020, 1, 2)]):
+      self.assertRaises(
+          googleads.errors.AdManagerReportError,
+          self.report_downloader.DownloadReportByDayToFile, report_job,
+          'CSV_DUMP', io.BytesIO(), partition_cache)
+    with self._SetUpDailyReports():
+      fetched_days = self.report_downloader.DownloadReportByDayToFile(
+          report_job, 'CSV_DUMP', io.BytesIO(), partition_cache)
+
+    self.assertEqual(fetched_days, [datetime.date(2020, 1, 2)])
+
+  def testDownloadReportByDayToFile_invalidReportJob(self):
+    partition_cache = mock.Mock()
+    report_job = self._CreateDailyReportJob(datetime.date(2020, 1, 1),
+                                            datetime.date(2020, 1, 3))
+    for invalid_report_job, export_format in (
+        ({'reportQuery': dict(report_job['reportQuery'],
+                              dateRangeType='LAST_WEEK')}, 'CSV_DUMP'),
+        ({'reportQuery': dict(report_job['reportQuery'],
+                              dimensions=['AD_UNIT_NAME'])}, 'CSV_DUMP'),
+        ({'reportQuery': dict(report_job['reportQuery'],
+                              dimensions=['AD_UNIT_NAME', 'DATE'])},
+         'CSV_DUMP'),
+        (report_job, 'XLSX')):
+      self.assertRaises(
+          googleads.errors.GoogleAdsValueError,
+          self.report_downloader.DownloadReportByDayToFile,
+          invalid_report_job, export_format, io.BytesIO(), partition_cache)
+
   def testDownloadReportToFile(self):
     report_format = 'CSV_DUMP'
     report_job_id = 't68t3278y429'
     report_download_url = 'http://google.com/something'
-    report_data = 'THIS IS YOUR REPORT!'
-    report_contents = io.StringIO()
-    report_contents.write(report_data)
-    report_contents.seek(0)
-    fake_response = mock.Mock()
-    fake_response.read = report_contents.read
-    fake_response.msg = 'fake message'
-    fake_response.code = '200'
-    outfile = io.StringIO()
+    report_data = b'THIS IS YOUR REPORT!'
+    fake_response = mock.MagicMock()
+    fake_response.raw = io.BytesIO(report_data)
+    fake_response.raw.read = mock.Mock(
+        side_effect=lambda size, decode_content: io.BytesIO.read(
+            fake_response.raw, size))
+    fake_response.reason = 'fake message'
+    fake_response.status_code = 200
+    outfile = io.BytesIO()
 
     download_func = self.report_service.getReportDownloadUrlWithOptions
     download_func.return_value = report_download_url
 
-    with mock.patch('urllib.request.OpenerDirector.open') as mock_open:
-      mock_open.return_value = fake_response
+    with mock.patch.object(self.report_downloader, 'http_session') as session:
+      session.get.return_value = fake_response
 
       self.report_downloader.DownloadReportToFile(
           report_job_id, report_format, outfile)
@@ -699,9 +1806,255 @@ class DataDownloaderTest(unittest.TestCase):
           'useGzipCompression': True,
       }
       download_func.assert_called_once_with(report_job_id, default_opts)
-      mock_open.assert_called_once_with(report_download_url)
+      session.get.assert_called_once_with(
+          report_download_url, headers={'Accept-Encoding': 'identity'},
+          stream=True, timeout=3600)
+      fake_response.raise_for_status.assert_called_once_with()
+      fake_response.raw.read.assert_called_with(
+          googleads.ad_manager._CHUNK_SIZE, decode_content=False)
       self.assertEqual(report_data, outfile.getvalue())
 
+  def testDownloadReportToFile_noTransferEncoding(self):
+    data = b'Dimension.DATE,Column.AD_SERVER_IMPRESSIONS\n2020-01-01,5\n'
+    adapter = FakeEncodingAdapter(data)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    self.report_service.getReportDownloadUrlWithOptions.return_value = (
+        'https://reports.example.com/report')
+    outfile = io.BytesIO()
+
+    with mock.patch.object(self.report_downloader, 'http_session', session):
+      self.report_downloader.DownloadReportToFile(
+          '123', 'CSV_DUMP', outfile, use_gzip_compression=False)
+
+    self.assertEqual(outfile.getvalue(), data)
+    self.assertEqual(adapter.requests[0].headers['Accept-Encoding'],
+                     'identity')
+
+  def _DownloadReport(self, session, outfile, **kwargs):
+    self.report_service.getReportDownloadUrlWithOptions.return_value = 'url'
+    with mock.patch.object(self.report_downloader, 'http_session', session):
+      self.report_downloader.DownloadReportToFile(
+          '123', 'CSV_DUMP', outfile, **kwargs)
+
+  def testDownloadReportToFile_resumesDroppedConnection(self):
+    data = bytes(range(256)) * 10
+    session = FakeRangeSession(data, drops={0: 1000})
+    outfile = io.BytesIO()
+
+    self._DownloadReport(session, outfile)
+
+    self.assertEqual(outfile.getvalue(), data)
+    self.assertEqual(session.ranges, [None, 'bytes=1000-'])
+
+  def testDownloadReportToFile_cannotResumeWithoutRanges(self):
+    data = b'x' * 100
+    session = FakeRangeSession(data, supports_ranges=False, drops={0: 10})
+
+    self.assertRaises(googleads.errors.GoogleAdsError, self._DownloadReport,
+                      session, io.BytesIO())
+
+  def testDownloadReportToFile_givesUpAfterMaxRetries(self):
+    session = mock.Mock()
+    session.get.side_effect = lambda *args, **kwargs: FakeRangeResponse(
+        b'x' * 100, 206, {}, drop_after=0)
+
+    self.assertRaises(urllib3.exceptions.ProtocolError, self._DownloadReport,
+                      session, io.BytesIO(), max_retries=2)
+    self.assertEqual(session.get.call_count, 3)
+
+  @mock.patch('googleads.ad_manager._MIN_RANGE_PART_SIZE', 100)
+  def testDownloadReportToFile_parallelRanges(self):
+    data = bytes(range(256)) * 4
+    session = FakeRangeSession(data, drops={256: 50})
+    outfile = io.BytesIO(b'prefix')
+    outfile.seek(0, io.SEEK_END)
+
+    self._DownloadReport(session, outfile, max_connections=4, chunk_size=16)
+
+    self.assertEqual(outfile.getvalue(), b'prefix' + data)
+    self.assertEqual(outfile.tell(), len(b'prefix' + data))
+    self.assertEqual(session.ranges[0], 'bytes=0-0')
+    self.assertEqual(
+        sorted(session.ranges[1:]),
+        ['bytes=0-255', 'bytes=256-511', 'bytes=306-511', 'bytes=512-767',
+         'bytes=768-1023'])
+
+  @mock.patch('googleads.ad_manager._MIN_RANGE_PART_SIZE', 100)
+  def testDownloadReportToFile_parallelRangesNoTransferEncoding(self):
+    data = bytes(range(256)) * 4
+    adapter = FakeEncodingAdapter(data)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    self.report_service.getReportDownloadUrlWithOptions.return_value = (
+        'https://reports.example.com/report')
+    outfile = io.BytesIO()
+
+    with mock.patch.object(self.report_downloader, 'http_session', session):
+      self.report_downloader.DownloadReportToFile(
+          '123', 'CSV_DUMP', outfile, max_connections=4)
+
+    self.assertEqual(outfile.getvalue(), data)
+    self.assertEqual(len(adapter.requests), 5)
+    self.assertTrue(all(
+        request.headers['Accept-Encoding'] == 'identity'
+        and request.headers['Range'] for request in adapter.requests))
+
+  def testDownloadReportToFile_parallelWithoutRangeSupport(self):
+    data = b'report data' * 100
+    session = FakeRangeSession(data, supports_ranges=False)
+    outfile = io.BytesIO()
+
+    self._DownloadReport(session, outfile, max_connections=4)
+
+    self.assertEqual(outfile.getvalue(), data)
+    self.assertEqual(session.ranges, ['bytes=0-0'])
+
+  def testDownloadReportToFile_parallelEmptyReport(self):
+    outfile = io.BytesIO()
+
+    self._DownloadReport(FakeRangeSession(b''), outfile, max_connections=4)
+
+    self.assertEqual(outfile.getvalue(), b'')
+
+  def testDownloadReportToFile_parallelUnseekableFile(self):
+    data = b'report data'
+    session = FakeRangeSession(data)
+    outfile = mock.Mock(spec=['write'])
+
+    self._DownloadReport(session, outfile, max_connections=4)
+
+    outfile.write.assert_called_once_with(data)
+    self.assertEqual(session.ranges, [None])
+
+  def testDownloadReportToFile_adaptiveChunkSize(self):
+    data = b'x' * (10 * googleads.ad_manager._CHUNK_SIZE)
+    session = FakeRangeSession(data)
+    outfile = mock.Mock(spec=['write'])
+
+    self._DownloadReport(session, outfile, chunk_size=None)
+
+    chunk_sizes = [len(call[0][0]) for call in outfile.write.call_args_list]
+    self.assertEqual(sum(chunk_sizes), len(data))
+    self.assertEqual(chunk_sizes[:3], [googleads.ad_manager._CHUNK_SIZE,
+                                       2 * googleads.ad_manager._CHUNK_SIZE,
+                                       4 * googleads.ad_manager._CHUNK_SIZE])
+
+  def testStreamReportRows(self):
+    report = ('Dimension.DATE,Dimension.LINE_ITEM_ID,Dimension.LINE_ITEM_NAME,'
+              'Column.AD_SERVER_IMPRESSIONS,Column.AD_SERVER_CTR\n'
+              '2024-01-01,123,"Line, ""quoted""",1000,0.25\n'
+              '2024-01-02,456,"Multi\nline \u00e9",,N/A\n')
+    data = gzip.compress(report.encode('utf-8'))
+    session = FakeRangeSession(data, drops={0: len(data) // 2})
+
+    with mock.patch.object(self.report_downloader, 'http_session', session):
+      self.report_service.getReportDownloadUrlWithOptions.return_value = 'url'
+      rows = self.report_downloader.StreamReportRows('123', chunk_size=7)
+      self.assertEqual(list(rows), [
+          {'Dimension.DATE': '2024-01-01', 'Dimension.LINE_ITEM_ID': 123,
+           'Dimension.LINE_ITEM_NAME': 'Line, "quoted"',
+           'Column.AD_SERVER_IMPRESSIONS': 1000, 'Column.AD_SERVER_CTR': 0.25},
+          {'Dimension.DATE': '2024-01-02', 'Dimension.LINE_ITEM_ID': 456,
+           'Dimension.LINE_ITEM_NAME': 'Multi\nline \u00e9',
+           'Column.AD_SERVER_IMPRESSIONS': '', 'Column.AD_SERVER_CTR': 'N/A'}])
+
+    self.report_service.getReportDownloadUrlWithOptions.assert_called_once_with(
+        '123', {'exportFormat': 'CSV_DUMP', 'includeReportProperties': False,
+                'includeTotalsRow': False, 'useGzipCompression': True})
+    self.assertEqual(session.ranges, [None, 'bytes=%d-' % (len(data) // 2)])
+
+  def testStreamReportRows_tsvWithMultipleGzipMembers(self):
+    data = (gzip.compress(b'Dimension.AD_UNIT_ID\tColumn.CLICKS\n1\t2\n') +
+            gzip.compress(b'3\t4\n'))
+
+    with mock.patch.object(self.report_downloader, 'http_session',
+                           FakeRangeSession(data)):
+      rows = list(self.report_downloader.StreamReportRows('123', 'TSV'))
+
+    self.assertEqual(rows, [
+        {'Dimension.AD_UNIT_ID': 1, 'Column.CLICKS': 2},
+        {'Dimension.AD_UNIT_ID': 3, 'Column.CLICKS': 4}])
+
+  def testStreamReportRows_excludesTotalsRowByDefault(self):
+    report = b'Dimension.AD_UNIT_ID\tColumn.CLICKS\n1\t2\n3\t4\n'
+    sessions = {
+        'with totals': FakeRangeSession(gzip.compress(report + b'Total\t6\n')),
+        'without totals': FakeRangeSession(gzip.compress(report))}
+    session = mock.Mock()
+    session.get.side_effect = (
+        lambda url, *args, **kwargs: sessions[url].get(url, *args, **kwargs))
+    self.report_service.getReportDownloadUrlWithOptions.side_effect = (
+        lambda report_job_id, options: 'with totals'
+        if options['includeTotalsRow'] else 'without totals')
+
+    with mock.patch.object(self.report_downloader, 'http_session', session):
+      rows = list(self.report_downloader.StreamReportRows('123', 'TSV'))
+      rows_with_totals = list(self.report_downloader.StreamReportRows(
+          '123', 'TSV', include_totals_row=True))
+
+    self.assertEqual(rows[-1], {'Dimension.AD_UNIT_ID': 3, 'Column.CLICKS': 4})
+    self.assertEqual(rows_with_totals[-1],
+                     {'Dimension.AD_UNIT_ID': 'Total', 'Column.CLICKS': 6})
+
+  def testStreamReportRows_emptyReport(self):
+    with mock.patch.object(self.report_downloader, 'http_session',
+                           FakeRangeSession(gzip.compress(b''))):
+      self.assertEqual(list(self.report_downloader.StreamReportRows('1')), [])
+
+  def testStreamReportRows_truncated(self):
+    data = gzip.compress(b'Column.CLICKS\n' + b'1\n' * 1000)
+
+    with mock.patch.object(self.report_downloader, 'http_session',
+                           FakeRangeSession(data[:-20])):
+      rows = self.report_downloader.StreamReportRows('1')
+      self.assertRaises(googleads.errors.GoogleAdsError, list, rows)
+
+  def testStreamReportRows_raisesDownloadErrors(self):
+    session = mock.Mock()
+    session.get.return_value = FakeRangeResponse(b'', 403, {})
+
+    with mock.patch.object(self.report_downloader, 'http_session', session):
+      rows = self.report_downloader.StreamReportRows('1')
+      self.assertRaises(requests.exceptions.HTTPError, list, rows)
+
+  def testStreamReportRows_closedEarly(self):
+    data = gzip.compress(b'Column.CLICKS\n' + b''.join(
+        b'%d\n' % (i * 7919 % 100003) for i in range(100000)))
+    session = FakeRangeSession(data)
+
+    with mock.patch.object(self.report_downloader, 'http_session', session):
+      rows = self.report_downloader.StreamReportRows('1', chunk_size=16)
+      self.assertEqual(next(rows), {'Column.CLICKS': 0})
+      rows.close()
+
+    download_threads = [thread for thread in threading.enumerate()
+                        if thread is not threading.current_thread()
+                        and thread.daemon]
+    for thread in download_threads:
+      thread.join(1)
+    self.assertFalse(any(thread.is_alive() for thread in download_threads))
+
+  def testStreamReportRows_unsupportedFormat(self):
+    self.assertRaises(googleads.errors.GoogleAdsValueError,
+                      self.report_downloader.StreamReportRows, '1', 'XML')
+
+  def testDataDownloaderSharesClientHttpSession(self):
+    self.assertIs(
+        self.report_downloader.http_session, self.ad_manager.http_session)
+
+  def testUrlOpenerIsDeprecated(self):
+    self.ad_manager.custom_http_headers = {'X-My-Headers': 'abc'}
+    report_downloader = self.ad_manager.GetDataDownloader()
+
+    with warnings.catch_warnings(record=True) as caught:
+      warnings.simplefilter('always')
+      url_opener = report_downloader.url_opener
+
+    self.assertEqual(caught[0].category, DeprecationWarning)
+    self.assertIn(('X-My-Headers', 'abc'), url_opener.addheaders)
+    self.assertIs(report_downloader.url_opener, url_opener)
+
   def testGetReportService(self):
     self.report_downloader._ad_manager_client = mock.Mock()
     self.report_downloader._report_service = None
@@ -722,16 +2075,15 @@ class DataDownloaderTest(unittest.TestCase):
 
   def testDownloadHasCustomHeaders(self):
     self.ad_manager.custom_http_headers = {'X-My-Headers': 'abc'}
+    report_downloader = self.ad_manager.GetDataDownloader()
+    report_downloader._report_service = self.report_service
 
-    class MyOpener(object):
-      addheaders = [('a', 'b')]
-    opener = MyOpener()
-
-    with mock.patch('googleads.ad_manager.build_opener') as mock_build_opener:
-      mock_build_opener.return_value = opener
+    with mock.patch.object(report_downloader, 'http_session') as session:
+      session.get.return_value.raw.read.return_value = b''
+      report_downloader.DownloadReportToFile('123', 'CSV_DUMP', io.BytesIO())
 
-      self.ad_manager.GetDataDownloader()
-      self.assertEqual(opener.addheaders, [('a', 'b'), ('X-My-Headers', 'abc')])
+      self.assertEqual(session.get.call_args[1]['headers'],
+                       {'X-My-Headers': 'abc', 'Accept-Encoding': 'identity'})
 
 
 class StatementBuilderTest(testing.CleanUtilityRegistryTestCase):
@@ -935,6 +2287,53 @@ class StatementBuilderTest(testing.CleanUtilityRegistryTestCase):
         target_values
     )
 
+  def testKeysetPaginate(self):
+    test_statement = (googleads.ad_manager.StatementBuilder()
+                      .Where('status = :status')
+                      .WithBindVariable('status', 'READY')
+                      .Limit(10)
+                      .Offset(20))
+
+    keyset_call_result = test_statement.KeysetPaginate()
+
+    self.assertEqual(keyset_call_result, test_statement)
+    self.assertEqual(test_statement.ToStatement(),
+                     {'query': ('WHERE status = :status ORDER BY id ASC '
+                                'LIMIT 10'),
+                      'values': [{'key': 'status',
+                                  'value': {'xsi_type': 'TextValue',
+                                            'value': 'READY'}}]})
+
+    test_statement.last_key = 123
+    statement = test_statement.ToStatement()
+    self.assertEqual(statement['query'],
+                     'WHERE (status = :status) AND id > :__last_id '
+                     'ORDER BY id ASC LIMIT 10')
+    self.assertIn({'key': '__last_id',
+                   'value': {'xsi_type': 'NumberValue', 'value': 123}},
+                  statement['values'])
+    self.assertEqual(len(statement['values']), 2)
+
+  def testKeysetPaginate_noWhere(self):
+    test_statement = (googleads.ad_manager.StatementBuilder()
+                      .Select('Id')
+                      .From('Line_Item')
+                      .KeysetPaginate('Id'))
+    test_statement.last_key = 5
+
+    self.assertEqual(test_statement.ToStatement()['query'],
+                     'SELECT Id FROM Line_Item WHERE Id > :__last_id '
+                     'ORDER BY Id ASC LIMIT %s'
+                     % googleads.ad_manager.SUGGESTED_PAGE_LIMIT)
+
+  def testKeysetPaginate_conflictingOrderBy(self):
+    test_statement = (googleads.ad_manager.StatementBuilder()
+                      .OrderBy('name')
+                      .KeysetPaginate())
+
+    self.assertRaises(googleads.errors.GoogleAdsError,
+                      test_statement.ToStatement)
+
   def testBreakWithSetOfMultipleTypes(self):
     test_statement = googleads.ad_manager.StatementBuilder()
     test_statement.Where('key = :test_key')
@@ -1021,5 +2420,595 @@ class FilterStatementTest(testing.CleanUtilityRegistryTestCase):
                       'values': values})
 
 
+class AdaptivePageSizerTest(unittest.TestCase):
+  """Tests for the AdaptivePageSizer class."""
+
+  def setUp(self):
+    self.sizer = googleads.ad_manager.AdaptivePageSizer(
+        initial_page_size=500, min_page_size=100, max_page_size=2000,
+        target_latency_seconds=10, max_page_values=5000)
+
+  def testGrowsOnFastFullPages(self):
+    self.assertEqual(self.sizer.RecordPage(500, 500, 1), 1000)
+    self.assertEqual(self.sizer.RecordPage(1000, 1000, 1), 2000)
+    self.assertEqual(self.sizer.RecordPage(2000, 2000, 1), 2000)
+    self.assertEqual(self.sizer.page_size, 2000)
+
+  def testKeepsSizeOnShortOrModeratePages(self):
+    self.assertEqual(self.sizer.RecordPage(500, 20, 1), 500)
+    self.assertEqual(self.sizer.RecordPage(500, 500, 6), 500)
+
+  def testShrinksOnSlowPages(self):
+    self.assertEqual(self.sizer.RecordPage(500, 500, 11), 250)
+    self.assertEqual(self.sizer.RecordPage(250, 250, 20), 125)
+    self.assertEqual(self.sizer.RecordPage(125, 125, 20), 100)
+
+  def testShrinksOnLargePages(self):
+    self.assertEqual(self.sizer.RecordPage(500, 500, 1, 10000), 250)
+
+  def testRecordTimeout(self):
+    self.assertTrue(self.sizer.RecordTimeout())
+    self.assertTrue(self.sizer.RecordTimeout())
+    self.assertTrue(self.sizer.RecordTimeout())
+    self.assertEqual(self.sizer.page_size, 100)
+    self.assertFalse(self.sizer.RecordTimeout())
+
+  def testDoesNotGrowPastTimeout(self):
+    self.sizer.RecordPage(500, 500, 1)
+    self.sizer.RecordTimeout()
+
+    self.assertEqual(self.sizer.RecordPage(500, 500, 1), 500)
+
+  def testGetMetrics(self):
+    self.sizer.RecordPage(500, 500, 1)
+    self.sizer.RecordPage(1000, 1000, 3)
+    self.sizer.RecordTimeout()
+
+    self.assertEqual(self.sizer.GetMetrics(), {
+        'page_size': 1000, 'pages': 2, 'rows': 1500, 'timeouts': 1,
+        'increases': 2, 'decreases': 1, 'average_latency_seconds': 2.0})
+
+  def testInvalidArguments(self):
+    self.assertRaises(googleads.errors.GoogleAdsValueError,
+                      googleads.ad_manager.AdaptivePageSizer,
+                      initial_page_size=50, min_page_size=100)
+    self.assertRaises(googleads.errors.GoogleAdsValueError,
+                      googleads.ad_manager.AdaptivePageSizer, growth_factor=1)
+    self.assertRaises(googleads.errors.GoogleAdsValueError,
+                      googleads.ad_manager.AdaptivePageSizer, shrink_factor=1)
+
+
+class ReportCacheTest(unittest.TestCase):
+  """Tests for the ReportCache class."""
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.addCleanup(self.directory.cleanup)
+    self.report_job = {'reportQuery': {
+        'dimensions': ['DATE', 'AD_UNIT_NAME'],
+        'columns': ['AD_SERVER_IMPRESSIONS'],
+        'dateRangeType': 'LAST_WEEK'}}
+
+  def _Put(self, report_cache, key, data, report_job=None):
+    with report_cache.CreateTemporaryFile() as report_file:
+      report_file.write(data)
+    report_cache.Put(key, report_file.name, report_job or self.report_job)
+
+  def _Get(self, report_cache, key):
+    outfile = io.BytesIO()
+    return outfile.getvalue() if report_cache.CopyTo(key, outfile) else None
+
+  def testGetKey(self):
+    report_cache = googleads.ad_manager.ReportCache(self.directory.name)
+    key = report_cache.GetKey(self.report_job, '1234', 'v202605', 'CSV_DUMP')
+    reordered = {'id': '99', 'reportQuery': {
+        'dateRangeType': 'LAST_WEEK',
+        'columns': ['AD_SERVER_IMPRESSIONS'],
+        'dimensions': ['DATE', 'AD_UNIT_NAME']}}
+
+    self.assertEqual(
+        report_cache.GetKey(reordered, '1234', 'v202605', 'CSV_DUMP'), key)
+    self.assertNotEqual(
+        report_cache.GetKey(self.report_job, '5678', 'v202605', 'CSV_DUMP'),
+        key)
+    self.assertNotEqual(
+        report_cache.GetKey(self.report_job, '1234', 'v202605', 'TSV'), key)
+    self.assertNotEqual(
+        report_cache.GetKey(self.report_job, '1234', 'v202605', 'CSV_DUMP',
+                            include_totals_row=True), key)
+    swapped = {'reportQuery': dict(self.report_job['reportQuery'],
+                                   dimensions=['AD_UNIT_NAME', 'DATE'])}
+    self.assertNotEqual(
+        report_cache.GetKey(swapped, '1234', 'v202605', 'CSV_DUMP'), key)
+
+  def testGetKey_soapReportJob(self):
+    report_cache = googleads.ad_manager.ReportCache(self.directory.name)
+    client = zeep.Client(os.path.join(
+        os.path.dirname(__file__), 'test_data',
+        'ad_manager_report_service.xml'))
+    report_job = client.get_type('ns0:ReportJob')(
+        id=99, reportQuery=client.get_type('ns0:ReportQuery')(
+            **self.report_job['reportQuery']))
+
+    self.assertIsNone(report_job.reportQuery.statement)
+    self.assertEqual(report_job.reportQuery.customFieldIds, [])
+    self.assertEqual(
+        report_cache.GetKey(report_job, '1234', 'v202605', 'CSV_DUMP'),
+        report_cache.GetKey(self.report_job, '1234', 'v202605', 'CSV_DUMP'))
+
+  def testIsMutable(self):
+    report_cache = googleads.ad_manager.ReportCache(self.directory.name)
+    # It is still January 1st in UTC-12, so December 31st may still change.
+    utc_now = datetime.datetime(2024, 1, 2, 3, tzinfo=pytz.utc)
+
+    with mock.patch('datetime.datetime', FixedNow(utc_now)):
+      self.assertTrue(report_cache.IsMutable(datetime.date(2024, 1, 3)))
+      self.assertTrue(report_cache.IsMutable(datetime.date(2023, 12, 31)))
+      self.assertFalse(report_cache.IsMutable(datetime.date(2023, 12, 30)))
+
+  def testPutAndCopyTo(self):
+    report_cache = googleads.ad_manager.ReportCache(self.directory.name)
+    self.assertIsNone(self._Get(report_cache, 'key'))
+
+    self._Put(report_cache, 'key', b'report data')
+
+    self.assertEqual(self._Get(report_cache, 'key'), b'report data')
+    self.assertEqual(sorted(os.listdir(self.directory.name)),
+                     ['key.json', 'key.report'])
+
+  def testCopyTo_expired(self):
+    report_cache = googleads.ad_manager.ReportCache(self.directory.name,
+                                                    ttl_seconds=60)
+    self._Put(report_cache, 'key', b'report data')
+
+    with mock.patch('time.time', return_value=time.time() + 61):
+      self.assertIsNone(self._Get(report_cache, 'key'))
+    self.assertEqual(os.listdir(self.directory.name), [])
+
+  def testCopyTo_pastDateRangeDoesNotExpire(self):
+    report_cache = googleads.ad_manager.ReportCache(self.directory.name,
+                                                    ttl_seconds=60)
+    past_report_job = {'reportQuery': {
+        'dateRangeType': 'CUSTOM_DATE',
+        'startDate': {'year': 2020, 'month': 1, 'day': 1},
+        'endDate': {'year': 2020, 'month': 1, 'day': 31}}}
+    recent_report_job = {'reportQuery': {
+        'dateRangeType': 'CUSTOM_DATE',
+        'startDate': datetime.date(2020, 1, 1),
+        'endDate': datetime.date.today()}}
+    self._Put(report_cache, 'past', b'past', past_report_job)
+    self._Put(report_cache, 'recent', b'recent', recent_report_job)
+
+    with mock.patch('time.time', return_value=time.time() + 61):
+      self.assertEqual(self._Get(report_cache, 'past'), b'past')
+      self.assertIsNone(self._Get(report_cache, 'recent'))
+
+  def testPut_evictsLeastRecentlyUsed(self):
+    report_cache = googleads.ad_manager.ReportCache(self.directory.name,
+                                                    max_size_bytes=25)
+    self._Put(report_cache, 'a', b'a' * 10)
+    self._Put(report_cache, 'b', b'b' * 10)
+    os.utime(os.path.join(self.directory.name, 'a.report'), (0, 0))
+    os.utime(os.path.join(self.directory.name, 'b.report'), (1, 1))
+    # Reading a makes b the least recently used report.
+    self._Get(report_cache, 'a')
+
+    self._Put(report_cache, 'c', b'c' * 10)
+
+    self.assertEqual(self._Get(report_cache, 'a'), b'a' * 10)
+    self.assertIsNone(self._Get(report_cache, 'b'))
+    self.assertEqual(self._Get(report_cache, 'c'), b'c' * 10)
+
+
+class BackoffReportPollingStrategyTest(unittest.TestCase):
+  """Tests for the BackoffReportPollingStrategy class."""
+
+  def testGetPollSeconds(self):
+    polling_strategy = googleads.ad_manager.BackoffReportPollingStrategy(
+        initial_poll_seconds=5, max_poll_seconds=60, jitter_fraction=0)
+    self.assertEqual(
+        [polling_strategy.GetPollSeconds({}, poll_count)
+         for poll_count in range(1, 7)], [5, 10, 20, 40, 60, 60])
+    self.assertEqual(polling_strategy.GetPollSeconds({}, 10000), 60)
+
+  def testGetPollSeconds_jitter(self):
+    polling_strategy = googleads.ad_manager.BackoffReportPollingStrategy(
+        initial_poll_seconds=10, jitter_fraction=0.2)
+    for _ in range(100):
+      self.assertTrue(8 <= polling_strategy.GetPollSeconds({}, 1) <= 12)
+
+  def testInvalidArguments(self):
+    for kwargs in ({'initial_poll_seconds': 0},
+                   {'initial_poll_seconds': 10, 'max_poll_seconds': 5},
+                   {'backoff_factor': 0.5},
+                   {'jitter_fraction': 1}):
+      self.assertRaises(
+          googleads.errors.GoogleAdsValueError,
+          googleads.ad_manager.BackoffReportPollingStrategy, **kwargs)
+
+
+class StatementPagerTest(testing.CleanUtilityRegistryTestCase):
+  """Tests for the StatementPager class."""
+
+  def setUp(self):
+    self.lock = threading.Lock()
+    self.requested_offsets = []
+    self.in_flight = 0
+    self.max_in_flight = 0
+
+  def _CreateMethod(self, total_result_set_size, delays=None):
+    delays = delays or {}
+
+    def GetByStatement(statement):
+      offset = int(statement['query'].split('OFFSET ')[1])
+      limit = int(statement['query'].split('LIMIT ')[1].split()[0])
+      with self.lock:
+        self.requested_offsets.append(offset)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+      time.sleep(delays.get(offset, 0.001))
+      with self.lock:
+        self.in_flight -= 1
+      return {'totalResultSetSize': total_result_set_size,
+              'startIndex': offset,
+              'results': list(range(
+                  offset, min(offset + limit, total_result_set_size)))}
+
+    return GetByStatement
+
+  def testGetPages_ordered(self):
+    statement = googleads.ad_manager.StatementBuilder(limit=10)
+    pager = googleads.ad_manager.StatementPager(
+        self._CreateMethod(95, {10: 0.05}), statement, max_pages_in_flight=3)
+
+    pages = list(pager.GetPages())
+
+    self.assertEqual([page['startIndex'] for page in pages],
+                     list(range(0, 95, 10)))
+    self.assertEqual([r for page in pages for r in page['results']],
+                     list(range(95)))
+    self.assertLessEqual(self.max_in_flight, 3)
+    self.assertEqual(statement.offset, 0)
+
+  def testGetPages_unordered(self):
+    statement = googleads.ad_manager.StatementBuilder(limit=10)
+    pager = googleads.ad_manager.StatementPager(
+        self._CreateMethod(50, {10: 0.1}), statement, max_pages_in_flight=4)
+
+    pages = list(pager.GetPages(ordered=False))
+
+    start_indexes = [page['startIndex'] for page in pages]
+    self.assertEqual(sorted(start_indexes), [0, 10, 20, 30, 40])
+    self.assertNotEqual(start_indexes[1], 10)
+
+  def testGetPages_startsAtOffset(self):
+    statement = googleads.ad_manager.FilterStatement(limit=10, offset=20)
+    pager = googleads.ad_manager.StatementPager(
+        self._CreateMethod(45), statement)
+
+    pages = list(pager.GetPages())
+
+    self.assertEqual([page['startIndex'] for page in pages], [20, 30, 40])
+
+  def testGetPages_singlePage(self):
+    statement = googleads.ad_manager.StatementBuilder(limit=10)
+    pager = googleads.ad_manager.StatementPager(
+        self._CreateMethod(0), statement)
+
+    pages = list(pager.GetPages())
+
+    self.assertEqual(len(pages), 1)
+    self.assertEqual(self.requested_offsets, [0])
+
+  def testGetPages_stopsEarly(self):
+    statement = googleads.ad_manager.StatementBuilder(limit=10)
+    pager = googleads.ad_manager.StatementPager(
+        self._CreateMethod(1000), statement, max_pages_in_flight=2)
+
+    pages = pager.GetPages()
+    next(pages)
+    next(pages)
+    pages.close()
+
+    self.assertLessEqual(len(self.requested_offsets), 4)
+
+  def testGetPages_raisesError(self):
+    def GetByStatement(statement):
+      if 'OFFSET 10' in statement['query']:
+        raise googleads.errors.GoogleAdsServerFault(None)
+      return {'totalResultSetSize': 30, 'startIndex': 0, 'results': []}
+
+    pager = googleads.ad_manager.StatementPager(
+        GetByStatement, googleads.ad_manager.StatementBuilder(limit=10))
+
+    with self.assertRaises(googleads.errors.GoogleAdsServerFault):
+      list(pager.GetPages())
+
+  def testGetPages_prefetchesDuringFirstPage(self):
+    statement = googleads.ad_manager.StatementBuilder(limit=10)
+    pager = googleads.ad_manager.StatementPager(
+        self._CreateMethod(30), statement, max_pages_in_flight=2)
+
+    pages = pager.GetPages()
+    next(pages)
+    time.sleep(0.05)
+
+    self.assertEqual(sorted(self.requested_offsets), [0, 10, 20])
+    pages.close()
+
+  def testGetEntities(self):
+    pager = googleads.ad_manager.StatementPager(
+        self._CreateMethod(25), googleads.ad_manager.StatementBuilder(limit=10))
+
+    self.assertEqual(list(pager.GetEntities()), list(range(25)))
+
+  def testGetEntities_noResults(self):
+    method = mock.Mock(return_value={'totalResultSetSize': 0})
+    pager = googleads.ad_manager.StatementPager(
+        method, googleads.ad_manager.StatementBuilder())
+
+    self.assertEqual(list(pager.GetEntities()), [])
+
+  def testIterateByStatement(self):
+    statement = googleads.ad_manager.StatementBuilder(limit=10)
+
+    entities = googleads.ad_manager.IterateByStatement(
+        self._CreateMethod(35), statement, max_pages_in_flight=1)
+
+    self.assertEqual(next(entities), 0)
+    self.assertLessEqual(len(self.requested_offsets), 2)
+    self.assertEqual(list(entities), list(range(1, 35)))
+    self.assertEqual(self.max_in_flight, 1)
+    self.assertIn('StatementPager', googleads.common._utility_registry)
+
+  def testGetPages_keyset(self):
+    pages = [
+        {'totalResultSetSize': 5, 'results': [{'id': 1}, {'id': 4}]},
+        {'totalResultSetSize': 3, 'results': [{'id': 7}, {'id': 9}]},
+        {'totalResultSetSize': 1, 'results': [{'id': 12}]},
+    ]
+    statements = []
+
+    def GetByStatement(statement):
+      statements.append(statement)
+      return pages[len(statements) - 1]
+
+    statement = googleads.ad_manager.StatementBuilder(limit=2).KeysetPaginate()
+    pager = googleads.ad_manager.StatementPager(GetByStatement, statement)
+
+    entities = list(pager.GetEntities())
+
+    self.assertEqual([entity['id'] for entity in entities], [1, 4, 7, 9, 12])
+    self.assertEqual([s['query'] for s in statements],
+                     ['ORDER BY id ASC LIMIT 2',
+                      'WHERE id > :__last_id ORDER BY id ASC LIMIT 2',
+                      'WHERE id > :__last_id ORDER BY id ASC LIMIT 2'])
+    self.assertEqual(
+        [s['values'][0]['value']['value'] for s in statements[1:]], [4, 9])
+    self.assertIsNone(statement.last_key)
+
+  def testGetEntities_keysetStreamedPages(self):
+    ids = [1, 4, 7, 9, 12, 15, 20]
+    parsed = []
+    statements = []
+
+    def Parse(results):
+      for result in results:
+        parsed.append(result['id'])
+        yield result
+
+    def GetByStatement(statement):
+      statements.append(statement)
+      last_id = (statement['values'][0]['value']['value']
+                 if statement['values'] else 0)
+      results = [{'id': i} for i in ids if i > last_id][:3]
+      return googleads.common.StreamedPage(
+          Parse(results),
+          {'rval': {'totalResultSetSize': len(results), 'results': []}})
+
+    statement = googleads.ad_manager.StatementBuilder(limit=3).KeysetPaginate(
+        'id')
+    pager = googleads.ad_manager.StatementPager(GetByStatement, statement)
+
+    entities = pager.GetEntities()
+
+    self.assertEqual(next(entities), {'id': 1})
+    self.assertEqual(len(statements), 1)
+    self.assertEqual([entity['id'] for entity in entities], ids[1:])
+    self.assertEqual(parsed, ids)
+    self.assertEqual(
+        [s['values'][0]['value']['value'] for s in statements[1:]], [7, 15])
+
+  def testGetPages_streamedPagesNotConsumed(self):
+    def GetByStatement(statement):
+      offset = int(statement['query'].split('OFFSET ')[1])
+      results = [{'id': i} for i in range(offset, min(offset + 10, 25))]
+      return googleads.common.StreamedPage(
+          iter(results), {'rval': {'startIndex': offset, 'results': []}})
+
+    page_sizer = googleads.ad_manager.AdaptivePageSizer(
+        initial_page_size=10, min_page_size=10, max_page_size=10)
+    pager = googleads.ad_manager.StatementPager(
+        GetByStatement, googleads.ad_manager.StatementBuilder(),
+        page_sizer=page_sizer)
+
+    self.assertEqual([page['startIndex'] for page in pager.GetPages()],
+                     [0, 10, 20])
+    self.assertEqual(page_sizer.GetMetrics()['rows'], 25)
+
+  def testGetPages_pageSizer(self):
+    page_sizer = googleads.ad_manager.AdaptivePageSizer(
+        initial_page_size=10, min_page_size=5, max_page_size=40)
+    statement = googleads.ad_manager.StatementBuilder(limit=10)
+    pager = googleads.ad_manager.StatementPager(
+        self._CreateMethod(100), statement, page_sizer=page_sizer)
+
+    entities = list(pager.GetEntities())
+
+    self.assertEqual(entities, list(range(100)))
+    self.assertEqual(self.requested_offsets, [0, 10, 30, 70])
+    self.assertEqual(statement.limit, 10)
+
+  def testGetPages_pageSizerRetriesTimeouts(self):
+    page_sizer = googleads.ad_manager.AdaptivePageSizer(
+        initial_page_size=20, min_page_size=5, max_page_size=20)
+    limits = []
+
+    def GetByStatement(statement):
+      limit = int(statement['query'].split('LIMIT ')[1].split()[0])
+      limits.append(limit)
+      if limit > 10:
+        raise requests.exceptions.ReadTimeout()
+      offset = int(statement['query'].split('OFFSET ')[1])
+      return {'totalResultSetSize': 15,
+              'results': list(range(offset, min(offset + limit, 15)))}
+
+    pager = googleads.ad_manager.StatementPager(
+        GetByStatement, googleads.ad_manager.StatementBuilder(),
+        page_sizer=page_sizer)
+
+    self.assertEqual(list(pager.GetEntities()), list(range(15)))
+    self.assertEqual(limits, [20, 10, 10])
+    self.assertEqual(page_sizer.GetMetrics()['timeouts'], 1)
+
+  def testInvalidMaxPagesInFlight(self):
+    self.assertRaises(
+        googleads.errors.GoogleAdsValueError,
+        googleads.ad_manager.StatementPager, mock.Mock(),
+        googleads.ad_manager.StatementBuilder(), max_pages_in_flight=0)
+
+
+
+class BatchMutatorTest(testing.CleanUtilityRegistryTestCase):
+  """Tests for the BatchMutator class."""
+
+  def setUp(self):
+    self.lock = threading.Lock()
+    self.batches = []
+    self.in_flight = 0
+    self.max_in_flight = 0
+    self.service = mock.Mock()
+    self.service.updateLineItems.side_effect = self._UpdateLineItems
+
+  def _UpdateLineItems(self, line_items):
+    with self.lock:
+      self.batches.append([line_item['id'] for line_item in line_items])
+      self.in_flight += 1
+      self.max_in_flight = max(self.max_in_flight, self.in_flight)
+    time.sleep(0.001)
+    with self.lock:
+      self.in_flight -= 1
+    if any(line_item['id'] < 0 for line_item in line_items):
+      raise googleads.errors.GoogleAdsServerFault(None, message='invalid')
+    return [dict(line_item, version=2) for line_item in line_items]
+
+  def testMutate(self):
+    batch_mutator = googleads.ad_manager.BatchMutator(
+        self.service, 'updateLineItems', batch_size=10,
+        max_batches_in_flight=3)
+
+    results = list(batch_mutator.Mutate({'id': i} for i in range(95)))
+
+    self.assertEqual([result.result for result in results],
+                     [{'id': i, 'version': 2} for i in range(95)])
+    self.assertTrue(all(result.succeeded for result in results))
+    self.assertEqual(sorted(self.batches),
+                     sorted([list(range(i, min(i + 10, 95)))
+                             for i in range(0, 95, 10)]))
+    self.assertLessEqual(self.max_in_flight, 3)
+    self.assertIn('BatchMutator', googleads.common._utility_registry)
+
+  def testMutate_bisectsFailingBatch(self):
+    batch_mutator = googleads.ad_manager.BatchMutator(
+        self.service, 'updateLineItems', batch_size=8)
+    entities = [{'id': i} for i in range(8)]
+    entities[5]['id'] = -5
+
+    results = list(batch_mutator.Mutate(entities))
+
+    self.assertEqual([result.succeeded for result in results],
+                     [True] * 5 + [False] + [True] * 2)
+    self.assertIs(results[5].entity, entities[5])
+    self.assertIsInstance(results[5].error,
+                          googleads.errors.GoogleAdsServerFault)
+    self.assertEqual(results[6].result, {'id': 6, 'version': 2})
+    self.assertEqual(self.batches, [[0, 1, 2, 3, 4, -5, 6, 7],
+                                    [0, 1, 2, 3], [4, -5, 6, 7], [4, -5],
+                                    [4], [-5], [6, 7]])
+
+  def testMutate_noBisection(self):
+    batch_mutator = googleads.ad_manager.BatchMutator(
+        self.service, 'updateLineItems', batch_size=4, bisect_failures=False)
+
+    results = list(batch_mutator.Mutate(
+        [{'id': 0}, {'id': -1}, {'id': 2}, {'id': 3}, {'id': 4}]))
+
+    self.assertEqual([result.succeeded for result in results],
+                     [False] * 4 + [True])
+    self.assertEqual(len(self.batches), 2)
+
+  def testMutate_otherErrorsAreNotBisected(self):
+    self.service.updateLineItems.side_effect = ValueError('bad credentials')
+    batch_mutator = googleads.ad_manager.BatchMutator(
+        self.service, 'updateLineItems', batch_size=4)
+
+    results = list(batch_mutator.Mutate([{'id': i} for i in range(4)]))
+
+    self.assertEqual(self.service.updateLineItems.call_count, 1)
+    self.assertTrue(all(isinstance(result.error, ValueError)
+                        for result in results))
+
+  def testMutate_timedOutCreatesAreNotResent(self):
+    self.service.createLineItems.side_effect = (
+        requests.exceptions.ReadTimeout())
+    batch_mutator = googleads.ad_manager.BatchMutator(
+        self.service, 'createLineItems', batch_size=4)
+
+    results = list(batch_mutator.Mutate([{'id': i} for i in range(4)]))
+
+    self.assertEqual(self.service.createLineItems.call_count, 1)
+    self.assertTrue(all(isinstance(result.error, requests.exceptions.Timeout)
+                        for result in results))
+
+  def testMutate_bisectsTimeoutsWhenEnabled(self):
+    def UpdateLineItems(line_items):
+      self.batches.append([line_item['id'] for line_item in line_items])
+      if len(line_items) > 2:
+        raise requests.exceptions.ReadTimeout()
+      return line_items
+
+    self.service.updateLineItems.side_effect = UpdateLineItems
+    batch_mutator = googleads.ad_manager.BatchMutator(
+        self.service, 'updateLineItems', batch_size=4, bisect_timeouts=True)
+
+    results = list(batch_mutator.Mutate([{'id': i} for i in range(4)]))
+
+    self.assertTrue(all(result.succeeded for result in results))
+    self.assertEqual(self.batches, [[0, 1, 2, 3], [0, 1], [2, 3]])
+
+  def testMutate_readsEntitiesLazily(self):
+    read = []
+
+    def Entities():
+      for i in range(100):
+        read.append(i)
+        yield {'id': i}
+
+    batch_mutator = googleads.ad_manager.BatchMutator(
+        self.service, 'updateLineItems', batch_size=10,
+        max_batches_in_flight=2)
+    results = batch_mutator.Mutate(Entities())
+
+    self.assertEqual(next(results).result, {'id': 0, 'version': 2})
+    self.assertLessEqual(len(read), 30)
+    results.close()
+
+  def testInvalidArguments(self):
+    for kwargs in ({'batch_size': 0}, {'max_batches_in_flight': 0}):
+      self.assertRaises(
+          googleads.errors.GoogleAdsValueError,
+          googleads.ad_manager.BatchMutator, self.service, 'updateLineItems',
+          **kwargs)
+
 if __name__ == '__main__':
   unittest.main()
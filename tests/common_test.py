@@ -15,9 +15,12 @@
 """Unit tests to cover the common module."""
 
 
+import asyncio
 from contextlib import contextmanager
+import logging
 import numbers
 import os
+import shutil
 import ssl
 import tempfile
 import unittest
@@ -25,9 +28,17 @@ from unittest import mock
 import warnings
 
 from pyfakefs import fake_filesystem_unittest
+import httpx
+import lxml.etree
+import requests
+import requests.adapters
 import requests.exceptions
 import yaml
 import zeep.cache
+import zeep.helpers
+import zeep.transports
+import zeep.wsdl
+import zeep.wsdl.utils
 
 import googleads.common
 import googleads.errors
@@ -713,7 +724,8 @@ class ZeepServiceProxyTest(unittest.TestCase):
       zeep_auth.assert_called_once_with(header_handler)
       plugins = [zeep_auth.return_value, zeep_logger.return_value]
       transport = zeep_transport.return_value
-      zeep_transport.assert_called_once_with('timeout', 'proxy', cache)
+      zeep_transport.assert_called_once_with(
+          'timeout', 'proxy', cache, session=None)
       mock_client.assert_called_once_with(
           'http://abc', transport=transport, plugins=plugins)
       self.assertEqual(zeep_wrapper.zeep_client, mock_client.return_value)
@@ -821,7 +833,22 @@ class ZeepServiceProxyTest(unittest.TestCase):
 
       zeep_transport.assert_called_once_with(
           self.timeout_100, self.empty_proxy_config,
-          googleads.common.ZeepServiceProxy.NO_CACHE)
+          googleads.common.ZeepServiceProxy.NO_CACHE, session=None)
+
+  def testUsesSharedHttpSession(self):
+    session = googleads.common.ProxyConfig().BuildSession()
+
+    with mock_zeep_client() as mock_client:
+      googleads.common.ZeepServiceProxy(
+          'http://abc', mock.Mock(), mock.Mock(), self.empty_proxy_config,
+          self.timeout_100, self.fake_version,
+          cache=googleads.common.ZeepServiceProxy.NO_CACHE,
+          http_session=session)
+
+      transport = mock_client.call_args[1]['transport']
+      self.assertIs(transport.session, session)
+      self.assertEqual(session.headers['User-Agent'],
+                       requests.utils.default_user_agent())
 
   def testFaultWithErrors(self):
     detail = mock.Mock()
@@ -962,6 +989,89 @@ class TestZeepArgumentPacking(unittest.TestCase):
     result = zeep_client._PackArgumentsHelper(element, data, False)
     self.assertEqual(result.id, '2840')
 
+  def testPackArgumentsMatchesZeepConstruction(self):
+    data = {
+        'reportQuery': {
+            'columns': ['AD_SERVER_IMPRESSIONS'],
+            'dateRangeType': 'CUSTOM_DATE',
+            'startDate': {'year': 2017, 'month': 1, 'day': 2},
+            'dimensions': ['DATE'],
+            'statement': {
+                'query': 'WHERE ID = :id',
+                'values': [{
+                    'key': 'id',
+                    'value': {'value': 1, 'xsi_type': 'NumberValue'}}]}}}
+
+    result = self.zeep_client._PackArguments('runReportJob', [data])
+    with mock.patch.object(googleads.common._PackingPlan, '_CanCreateDirectly',
+                           return_value=False):
+      expected = self.zeep_client._PackArguments('runReportJob', [data])
+
+    self.assertEqual(result, expected)
+    self.assertEqual(result[0].reportQuery.endDate, None)
+    self.assertEqual(result[0].reportQuery.dimensionAttributes, [])
+    report_job_type = self.zeep_client.zeep_client.get_type('ns0:ReportJob')
+    rendered = []
+    for report_job in (result[0], expected[0]):
+      node = lxml.etree.Element('reportJob')
+      report_job_type.render(node, report_job)
+      rendered.append(lxml.etree.tostring(node))
+    self.assertEqual(rendered[0], rendered[1])
+    # Lists of defaults aren't shared between objects.
+    result[0].reportQuery.dimensionAttributes.append('x')
+    self.assertEqual(expected[0].reportQuery.dimensionAttributes, [])
+    self.assertEqual(self.zeep_client._PackArguments('runReportJob', [data])[0]
+                     .reportQuery.dimensionAttributes, [])
+
+  def testPackArgumentsMemoizesPlans(self):
+    data = {'reportQuery': {'dimensions': ['DATE']}}
+    with mock.patch.object(
+        self.zeep_client.zeep_client, 'get_element',
+        wraps=self.zeep_client.zeep_client.get_element) as get_element:
+      self.zeep_client._PackArguments('runReportJob', [data])
+      plans = dict(self.zeep_client._packing_plans)
+      self.zeep_client._PackArguments('runReportJob', [data])
+
+    get_element.assert_called_once()
+    self.assertEqual(self.zeep_client._packing_plans, plans)
+
+  def testPackingPlanLeavesUnknownElementsToZeep(self):
+    plan = googleads.common._PackingPlan(
+        self.zeep_client.zeep_client.get_type('ns0:Date'))
+    with self.assertRaises(TypeError):
+      plan.Create({'year': 2017, 'era': 'AD'})
+
+  def testDiscoverElementTypeFromLocalnameUsesIndex(self):
+    number_type = self.zeep_client.zeep_client.get_type('ns0:NumberValue')
+    with mock.patch.object(self.zeep_client.zeep_client, 'get_type',
+                           side_effect=AssertionError) as get_type:
+      self.assertIs(
+          self.zeep_client._DiscoverElementTypeFromLocalname('NumberValue'),
+          number_type)
+      self.assertIs(
+          self.zeep_client._DiscoverElementTypeFromLocalname('NumberValue'),
+          number_type)
+    get_type.assert_not_called()
+
+  def testDiscoverElementTypeFromLocalnameMatchesSearch(self):
+    wsdl_path = os.path.join(
+        TEST_DIR, 'test_data/traffic_estimator_service.xml')
+    service = googleads.common.ZeepServiceProxy(
+        wsdl_path, mock.Mock(), None, googleads.common.ProxyConfig(), 100,
+        self.fake_version)
+    schema = service.zeep_client.wsdl.types
+
+    for elem_type in schema.types:
+      qname = elem_type.qname
+      if qname is None:
+        continue
+      self.assertIs(service._DiscoverElementTypeFromLocalname(qname.localname),
+                    service.zeep_client.get_type(qname))
+    # Types outside the index are still found by searching.
+    self.assertEqual(
+        service._DiscoverElementTypeFromLocalname('string').qname.localname,
+        'string')
+
   def testPackArgumentsBadType(self):
     element = self.zeep_client.zeep_client.get_type('ns0:Image')
     data = {'xsi_type': 'nope'}
@@ -969,6 +1079,569 @@ class TestZeepArgumentPacking(unittest.TestCase):
       self.zeep_client._PackArgumentsHelper(element, data, False)
 
 
+class WsdlDocumentCacheTest(unittest.TestCase):
+  """Tests for the process-wide cache of parsed WSDL documents."""
+
+  def setUp(self):
+    self.wsdl_path = os.path.join(
+        TEST_DIR, 'test_data/ad_manager_report_service.xml')
+    googleads.common.InvalidateWsdlDocumentCache()
+
+  def tearDown(self):
+    googleads.common.SetWsdlDocumentCacheSize(
+        googleads.common._DEFAULT_WSDL_DOCUMENT_CACHE_SIZE)
+    googleads.common.InvalidateWsdlDocumentCache()
+
+  @unittest.skipUnless(googleads.common._ZEEP_CLIENT_ACCEPTS_DOCUMENT,
+                       'zeep.Client accepts parsed documents since zeep 4.2.0')
+  def testServiceProxiesShareParsedDocument(self):
+    first = googleads.common.ZeepServiceProxy(
+        self.wsdl_path, mock.Mock(), None, googleads.common.ProxyConfig(), 100,
+        'v1')
+    second = googleads.common.ZeepServiceProxy(
+        self.wsdl_path, mock.Mock(), None, googleads.common.ProxyConfig(), 100,
+        'v1')
+
+    self.assertIs(first.zeep_client.wsdl, second.zeep_client.wsdl)
+    self.assertIsNot(first.zeep_client, second.zeep_client)
+
+  def testServiceProxiesDoNotShareDocumentWhenDisabled(self):
+    googleads.common.SetWsdlDocumentCacheSize(0)
+    first = googleads.common.ZeepServiceProxy(
+        self.wsdl_path, mock.Mock(), None, googleads.common.ProxyConfig(), 100,
+        'v1')
+    second = googleads.common.ZeepServiceProxy(
+        self.wsdl_path, mock.Mock(), None, googleads.common.ProxyConfig(), 100,
+        'v1')
+
+    self.assertIsNot(first.zeep_client.wsdl, second.zeep_client.wsdl)
+
+  def testInvalidateByVersion(self):
+    googleads.common._wsdl_document_cache.Set(('http://a', 'v1'), 'a1')
+    googleads.common._wsdl_document_cache.Set(('http://a', 'v2'), 'a2')
+    googleads.common.InvalidateWsdlDocumentCache(version='v1')
+
+    self.assertNotIn(('http://a', 'v1'), googleads.common._wsdl_document_cache)
+    self.assertIn(('http://a', 'v2'), googleads.common._wsdl_document_cache)
+
+  def testServiceProxiesDoNotShareDocumentAfterInvalidation(self):
+    first = googleads.common.ZeepServiceProxy(
+        self.wsdl_path, mock.Mock(), None, googleads.common.ProxyConfig(), 100,
+        'v1')
+    googleads.common.InvalidateWsdlDocumentCache(self.wsdl_path)
+    second = googleads.common.ZeepServiceProxy(
+        self.wsdl_path, mock.Mock(), None, googleads.common.ProxyConfig(), 100,
+        'v1')
+
+    self.assertIsNot(first.zeep_client.wsdl, second.zeep_client.wsdl)
+
+
+class WsdlDocumentSnapshotTest(unittest.TestCase):
+  """Tests for saving and loading parsed WSDL document snapshots."""
+
+  def setUp(self):
+    self.wsdl_path = os.path.join(
+        TEST_DIR, 'test_data/ad_manager_report_service.xml')
+    self.snapshot_dir = tempfile.mkdtemp()
+    self.snapshot_path = os.path.join(
+        self.snapshot_dir, 'v1', 'ReportService.pickle')
+    googleads.common.InvalidateWsdlDocumentCache()
+
+  def tearDown(self):
+    shutil.rmtree(self.snapshot_dir)
+    googleads.common.InvalidateWsdlDocumentCache()
+
+  def CreateServiceProxy(self):
+    return googleads.common.ZeepServiceProxy(
+        self.wsdl_path, mock.Mock(), None, googleads.common.ProxyConfig(), 100,
+        'v1')
+
+  @unittest.skipUnless(googleads.common._ZEEP_CLIENT_ACCEPTS_DOCUMENT,
+                       'zeep.Client accepts parsed documents since zeep 4.2.0')
+  def testSaveAndLoadSnapshot(self):
+    original = self.CreateServiceProxy()
+    googleads.common.SaveWsdlDocumentSnapshot(
+        original.zeep_client.wsdl, self.snapshot_path)
+    googleads.common.InvalidateWsdlDocumentCache()
+
+    document = googleads.common.LoadWsdlDocumentSnapshot(
+        self.wsdl_path, 'v1', self.snapshot_path)
+    self.assertIsInstance(document, zeep.wsdl.Document)
+    self.assertIsNot(document, original.zeep_client.wsdl)
+
+    service = self.CreateServiceProxy()
+    self.assertIs(service.zeep_client.wsdl, document)
+    result = service._PackArguments(
+        'getReportDownloadUrlWithOptions', [123, {'exportFormat': 'CSV'}])
+    self.assertEqual(result[1].exportFormat, 'CSV')
+    self.assertTrue(service._WsdlHasMethod('runReportJob'))
+
+  @unittest.skipUnless(googleads.common._ZEEP_CLIENT_ACCEPTS_DOCUMENT,
+                       'zeep.Client accepts parsed documents since zeep 4.2.0')
+  def testLoadPrefersCachedDocument(self):
+    document = self.CreateServiceProxy().zeep_client.wsdl
+    self.assertIs(document, googleads.common.LoadWsdlDocumentSnapshot(
+        self.wsdl_path, 'v1', self.snapshot_path))
+
+  def testLoadMissingSnapshot(self):
+    self.assertIsNone(googleads.common.LoadWsdlDocumentSnapshot(
+        self.wsdl_path, 'v1', self.snapshot_path))
+
+  def testLoadIncompatibleSnapshot(self):
+    original = self.CreateServiceProxy()
+    with mock.patch('googleads.common._WSDL_SNAPSHOT_HEADER', ('old',)):
+      googleads.common.SaveWsdlDocumentSnapshot(
+          original.zeep_client.wsdl, self.snapshot_path)
+    googleads.common.InvalidateWsdlDocumentCache()
+
+    with mock.patch('googleads.common._logger') as mock_logger:
+      self.assertIsNone(googleads.common.LoadWsdlDocumentSnapshot(
+          self.wsdl_path, 'v1', self.snapshot_path))
+      self.assertTrue(mock_logger.warning.called)
+
+  def testLoadCorruptSnapshot(self):
+    os.makedirs(os.path.dirname(self.snapshot_path))
+    with open(self.snapshot_path, 'wb') as handle:
+      handle.write(b'not a snapshot')
+
+    with mock.patch('googleads.common._logger') as mock_logger:
+      self.assertIsNone(googleads.common.LoadWsdlDocumentSnapshot(
+          self.wsdl_path, 'v1', self.snapshot_path))
+      self.assertTrue(mock_logger.warning.called)
+
+
+# zeep.transports.AsyncTransport was added in zeep 4.0.0.
+_requires_zeep_async = unittest.skipUnless(
+    hasattr(zeep.transports, 'AsyncTransport'), 'requires zeep 4.0.0 or later')
+
+
+class ZeepAsyncServiceProxyTest(unittest.TestCase):
+  """Tests for the googleads.common.ZeepAsyncServiceProxy class."""
+
+  _RESPONSE_TEMPLATE = (
+      '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+      '<soap:Body>'
+      '<getReportJobStatusResponse '
+      'xmlns="https://www.google.com/apis/ads/publisher/v201802">'
+      '<rval>%s</rval>'
+      '</getReportJobStatusResponse>'
+      '</soap:Body>'
+      '</soap:Envelope>')
+
+  def setUp(self):
+    self.wsdl_path = os.path.join(
+        TEST_DIR, 'test_data/ad_manager_report_service.xml')
+    self.header_handler = mock.Mock()
+    self.header_handler.GetHTTPHeaders.return_value = {
+        'authorization': 'Bearer token'}
+    self.requests = []
+
+  def CreateServiceProxy(self, handler):
+    def RecordingHandler(request):
+      self.requests.append(request)
+      return handler(request)
+
+    http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(RecordingHandler))
+    return googleads.common.ZeepAsyncServiceProxy(
+        self.wsdl_path, self.header_handler, None,
+        googleads.common.ProxyConfig(), 100, 'v201802',
+        cache=googleads.common.ZeepServiceProxy.NO_CACHE,
+        http_client=http_client)
+
+  @_requires_zeep_async
+  def testMethodIsAwaitable(self):
+    service = self.CreateServiceProxy(lambda request: httpx.Response(
+        200, text=self._RESPONSE_TEMPLATE % 'COMPLETED',
+        headers={'Content-Type': 'text/xml'}))
+
+    result = asyncio.run(service.getReportJobStatus(123))
+
+    self.assertEqual(result, 'COMPLETED')
+    self.assertEqual(len(self.requests), 1)
+    self.assertEqual(
+        self.requests[0].headers['authorization'], 'Bearer token')
+    self.assertIn(b'<ns0:reportJobId>123</ns0:reportJobId>',
+                  self.requests[0].content)
+    self.header_handler.GetSOAPHeaders.assert_called_once_with(
+        service.CreateSoapElementForType)
+
+  @_requires_zeep_async
+  def testConcurrentRequests(self):
+    service = self.CreateServiceProxy(lambda request: httpx.Response(
+        200, text=self._RESPONSE_TEMPLATE % 'IN_PROGRESS',
+        headers={'Content-Type': 'text/xml'}))
+
+    async def RunAll():
+      return await asyncio.gather(
+          *[service.getReportJobStatus(i) for i in range(5)])
+
+    self.assertEqual(asyncio.run(RunAll()), ['IN_PROGRESS'] * 5)
+    self.assertEqual(len(self.requests), 5)
+
+  @_requires_zeep_async
+  def testFaultRaisesGoogleError(self):
+    with open(os.path.join(
+        TEST_DIR, 'test_data/fault_response_envelope.txt')) as handle:
+      fault = handle.read().replace('{VERSION}', 'v201802')
+    service = self.CreateServiceProxy(lambda request: httpx.Response(
+        500, text=fault, headers={'Content-Type': 'text/xml'}))
+
+    with self.assertRaises(googleads.errors.GoogleAdsServerFault) as e:
+      asyncio.run(service.getReportJobStatus(123))
+
+    self.assertEqual(e.exception.errors[0].reason, 'NETWORK_CODE_REQUIRED')
+    self.assertIn('NETWORK_CODE_REQUIRED', str(e.exception))
+
+  @_requires_zeep_async
+  def testProxyConfigBuildsAsyncClient(self):
+    proxy_config = googleads.common.ProxyConfig(
+        https_proxy='http://myproxy:443')
+    self.assertEqual(proxy_config.GetHttpxProxy(), 'http://myproxy:443')
+    self.assertIs(proxy_config.GetHttpxVerify(), proxy_config.ssl_context)
+    self.assertIsInstance(
+        proxy_config.BuildAsyncClient(), httpx.AsyncClient)
+
+  def testBuildAsyncClientWithoutHttpx(self):
+    with mock.patch('googleads.common.httpx', None):
+      with self.assertRaises(googleads.errors.GoogleAdsError):
+        googleads.common.ProxyConfig().BuildAsyncClient()
+
+  def testRequiresZeepAsyncTransport(self):
+    with mock.patch('zeep.transports', mock.Mock(spec=['Transport'])):
+      with self.assertRaises(googleads.errors.GoogleAdsError):
+        self.CreateServiceProxy(lambda request: None)
+
+  @_requires_zeep_async
+  def testClose(self):
+    service = self.CreateServiceProxy(lambda request: None)
+    transport = service.zeep_client.transport
+
+    asyncio.run(service.Close())
+
+    self.assertTrue(transport.wsdl_client.is_closed)
+    self.assertFalse(transport.client.is_closed)
+
+  @_requires_zeep_async
+  def testCloseOwnHttpClient(self):
+    service = googleads.common.ZeepAsyncServiceProxy(
+        self.wsdl_path, self.header_handler, None,
+        googleads.common.ProxyConfig(), 100, 'v201802',
+        cache=googleads.common.ZeepServiceProxy.NO_CACHE)
+    transport = service.zeep_client.transport
+
+    asyncio.run(service.Close())
+
+    self.assertTrue(transport.wsdl_client.is_closed)
+    self.assertTrue(transport.client.is_closed)
+
+
+class _StaticAdapter(requests.adapters.BaseAdapter):
+  """A requests adapter answering every request with the same response."""
+
+  def __init__(self, status_code, content):
+    super(_StaticAdapter, self).__init__()
+    self.status_code = status_code
+    self.content = content
+    self.requests = []
+
+  def send(self, request, **kwargs):
+    self.requests.append(request)
+    response = requests.Response()
+    response.status_code = self.status_code
+    response._content = self.content
+    response.headers['Content-Type'] = 'text/xml'
+    response.request = request
+    response.url = request.url
+    return response
+
+  def close(self):
+    pass
+
+
+# The dict and stream response modes need zeep.settings, added in zeep 3.0.0.
+_requires_zeep_settings = unittest.skipIf(
+    googleads.common._ZeepSettings is None, 'requires zeep 3.0.0 or later')
+
+
+class ZeepServiceProxyResponseModeTest(unittest.TestCase):
+  """Tests for the response modes of googleads.common.ZeepServiceProxy."""
+
+  _RESPONSE = (
+      '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/" '
+      'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+      '<soap:Header>'
+      '<ResponseHeader xmlns="https://www.google.com/apis/ads/publisher/'
+      'v201802"><requestId>abc</requestId></ResponseHeader>'
+      '</soap:Header>'
+      '<soap:Body>'
+      '<getSavedQueriesByStatementResponse '
+      'xmlns="https://www.google.com/apis/ads/publisher/v201802">'
+      '<rval>'
+      '<totalResultSetSize>2</totalResultSetSize>'
+      '<startIndex>0</startIndex>'
+      '<results>'
+      '<id>1</id><name>Clicks</name>'
+      '<reportQuery>'
+      '<dimensions>DATE</dimensions><dimensions>AD_UNIT_NAME</dimensions>'
+      '<columns>AD_SERVER_CLICKS</columns>'
+      '<statement><query>WHERE id = :id</query>'
+      '<values><key>id</key><value xsi:type="NumberValue">'
+      '<value>5</value></value></values></statement>'
+      '</reportQuery>'
+      '<isCompatibleWithApiVersion>true</isCompatibleWithApiVersion>'
+      '</results>'
+      '<results><id>2</id><name/>%s</results>'
+      '</rval>'
+      '</getSavedQueriesByStatementResponse>'
+      '</soap:Body>'
+      '</soap:Envelope>')
+
+  def setUp(self):
+    self.wsdl_path = os.path.join(
+        TEST_DIR, 'test_data/ad_manager_report_service.xml')
+    self.header_handler = mock.Mock()
+    self.header_handler.GetSOAPHeaders.return_value = None
+    self.header_handler.GetSOAPHeaderValues.return_value = None
+    self.header_handler.GetHTTPHeaders.return_value = {}
+
+  def CreateServiceProxy(self, response_mode, content, status_code=200):
+    session = requests.Session()
+    session.mount('https://', _StaticAdapter(status_code, content))
+    return googleads.common.ZeepServiceProxy(
+        self.wsdl_path, self.header_handler, None,
+        googleads.common.ProxyConfig(), 100, 'v201802',
+        cache=googleads.common.ZeepServiceProxy.NO_CACHE,
+        http_session=session, response_mode=response_mode)
+
+  def GetSavedQueries(self, response_mode, content, status_code=200):
+    service = self.CreateServiceProxy(response_mode, content, status_code)
+    return service.getSavedQueriesByStatement({'query': 'LIMIT 2'})
+
+  @_requires_zeep_settings
+  def testDictResponseMatchesZeepObjects(self):
+    content = (self._RESPONSE % '').encode('utf-8')
+    expected = zeep.helpers.serialize_object(
+        self.GetSavedQueries(googleads.common.RESPONSE_MODE_ZEEP, content),
+        dict)
+    expected['results'][0]['reportQuery']['statement']['values'][0][
+        'value']['xsi_type'] = 'NumberValue'
+
+    result = self.GetSavedQueries(googleads.common.RESPONSE_MODE_DICT, content)
+
+    self.assertEqual(result, expected)
+    self.assertIs(type(result), dict)
+    self.assertEqual(result['totalResultSetSize'], 2)
+    self.assertIs(result['results'][0]['isCompatibleWithApiVersion'], True)
+    self.assertEqual(result['results'][0]['reportQuery']['dimensions'],
+                     ['DATE', 'AD_UNIT_NAME'])
+    self.assertIsNone(result['results'][1]['reportQuery'])
+
+  @_requires_zeep_settings
+  def testDictResponseSkipsUnknownElements(self):
+    content = (self._RESPONSE % '<unknown><id>3</id></unknown>').encode(
+        'utf-8')
+
+    result = self.GetSavedQueries(googleads.common.RESPONSE_MODE_DICT, content)
+
+    self.assertEqual(result['results'][1]['id'], 2)
+    self.assertNotIn('unknown', result['results'][1])
+
+  @_requires_zeep_settings
+  def testDictResponseFaultRaisesGoogleError(self):
+    with open(os.path.join(
+        TEST_DIR, 'test_data/fault_response_envelope.txt')) as handle:
+      fault = handle.read().replace('{VERSION}', 'v201802').encode('utf-8')
+
+    for status_code in (500, 200):
+      with self.assertRaises(googleads.errors.GoogleAdsServerFault) as e:
+        self.GetSavedQueries(
+            googleads.common.RESPONSE_MODE_DICT, fault, status_code)
+      self.assertEqual(e.exception.errors[0].reason, 'NETWORK_CODE_REQUIRED')
+
+  @_requires_zeep_settings
+  def testStreamedPageYieldsResults(self):
+    content = (self._RESPONSE % '').encode('utf-8')
+    expected = self.GetSavedQueries(googleads.common.RESPONSE_MODE_DICT,
+                                    content)
+
+    page = self.GetSavedQueries(googleads.common.RESPONSE_MODE_STREAM, content)
+
+    self.assertIsInstance(page, googleads.common.StreamedPage)
+    self.assertEqual(page['totalResultSetSize'], 2)
+    self.assertIn('results', page)
+    self.assertIsNone(page.get('unknown'))
+    self.assertEqual(list(page['results']), expected['results'])
+    self.assertEqual(list(page), [])
+    self.assertEqual(page['startIndex'], 0)
+
+  @_requires_zeep_settings
+  def testStreamedPageWithoutResults(self):
+    content = (
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+        '<soap:Body><getSavedQueriesByStatementResponse '
+        'xmlns="https://www.google.com/apis/ads/publisher/v201802"><rval>'
+        '<totalResultSetSize>0</totalResultSetSize>'
+        '</rval></getSavedQueriesByStatementResponse></soap:Body>'
+        '</soap:Envelope>').encode('utf-8')
+
+    page = self.GetSavedQueries(googleads.common.RESPONSE_MODE_STREAM, content)
+
+    self.assertEqual(page['totalResultSetSize'], 0)
+    self.assertEqual(list(page), [])
+
+  @_requires_zeep_settings
+  def testStreamResponseModeParsesOtherResponses(self):
+    content = (
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+        '<soap:Body><getReportJobStatusResponse '
+        'xmlns="https://www.google.com/apis/ads/publisher/v201802">'
+        '<rval>COMPLETED</rval></getReportJobStatusResponse></soap:Body>'
+        '</soap:Envelope>').encode('utf-8')
+    service = self.CreateServiceProxy(
+        googleads.common.RESPONSE_MODE_STREAM, content)
+
+    self.assertEqual(service.getReportJobStatus(123), 'COMPLETED')
+
+  @_requires_zeep_settings
+  def testStreamedPageFaultRaisesGoogleError(self):
+    with open(os.path.join(
+        TEST_DIR, 'test_data/fault_response_envelope.txt')) as handle:
+      fault = handle.read().replace('{VERSION}', 'v201802').encode('utf-8')
+
+    with self.assertRaises(googleads.errors.GoogleAdsServerFault):
+      self.GetSavedQueries(googleads.common.RESPONSE_MODE_STREAM, fault)
+
+  def testUnknownResponseModeRaisesGoogleError(self):
+    self.assertRaises(
+        googleads.errors.GoogleAdsValueError, self.CreateServiceProxy,
+        'objects', b'')
+
+  def testParsedResponseModesRequireZeepSettings(self):
+    with mock.patch('googleads.common._ZeepSettings', None):
+      for response_mode in (googleads.common.RESPONSE_MODE_DICT,
+                            googleads.common.RESPONSE_MODE_STREAM):
+        self.assertRaises(
+            googleads.errors.GoogleAdsValueError, self.CreateServiceProxy,
+            response_mode, b'')
+      self.assertIsNotNone(
+          self.CreateServiceProxy(googleads.common.RESPONSE_MODE_ZEEP, b''))
+
+
+class ZeepServiceProxySOAPHeaderTest(unittest.TestCase):
+  """Tests for the SOAP header cache of googleads.common.ZeepServiceProxy."""
+
+  _RESPONSE = (
+      b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+      b'<soap:Body><getReportJobStatusResponse '
+      b'xmlns="https://www.google.com/apis/ads/publisher/v201802">'
+      b'<rval>COMPLETED</rval></getReportJobStatusResponse></soap:Body>'
+      b'</soap:Envelope>')
+
+  def setUp(self):
+    self.header_handler = mock.Mock()
+    self.header_handler.GetHTTPHeaders.return_value = {}
+    self.header_handler.GetSOAPHeaderValues.return_value = (
+        'ns0:SoapRequestHeader', (('networkCode', '12345'),
+                                  ('applicationName', 'app')))
+    self.adapter = _StaticAdapter(200, self._RESPONSE)
+    session = requests.Session()
+    session.mount('https://', self.adapter)
+    self.service = googleads.common.ZeepServiceProxy(
+        os.path.join(TEST_DIR, 'test_data/ad_manager_report_service.xml'),
+        self.header_handler, None, googleads.common.ProxyConfig(), 100,
+        'v201802', cache=googleads.common.ZeepServiceProxy.NO_CACHE,
+        http_session=session)
+
+  def GetSentEnvelope(self, index=-1):
+    return lxml.etree.tostring(
+        lxml.etree.fromstring(self.adapter.requests[index].body),
+        method='c14n')
+
+  def testSplicedEnvelopeMatchesZeepEnvelope(self):
+    def GetSOAPHeaders(create_method):
+      header = create_method('ns0:SoapRequestHeader')
+      header.networkCode = '12345'
+      header.applicationName = 'app'
+      return header
+
+    self.header_handler.GetSOAPHeaders.side_effect = GetSOAPHeaders
+    expected = lxml.etree.tostring(self.service.GetRequestXML(
+        'getReportJobStatus', 123), method='c14n')
+
+    self.assertEqual(self.service.getReportJobStatus(123), 'COMPLETED')
+
+    self.assertEqual(self.GetSentEnvelope(), expected)
+    self.assertEqual(self.header_handler.GetSOAPHeaders.call_count, 1)
+
+  def testInstalledZeepSupportsSplicing(self):
+    # Splicing relies on private zeep APIs, so this fails if the installed zeep
+    # drops them, even though requests then fall back to _soapheaders.
+    self.assertTrue(self.service._splices_soap_headers)
+
+  def testFallsBackToZeepWithoutPrivateAPIs(self):
+    def GetSOAPHeaders(create_method):
+      header = create_method('ns0:SoapRequestHeader')
+      header.networkCode = '12345'
+      header.applicationName = 'app'
+      return header
+
+    self.header_handler.GetSOAPHeaders.side_effect = GetSOAPHeaders
+    self.service.getReportJobStatus(123)
+    spliced_envelope = self.GetSentEnvelope()
+
+    # zeep imports etree_to_string by name, so only the splicing loses it.
+    with mock.patch.object(zeep.wsdl.utils, 'etree_to_string'):
+      del zeep.wsdl.utils.etree_to_string
+      service = googleads.common.ZeepServiceProxy(
+          os.path.join(TEST_DIR, 'test_data/ad_manager_report_service.xml'),
+          self.header_handler, None, googleads.common.ProxyConfig(), 100,
+          'v201802', cache=googleads.common.ZeepServiceProxy.NO_CACHE,
+          http_session=self.service.zeep_client.transport.session)
+      self.assertFalse(service._splices_soap_headers)
+      self.assertEqual(service.getReportJobStatus(123), 'COMPLETED')
+
+    self.assertEqual(self.GetSentEnvelope(), spliced_envelope)
+    self.header_handler.GetSOAPHeaders.assert_called_once_with(
+        service.CreateSoapElementForType)
+
+  def testRenderedSOAPHeaderIsCached(self):
+    with mock.patch.object(
+        self.service, 'CreateSoapElementForType',
+        wraps=self.service.CreateSoapElementForType) as create_mock:
+      self.service.getReportJobStatus(1)
+      self.service.getReportJobStatus(2)
+      self.assertEqual(create_mock.call_count, 1)
+
+      self.header_handler.GetSOAPHeaderValues.return_value = (
+          'ns0:SoapRequestHeader', (('networkCode', '67890'),
+                                    ('applicationName', 'app')))
+      self.service.getReportJobStatus(3)
+      self.assertEqual(create_mock.call_count, 2)
+
+    self.assertIn(b'<ns0:networkCode>12345</ns0:networkCode>',
+                  self.GetSentEnvelope(1))
+    self.assertIn(b'<ns0:networkCode>67890</ns0:networkCode>',
+                  self.GetSentEnvelope(2))
+    self.assertIn(b'<ns0:reportJobId>3</ns0:reportJobId>',
+                  self.GetSentEnvelope(2))
+    self.header_handler.GetSOAPHeaders.assert_not_called()
+
+  def testEnvelopeLoggingRendersHeadersWithZeep(self):
+    self.header_handler.GetSOAPHeaders.return_value = None
+    soap_logger = logging.getLogger('googleads.soap')
+    level = soap_logger.level
+    soap_logger.setLevel(logging.DEBUG)
+    try:
+      self.service.getReportJobStatus(1)
+    finally:
+      soap_logger.setLevel(level)
+
+    self.header_handler.GetSOAPHeaders.assert_called_once_with(
+        self.service.CreateSoapElementForType)
+    self.assertNotIn(b'RequestHeader', self.adapter.requests[0].body)
+
+
 class ProxyConfigTest(unittest.TestCase):
   """Tests for the googleads.common.ProxyConfig class."""
 
@@ -1002,6 +1675,38 @@ class ProxyConfigTest(unittest.TestCase):
         proxy_config.BuildOpener()
         mck_build_opener.assert_called_once_with(*[mock_https_hndlr_instance])
 
+  def testBuildSession(self):
+    proxy_config = googleads.common.ProxyConfig(
+        https_proxy=self.proxy_no_credentials)
+    session = proxy_config.BuildSession(pool_size=4)
+
+    self.assertEqual(session.proxies, {'https': self.proxy_no_credentials})
+    self.assertTrue(session.verify)
+    self.assertEqual(session.headers['Connection'], 'keep-alive')
+    adapter = session.get_adapter('https://ads.google.com')
+    self.assertEqual(adapter._pool_maxsize, 4)
+    self.assertIs(adapter, session.get_adapter('http://ads.google.com'))
+
+  def testBuildSessionWithAdapter(self):
+    adapter = requests.adapters.HTTPAdapter()
+    session = googleads.common.ProxyConfig().BuildSession(adapter=adapter)
+
+    self.assertIs(session.get_adapter('https://ads.google.com'), adapter)
+    self.assertIs(session.get_adapter('http://ads.google.com'), adapter)
+
+  def testBuildSessionWithCafile(self):
+    proxy_config = googleads.common.ProxyConfig(cafile=self.cafile)
+    self.assertEqual(proxy_config.BuildSession().verify, self.cafile)
+
+  def testBuildSessionWithoutCertificateValidation(self):
+    proxy_config = googleads.common.ProxyConfig(
+        disable_certificate_validation=True)
+    self.assertFalse(proxy_config.BuildSession().verify)
+
+  def testBuildSessionWithoutKeepAlive(self):
+    session = googleads.common.ProxyConfig().BuildSession(keep_alive=False)
+    self.assertEqual(session.headers['Connection'], 'close')
+
   def testProxyConfigWithNoProxy(self):
     proxy_config = googleads.common.ProxyConfig()
     self.assertEqual(proxy_config.proxies, {})
@@ -179,6 +179,17 @@ class GoogleRefreshTokenClientTest(unittest.TestCase):
         self.mock_credentials_instance.refresh.assert_called_once_with(
             self.mock_req_instance)
 
+  def testCreateHttpHeader_refreshWithSharedHttpSession(self):
+    http_session = mock.Mock()
+
+    with mock.patch('requests.Session') as mock_session:
+      with mock.patch('google.auth.transport.requests.Request', self.mock_req):
+        self.refresh_client.CreateHttpHeader(http_session=http_session)
+        self.assertFalse(mock_session.called)
+        self.mock_req.assert_called_once_with(session=http_session)
+        self.mock_credentials_instance.refresh.assert_called_once_with(
+            self.mock_req_instance)
+
   def testCreateHttpHeader_refreshFails(self):
     self.mock_credentials_instance.refresh.side_effect = RefreshError(
         'Invalid response 400')
@@ -217,6 +228,12 @@ class GoogleCredentialsClientTest(unittest.TestCase):
       self.client.Refresh()
       self.mock_req.assert_called_once()
 
+  def testRefreshWithSharedHttpSession(self):
+    http_session = mock.Mock()
+    with mock.patch('google.auth.transport.requests.Request', self.mock_req):
+      self.client.Refresh(http_session)
+      self.mock_req.assert_called_once_with(session=http_session)
+
   def testCreateHttpHeader_credentialsExpired(self):
     self.mock_credentials.expiry = object()
     self.mock_credentials.expired = True
@@ -354,6 +371,17 @@ class GoogleServiceAccountTest(
       self.mock_credentials_instance.refresh.assert_called_once_with(
           self.mock_req_instance)
 
+  def testCreateHttpHeader_refreshWithSharedHttpSession(self):
+    http_session = mock.Mock()
+
+    with mock.patch('requests.Session') as mock_session:
+      with mock.patch('google.auth.transport.requests.Request', self.mock_req):
+        self.sa_client.CreateHttpHeader(http_session=http_session)
+        self.assertFalse(mock_session.called)
+        self.mock_req.assert_called_once_with(session=http_session)
+        self.mock_credentials_instance.refresh.assert_called_once_with(
+            self.mock_req_instance)
+
   def testCreateHttpHeader_refreshFails(self):
     self.mock_credentials_instance.refresh.side_effect = RefreshError(
         'Invalid response 400')
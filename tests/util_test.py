@@ -257,5 +257,54 @@ class ZeepLoggerTest(unittest.TestCase):
         googleads.util._REQUEST_LOG_LINE, 'service_name', 'opname', 'myaddress')
 
 
+class LruCacheTest(unittest.TestCase):
+  """Tests for the LruCache utility."""
+
+  def setUp(self):
+    self.cache = googleads.util.LruCache(2)
+
+  def testGetMissing(self):
+    self.assertIsNone(self.cache.Get('a'))
+    self.assertEqual(self.cache.Get('a', 'default'), 'default')
+
+  def testSetAndGet(self):
+    self.cache.Set('a', 1)
+    self.assertEqual(self.cache.Get('a'), 1)
+    self.assertIn('a', self.cache)
+    self.assertNotIn('b', self.cache)
+
+  def testLeastRecentlyUsedEviction(self):
+    self.cache.Set('a', 1)
+    self.cache.Set('b', 2)
+    self.cache.Get('a')
+    self.cache.Set('c', 3)
+
+    self.assertEqual(len(self.cache), 2)
+    self.assertEqual(self.cache.Get('a'), 1)
+    self.assertNotIn('b', self.cache)
+    self.assertEqual(self.cache.Get('c'), 3)
+
+  def testInvalidate(self):
+    self.cache.Set(('a', 1), 1)
+    self.cache.Set(('a', 2), 2)
+    self.cache.Invalidate(lambda key: key[1] == 1)
+    self.assertNotIn(('a', 1), self.cache)
+    self.assertIn(('a', 2), self.cache)
+
+    self.cache.Invalidate()
+    self.assertEqual(len(self.cache), 0)
+
+  def testSetMaxSize(self):
+    self.cache.Set('a', 1)
+    self.cache.Set('b', 2)
+    self.cache.SetMaxSize(1)
+    self.assertNotIn('a', self.cache)
+    self.assertIn('b', self.cache)
+
+    self.cache.SetMaxSize(0)
+    self.cache.Set('a', 1)
+    self.assertEqual(len(self.cache), 0)
+
+
 if __name__ == '__main__':
   unittest.main()